@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+""" Load test of the gevent pool on one CPU core.
+
+Runs ``tasks.io_probe`` (simulated I/O plus the task response
+handling) on a gevent pool of increasing size, pinned to one core,
+and prints tasks per second for every pool size:
+
+    RESPONSE_TRANSPORT=null python -m benchmarks.green_load --delay 0.05
+
+Use ``benchmarks.worker_pools --task io_probe`` against a worker
+started with ``CELERY_POOL=gevent`` for the end to end figures.
+"""
+
+# BUILTIN modules
+from gevent import monkey
+
+monkey.patch_all()
+
+import os
+import sys
+import argparse
+from time import perf_counter
+
+# Third party modules
+from gevent.pool import Pool
+from loguru import logger
+
+# Local modules
+from src.worker.tasks import io_probe
+from src.tools.response_transport import NullTransport, set_transport
+
+
+# ---------------------------------------------------------
+#
+def run(concurrency: int, tasks: int, delay: float) -> dict:
+    """ Execute ``tasks`` probes on ``concurrency`` greenlets.
+
+    :param concurrency: Number of greenlets.
+    :param tasks: Number of tasks.
+    :param delay: Simulated I/O time per task.
+    :return: Benchmark figures.
+    """
+
+    # app.backend is thread (so greenlet) local: resolve it once, as
+    # the worker does when it builds the task tracer.
+    io_probe.backend = io_probe.app.backend
+    pool = Pool(concurrency)
+    started = perf_counter()
+
+    for _ in range(tasks):
+        pool.spawn(io_probe.apply, kwargs={'delay': delay})
+
+    pool.join()
+    elapsed = perf_counter() - started
+
+    return {'concurrency': concurrency,
+            'tasks': tasks,
+            'tasks_per_second': round(tasks / elapsed, 1),
+            'ceiling': round(concurrency / delay, 1)}
+
+
+# ---------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--delay', type=float, default=0.05)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 100, 500])
+    args = parser.parse_args()
+
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+    # Per task log lines would dominate the measurement.
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    if os.getenv('RESPONSE_TRANSPORT') is None:
+        set_transport(NullTransport())
+
+    for level in args.levels:
+        print(run(level, max(100, level * 10), args.delay))
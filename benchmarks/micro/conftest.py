@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+""" Synthetic MongoDB documents for the microbenchmarks.
+
+Documents are shaped like the stored ones (string ids, ISO timestamps
+in the update history) with a growing ``update_history`` length.
+"""
+
+# BUILTIN modules
+from datetime import datetime, timedelta
+
+# Third party modules
+import pytest
+from bson import ObjectId
+
+# Constants
+HISTORY_LENGTHS = (0, 10, 100, 1000)
+""" update_history lengths every document benchmark runs with. """
+
+_START = datetime(2024, 1, 1)
+
+
+# ---------------------------------------------------------
+#
+def history(length: int, statuses: tuple) -> list:
+    """ Return an update_history of ``length`` entries cycling through statuses. """
+    author = str(ObjectId())
+
+    return [{'new_status': statuses[index % len(statuses)],
+             'when': (_START + timedelta(minutes=index)).isoformat(),
+             'by': author, 'comment': f'update {index}'}
+            for index in range(length)]
+
+
+def order_document(length: int) -> dict:
+    """ Return an order as read from the orders collection. """
+    return {'_id': ObjectId(), 'customer_id': str(ObjectId()),
+            'service': 'Make a web site', 'description': 'Benchmark order',
+            'status': 'orderAccepted', 'created': _START,
+            'update_history': history(length, ('underReview', 'orderAccepted'))}
+
+
+def quotation_document(length: int) -> dict:
+    """ Return a quotation as read from the quotations collection. """
+    return {'_id': ObjectId(), 'order_id': str(ObjectId()), 'owner_id': None,
+            'price': 5000, 'details': 'Benchmark quotation',
+            'status': 'quotationValidated', 'created': _START,
+            'update_history': history(length, ('quotationUnderReview', 'quotationValidated'))}
+
+
+# ---------------------------------------------------------
+#
+@pytest.fixture(params=HISTORY_LENGTHS, ids=lambda length: f'history={length}')
+def history_length(request) -> int:
+    return request.param
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+""" Per document costs of the repository and serialization hot paths.
+
+Every list route pays these once per document. Run with pytest-benchmark:
+
+    python -m pytest benchmarks/micro --benchmark-only --benchmark-group-by=func
+
+and keep a run to compare later changes against:
+
+    python -m pytest benchmarks/micro --benchmark-only --benchmark-autosave
+    python -m pytest benchmarks/micro --benchmark-only --benchmark-compare
+"""
+
+# BUILTIN modules
+import json
+from datetime import datetime
+
+# Third party modules
+import pytest
+from bson import ObjectId
+
+pytest.importorskip('pytest_benchmark')
+
+# Local modules
+from src.api.database import StateUpdateSchema, from_mongo
+from src.api.orders.models import OrderModel
+from src.api.quotations.models import QuotationModel
+from src.tools.rabbit_client import RabbitClient
+from src.worker.celery_app import CustomJSONEncoder
+from .conftest import order_document, quotation_document
+
+
+# ---------------------------------------------------------
+#
+def test_from_mongo(benchmark, history_length):
+    document = order_document(history_length)
+
+    # from_mongo renames _id in place: every round gets a fresh copy.
+    benchmark.pedantic(from_mongo, setup=lambda: ((dict(document),), {}),
+                       rounds=2000, warmup_rounds=10)
+
+
+def test_order_model_to_dict(benchmark, history_length):
+    document = order_document(history_length)
+
+    result = benchmark(lambda: OrderModel(**document).to_dict())
+
+    assert len(result.get('update_history', [])) == history_length
+
+
+def test_state_update_schema_dict(benchmark):
+    update = StateUpdateSchema(new_status='orderAccepted', when=datetime(2024, 1, 1),
+                               by=str(ObjectId()), comment='Benchmark')
+
+    benchmark(update.dict)
+
+
+def test_quotation_model_dict(benchmark, history_length):
+    document = from_mongo(quotation_document(history_length))
+
+    result = benchmark(lambda: QuotationModel(**document).dict())
+
+    assert len(result.get('update_history', [])) == history_length
+
+
+def test_custom_json_encoder(benchmark, history_length):
+    # A task response: raw documents still carry ObjectId and datetime values.
+    response = {'job_id': 'benchmark', 'status': 'SUCCESS',
+                'result': [order_document(history_length) for _ in range(10)]}
+    encode = CustomJSONEncoder().encode
+
+    benchmark(encode, response)
+
+
+def test_rabbit_message_build(benchmark, history_length):
+    response = {'job_id': 'benchmark', 'status': 'SUCCESS',
+                'result': OrderModel(**order_document(history_length)).to_dict()}
+
+    message = benchmark(RabbitClient.build_message, response, {'traceparent': '00-0-0-01'})
+
+    assert json.loads(message.body)['job_id'] == 'benchmark'
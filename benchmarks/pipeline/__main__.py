@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+""" Load test of the complete order pipeline.
+
+Drives order flows (see flows.py) through the HTTP API at a given
+concurrency and prints the throughput, the step and flow latency
+percentiles and the DB operations per flow:
+
+    # Tasks run in the API process, on mongomock and fakeredis.
+    python -m benchmarks.pipeline --flows 200 --concurrency 10
+
+    # Same, on the local MongoDB and Redis of the .env settings.
+    python -m benchmarks.pipeline --backends local
+
+    # Through RabbitMQ and a running worker (and API when --url is given).
+    python -m benchmarks.pipeline --mode worker --backends local
+
+The report is compared with the stored baseline of the same setup
+(exit code 1 on regression); --save-baseline replaces it.
+"""
+
+# BUILTIN modules
+import sys
+import asyncio
+import argparse
+from collections import Counter
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from . import report
+from .flows import PipelineClient, api_client, run_flows, seed
+from .standins import OperationCounter, install
+
+
+# ---------------------------------------------------------
+#
+async def main(args) -> dict:
+    """ Run the benchmark and return its report. """
+    counter = OperationCounter()
+    recorder = install(args.mode, args.backends, counter)
+
+    # Imported after install: the application reads the Celery setup.
+    from src.main import app
+
+    settings = {'mode': args.mode, 'backends': args.backends,
+                'flows': args.flows, 'concurrency': args.concurrency}
+
+    async with api_client(app, args.url) as client:
+        api = PipelineClient(client, recorder)
+        people = await seed(api, args.customers, args.employees)
+
+        before = counter.snapshot()
+        outcome = await run_flows(api, people, args.flows, args.concurrency)
+        operations = Counter(counter.snapshot())
+        operations.subtract(before)
+
+    for error in outcome['errors'][:5]:
+        logger.warning(error)
+
+    return report.build(settings, outcome, api.latencies,
+                        {name: count for name, count in sorted(operations.items()) if count})
+
+
+# ---------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('eager', 'worker'), default='eager')
+    parser.add_argument('--backends', choices=('memory', 'local'), default='memory')
+    parser.add_argument('--url', help='URL of a running API (worker mode)')
+    parser.add_argument('--flows', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--employees', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative slow down against the baseline')
+    parser.add_argument('--baseline', help='baseline file (default: per setup)')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    if args.mode == 'eager' and args.url:
+        parser.error('--url needs --mode worker')
+
+    # Per task log lines would dominate the measurement.
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+
+    result = asyncio.run(main(args))
+    print(report.render(result))
+
+    path = report.baseline_path(result['settings'])
+    path = path if args.baseline is None else type(path)(args.baseline)
+
+    if args.save_baseline:
+        report.save(result, path)
+        print(f'\nBaseline saved to {path}')
+
+    elif path.exists():
+        regressions = report.compare(result, report.load(path), args.tolerance)
+        print(f'\nCompared with {path}: ' + ('; '.join(regressions) or 'no regression'))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+""" Order lifecycle flows driven through the HTTP API.
+
+One flow is the complete life of an order, every step being an API
+call followed by the wait for its task result (what a caller sees):
+
+    create_order -> validate_order -> list_quotations -> validate_quotation
+    -> accept_quotation -> read_realisation -> start_realisation
+    -> complete_realisation
+"""
+
+# BUILTIN modules
+import asyncio
+import itertools
+from time import perf_counter
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Third party modules
+import httpx
+
+# Local modules
+from src.config.setup import config
+from src.api.orders.services import Services
+from .standins import RecordingTransport
+
+# Constants
+STEPS = ('create_order', 'validate_order', 'list_quotations', 'validate_quotation',
+         'accept_quotation', 'read_realisation', 'start_realisation',
+         'complete_realisation')
+""" Flow steps, in execution order. """
+
+
+# ------------------------------------------------------------------------
+#
+class FlowError(Exception):
+    """ A step of a flow did not succeed. """
+
+
+# ------------------------------------------------------------------------
+#
+class PipelineClient:
+    """ API caller recording the latency of every step.
+
+    In eager mode the task result is taken from the response recorder,
+    otherwise the task status endpoint is polled until it is ready.
+    """
+
+    def __init__(self, client: httpx.AsyncClient,
+                 recorder: Optional[RecordingTransport] = None,
+                 poll_interval: float = 0.01, timeout: float = 30.0):
+        """ The class initializer.
+
+        :param client: HTTP client bound to the API.
+        :param recorder: Task response recorder (eager mode).
+        :param poll_interval: Seconds between status polls (worker mode).
+        :param timeout: Max seconds to wait for a task result.
+        """
+        self.client = client
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    # ---------------------------------------------------------
+    #
+    async def _result(self, job_id: str):
+        """ Return the result of a task, raise FlowError when it failed. """
+
+        if self.recorder is not None:
+            if (response := self.recorder.pop(job_id)) is None:
+                raise FlowError(f'No response for task {job_id}')
+
+            status, result = response['status'], response['result']
+
+        else:
+            deadline = perf_counter() + self.timeout
+
+            while True:
+                reply = await self.client.get(f'/v1/process/status/{job_id}')
+                reply.raise_for_status()
+                status, result = reply.json()['status'], reply.json().get('result')
+
+                if status in ('SUCCESS', 'FAILURE'):
+                    break
+
+                if perf_counter() > deadline:
+                    raise FlowError(f'Task {job_id} not done after {self.timeout}s')
+
+                await asyncio.sleep(self.poll_interval)
+
+        if status != 'SUCCESS':
+            # Failed task results carry the formatted traceback lines.
+            detail = result.get('message') if isinstance(result, dict) else result
+            detail = detail[-1].strip() if isinstance(detail, list) and detail else detail
+            raise FlowError(f'Task {job_id} {status}: {detail}')
+
+        return result
+
+    # ---------------------------------------------------------
+    #
+    async def call(self, step: str, method: str, url: str, **kwargs):
+        """ Call an API route and wait for the task result.
+
+        :param step: Step name (latency key).
+        :param method: HTTP method.
+        :param url: Route path.
+        :return: Task result.
+        """
+        started = perf_counter()
+        reply = await self.client.request(method, url, **kwargs)
+
+        if reply.status_code >= 400:
+            raise FlowError(f'{step}: HTTP {reply.status_code} {reply.text}')
+
+        result = await self._result(reply.json()['id'])
+        self.latencies[step].append(perf_counter() - started)
+
+        return result
+
+
+# ---------------------------------------------------------
+#
+async def seed(api: PipelineClient, customers: int, employees: int) -> dict:
+    """ Create the customers and employees used by the flows.
+
+    :param api: API caller.
+    :param customers: Number of customers.
+    :param employees: Number of employees (each one has every skill).
+    :return: {'customers': [ids], 'employees': [ids]}.
+    """
+    people = {'customers': [], 'employees': []}
+
+    for index in range(customers):
+        people['customers'].append(await api.call(
+            'seed', 'POST', '/v1/customers',
+            json={'first_name': 'Bench', 'last_name': f'Customer{index}',
+                  'email': f'customer{index}@bench.example.com'}))
+
+    for index in range(employees):
+        people['employees'].append(await api.call(
+            'seed', 'POST', '/v1/employees',
+            json={'first_name': 'Bench', 'last_name': f'Employee{index}',
+                  'email': f'employee{index}@bench.example.com',
+                  'skills': [service.value for service in Services]}))
+
+    api.latencies.pop('seed', None)
+    return people
+
+
+# ---------------------------------------------------------
+#
+async def order_flow(api: PipelineClient, customer_id: str, reviewer_id: str,
+                     service: Services):
+    """ Run one order from creation to completed realisation.
+
+    :param api: API caller.
+    :param customer_id: Ordering customer.
+    :param reviewer_id: Employee validating the order and its quotation.
+    :param service: Ordered service.
+    """
+    order_id = await api.call(
+        'create_order', 'POST', '/v1/orders',
+        json={'customer_id': customer_id, 'service': service.value,
+              'description': 'Pipeline benchmark order'})
+
+    await api.call(
+        'validate_order', 'POST', f'/v1/orders/{order_id}/validate',
+        json={'obj_id': order_id, 'author_id': reviewer_id, 'comment': 'ok'})
+
+    quotations = await api.call(
+        'list_quotations', 'GET', f'/v1/orders/{order_id}/quotations')
+    quotation_id = quotations[0]['id']
+
+    await api.call(
+        'validate_quotation', 'POST', f'/v1/quotations/{quotation_id}/validate',
+        params={'author_id': reviewer_id})
+
+    realisation_id = await api.call(
+        'accept_quotation', 'POST', f'/v1/quotations/{quotation_id}/accept',
+        params={'author_id': customer_id})
+
+    realisation = await api.call(
+        'read_realisation', 'GET', f'/v1/realisations/{realisation_id}')
+    employee_id = realisation['employee_id']
+
+    for step in ('start', 'complete'):
+        await api.call(
+            f'{step}_realisation', 'POST', f'/v1/realisations/{realisation_id}/{step}',
+            params={'author_id': employee_id})
+
+
+# ---------------------------------------------------------
+#
+async def run_flows(api: PipelineClient, people: dict, flows: int,
+                    concurrency: int) -> dict:
+    """ Run the order flows, at most ``concurrency`` at a time.
+
+    :param api: API caller.
+    :param people: Seeded customers and employees.
+    :param flows: Number of flows.
+    :param concurrency: Flows in progress at the same time.
+    :return: {'elapsed', 'flow_latencies', 'errors'}.
+    """
+    gate = asyncio.Semaphore(concurrency)
+    customers = itertools.cycle(people['customers'])
+    reviewers = itertools.cycle(people['employees'])
+    services = itertools.cycle(Services)
+    flow_latencies, errors = [], []
+
+    async def one(customer_id, reviewer_id, service):
+        async with gate:
+            started = perf_counter()
+
+            try:
+                await order_flow(api, customer_id, reviewer_id, service)
+                flow_latencies.append(perf_counter() - started)
+
+            except FlowError as why:
+                errors.append(str(why))
+
+    started = perf_counter()
+    await asyncio.gather(*(one(next(customers), next(reviewers), next(services))
+                           for _ in range(flows)))
+
+    return {'elapsed': perf_counter() - started,
+            'flow_latencies': flow_latencies, 'errors': errors}
+
+
+# ---------------------------------------------------------
+#
+def api_client(app=None, base_url: Optional[str] = None) -> httpx.AsyncClient:
+    """ Return an authenticated HTTP client for the API.
+
+    :param app: ASGI application called in process (when no base_url).
+    :param base_url: URL of a running API.
+    :return: HTTP client.
+    """
+    headers = {'X-API-Key': config.service_api_key}
+
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, headers=headers, timeout=30)
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                             base_url='http://pipeline', headers=headers, timeout=30)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+""" Benchmark report and baseline comparison. """
+
+# BUILTIN modules
+import json
+import platform
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List
+
+# Local modules
+from src.tools.task_timings import percentiles
+from .flows import STEPS
+
+# Constants
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+""" Stored baselines, one JSON file per run setup. """
+
+
+# ---------------------------------------------------------
+#
+def _ms(values: List[float]) -> Dict[str, float]:
+    return {rank: round(value * 1000, 2) for rank, value in percentiles(values).items()}
+
+
+def build(settings: dict, outcome: dict, latencies: Dict[str, List[float]],
+          db_operations: Dict[str, int]) -> dict:
+    """ Return the benchmark report.
+
+    :param settings: Run settings (mode, backends, flows, concurrency).
+    :param outcome: run_flows result.
+    :param latencies: Latencies per step, in seconds.
+    :param db_operations: DB operations per command during the flows.
+    :return: Report (latencies in milliseconds).
+    """
+    done = len(outcome['flow_latencies'])
+    total = sum(db_operations.values())
+
+    return {
+        'settings': settings,
+        'host': {'machine': platform.machine(), 'python': platform.python_version(),
+                 'node': platform.node()},
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'flows': done,
+        'errors': len(outcome['errors']),
+        'flows_per_second': round(done / outcome['elapsed'], 2) if outcome['elapsed'] else 0.0,
+        'flow_ms': _ms(outcome['flow_latencies']),
+        'step_ms': {step: _ms(latencies[step]) for step in STEPS if latencies.get(step)},
+        'db_operations_per_flow': round(total / done, 2) if done and total else None,
+        'db_operations': db_operations,
+    }
+
+
+# ---------------------------------------------------------
+#
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """ Return the regressions of a report against a baseline.
+
+    Throughput may drop and the p95 latencies may grow by ``tolerance``
+    (a fraction); the DB operations per flow are deterministic and may
+    not grow at all.
+
+    :param report: Current report.
+    :param baseline: Baseline report.
+    :param tolerance: Allowed relative slow down.
+    :return: Regression messages (empty when none).
+    """
+    regressions = []
+
+    if report['flows_per_second'] < baseline['flows_per_second'] * (1 - tolerance):
+        regressions.append(f"throughput {report['flows_per_second']} flows/s, "
+                           f"baseline {baseline['flows_per_second']}")
+
+    timings = [('flow', report['flow_ms'], baseline['flow_ms'])]
+    timings += [(step, report['step_ms'].get(step, {}), values)
+                for step, values in baseline['step_ms'].items()]
+
+    for name, current, reference in timings:
+        if current.get('p95') and reference.get('p95') and \
+                current['p95'] > reference['p95'] * (1 + tolerance):
+            regressions.append(f"{name} p95 {current['p95']} ms, baseline {reference['p95']} ms")
+
+    current, reference = report['db_operations_per_flow'], baseline['db_operations_per_flow']
+
+    if current and reference and current > reference:
+        regressions.append(f'DB operations per flow {current}, baseline {reference}')
+
+    if report['errors'] > baseline['errors']:
+        regressions.append(f"{report['errors']} failed flows, baseline {baseline['errors']}")
+
+    return regressions
+
+
+# ---------------------------------------------------------
+#
+def baseline_path(settings: dict) -> Path:
+    """ Return the baseline file of a run setup. """
+    return BASELINE_DIR / f"{settings['mode']}-{settings['backends']}-c{settings['concurrency']}.json"
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save(report: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+
+# ---------------------------------------------------------
+#
+def render(report: dict) -> str:
+    """ Return the report as a text table. """
+    lines = [f"{report['flows']} flows ({report['errors']} failed), "
+             f"{report['flows_per_second']} flows/s, "
+             f"DB operations per flow: {report['db_operations_per_flow']}",
+             '',
+             f"{'step':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+
+    for name, values in [*report['step_ms'].items(), ('flow', report['flow_ms'])]:
+        lines.append(f"{name:<22}" + ''.join(f"{values.get(rank, 0):>10}"
+                                             for rank in ('p50', 'p95', 'p99')))
+
+    return '\n'.join(lines)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+""" Execution environments of the pipeline benchmark.
+
+``eager`` runs the Celery tasks inside the API request (no broker)
+against in-memory stand-ins (mongomock, fakeredis) or the configured
+local services, and records the task responses instead of publishing
+them. ``worker`` leaves the configuration untouched: tasks go through
+RabbitMQ to a running worker and results are read from the backend.
+"""
+
+# BUILTIN modules
+import functools
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+# Third party modules
+from pymongo import monitoring
+
+# Local modules
+from src.api import database
+from src.tools import redis_client
+from src.tools.response_transport import ResponseTransport, set_transport
+from src.worker.celery_app import WORKER
+
+# Constants
+COLLECTION_OPERATIONS = ('find', 'find_one', 'find_one_and_update', 'insert_one',
+                         'insert_many', 'update_one', 'update_many', 'replace_one',
+                         'delete_one', 'delete_many', 'aggregate', 'count_documents',
+                         'create_index', 'bulk_write')
+""" mongomock Collection methods counted as one DB operation each. """
+
+
+# ------------------------------------------------------------------------
+#
+class RecordingTransport(ResponseTransport):
+    """ Keep the task responses in memory, by job id. """
+
+    name = 'recording'
+
+    def __init__(self):
+        self.responses: Dict[str, dict] = {}
+
+    def send(self, queue: str, message: dict):
+        self.responses[message['job_id']] = message
+
+    def pop(self, job_id: str) -> Optional[dict]:
+        """ Return and forget the response of a job (None when not received). """
+        return self.responses.pop(job_id, None)
+
+
+# ------------------------------------------------------------------------
+#
+class OperationCounter(monitoring.CommandListener):
+    """ Count the DB operations, by command name.
+
+    Registered as a pymongo command listener for a real MongoDB, or
+    wrapped around the mongomock collection methods (see count_mongomock).
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def started(self, event):
+        self.add(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+_DEPTH = threading.local()
+
+
+def count_mongomock(counter: OperationCounter):
+    """ Count the mongomock collection calls made by the application.
+
+    Calls made by mongomock itself (find_one calls find) are not counted,
+    so one counted call matches one driver round trip.
+
+    :param counter: Operation counter.
+    """
+    # Imported here: mongomock is only needed for the in-memory stand-ins.
+    from mongomock.collection import Collection
+
+    def counted(name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            depth = getattr(_DEPTH, 'value', 0)
+
+            if depth == 0:
+                counter.add(name)
+
+            _DEPTH.value = depth + 1
+
+            try:
+                return method(*args, **kwargs)
+
+            finally:
+                _DEPTH.value = depth
+
+        wrapper.__counted__ = True
+        return wrapper
+
+    for name in COLLECTION_OPERATIONS:
+        method = getattr(Collection, name)
+
+        if not getattr(method, '__counted__', False):
+            setattr(Collection, name, counted(name, method))
+
+
+# ---------------------------------------------------------
+#
+def install(mode: str, backends: str, counter: OperationCounter) -> Optional[RecordingTransport]:
+    """ Prepare the process for a benchmark run.
+
+    :param mode: 'eager' (tasks run in the API process) or 'worker'.
+    :param backends: 'memory' (mongomock, fakeredis) or 'local' (configured URLs).
+    :param counter: DB operation counter.
+    :return: Response recorder in eager mode, else None.
+    """
+
+    if backends == 'memory':
+        # Imported here: only needed for the in-memory stand-ins.
+        import fakeredis
+        import mongomock
+
+        count_mongomock(counter)
+        database.set_client(mongomock.MongoClient())
+        redis_client._CLIENT = fakeredis.FakeRedis()
+
+    else:
+        # Only commands sent by this process are seen (not by a worker).
+        monitoring.register(counter)
+        database.reset_client()
+
+    if mode == 'worker':
+        return None
+
+    WORKER.conf.update(task_always_eager=True, task_eager_propagates=False)
+    transport = RecordingTransport()
+    set_transport(transport)
+
+    return transport
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+""" Measure Celery worker throughput for the current worker pool.
+
+Start a worker with the pool to measure, then run the benchmark
+against it, e.g.:
+
+    CELERY_POOL=threads CELERY_CONCURRENCY=16 sh scripts/start_celery.sh
+    python -m benchmarks.worker_pools --tasks 2000
+
+See benchmarks/README.md for the procedure used to compare pools.
+"""
+
+# BUILTIN modules
+import argparse
+from time import perf_counter
+
+# Third party modules
+from celery import group
+
+# Local modules
+from src.worker.celery_app import WORKER
+
+
+# ---------------------------------------------------------
+#
+def run(tasks: int, timeout: float, task: str = 'db_probe', **kwargs) -> dict:
+    """ Enqueue ``tasks`` probe tasks and wait for all of them.
+
+    :param tasks: Number of tasks.
+    :param timeout: Seconds to wait for the results.
+    :param task: Probe task (db_probe or io_probe).
+    :param kwargs: Probe task keyword arguments.
+    :return: Benchmark figures.
+    """
+
+    probe = WORKER.signature(f'tasks.{task}', kwargs=kwargs)
+    started = perf_counter()
+    results = group(probe.clone() for _ in range(tasks)).apply_async()
+    values = results.get(timeout=timeout, propagate=True)
+    elapsed = perf_counter() - started
+
+    return {'tasks': tasks,
+            'seconds': round(elapsed, 2),
+            'tasks_per_second': round(tasks / elapsed, 1),
+            'worker_processes': len({value['pid'] for value in values})}
+
+
+# ---------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--task', choices=('db_probe', 'io_probe'), default='db_probe')
+    parser.add_argument('--delay', type=float, default=0.05, help='io_probe delay')
+    args = parser.parse_args()
+    kwargs = {'delay': args.delay} if args.task == 'io_probe' else {}
+
+    run(args.warmup, args.timeout, args.task, **kwargs)
+    print(run(args.tasks, args.timeout, args.task, **kwargs))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Replay an HTTP traffic capture and compare the outcome with the original.
+
+The capture is written by the API when TRAFFIC_CAPTURE_FILE is set.
+
+    python scripts/replay_traffic.py traffic.ndjson --url http://localhost:8000
+    python scripts/replay_traffic.py traffic.ndjson --speed 4
+    python scripts/replay_traffic.py traffic.ndjson --max --concurrency 100
+
+Requests are sent at their original pacing (divided by --speed), or as
+fast as the connection pool allows with --max. The API key is taken from
+--api-key or SERVICE_API_KEY. Requests whose body was truncated in the
+capture are skipped.
+"""
+
+# BUILTIN modules
+import os
+import re
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+# Third party modules
+import httpx
+
+# Constants
+OBJECT_ID = re.compile(r'/[0-9a-f]{24}(?=/|$)')
+PERCENTILES = (50, 95, 99)
+
+
+# ---------------------------------------------------------
+#
+def load(path: str) -> List[dict]:
+    """ Return the replayable records of a capture, in arrival order. """
+    records, skipped = [], 0
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+
+                if record.get('truncated'):
+                    skipped += 1
+                else:
+                    records.append(record)
+
+    if skipped:
+        print(f'{skipped} requests with a truncated body skipped', file=sys.stderr)
+
+    return sorted(records, key=lambda record: record['t'])
+
+
+def route_of(record: dict) -> str:
+    """ Return the 'METHOD /route' group of a record. """
+    route = record.get('route') or OBJECT_ID.sub('/{id}', record['path'])
+    return f"{record['method']} {route}"
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """ Return the nearest-rank percentiles of the values. """
+    if not values:
+        return {}
+
+    ordered = sorted(values)
+    last = len(ordered) - 1
+
+    return {f'p{rank}': ordered[min(last, max(0, -(-rank * len(ordered) // 100) - 1))]
+            for rank in PERCENTILES}
+
+
+# ---------------------------------------------------------
+#
+async def send(client: httpx.AsyncClient, record: dict) -> dict:
+    """ Send one captured request, return its status and latency. """
+    if 'body_b64' in record:
+        content = base64.b64decode(record['body_b64'])
+    else:
+        content = record.get('body', '').encode('utf-8')
+
+    url = record['path'] + (f"?{record['query']}" if record.get('query') else '')
+    started = time.perf_counter()
+
+    try:
+        response = await client.request(record['method'], url, content=content or None,
+                                        headers=record.get('headers') or {})
+        status = response.status_code
+
+    except httpx.HTTPError as why:
+        status = type(why).__name__
+
+    return {'route': route_of(record), 'status': status,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+async def replay(records: List[dict], url: str, api_key: Optional[str],
+                 speed: Optional[float], concurrency: int, timeout: float,
+                 transport: Optional[httpx.AsyncBaseTransport] = None) -> List[dict]:
+    """ Replay the records, paced by speed (None: as fast as possible).
+
+    :param transport: httpx transport, e.g. ASGITransport for an in-process app.
+    :return: One result per record, in record order.
+    """
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    headers = {'X-API-Key': api_key} if api_key else {}
+    gate = asyncio.Semaphore(concurrency)
+    origin = records[0]['t'] if records else 0
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout,
+                                 headers=headers, transport=transport) as client:
+        began = time.perf_counter()
+
+        async def scheduled(record: dict) -> dict:
+            if speed:
+                delay = (record['t'] - origin) / speed - (time.perf_counter() - began)
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            async with gate:
+                return await send(client, record)
+
+        results = await asyncio.gather(*(scheduled(record) for record in records))
+
+    elapsed = time.perf_counter() - began
+    print(f'Replayed {len(results)} requests in {elapsed:.1f} s '
+          f'({len(results) / elapsed if elapsed else 0:.1f} req/s)')
+
+    return results
+
+
+# ---------------------------------------------------------
+#
+def compare(records: List[dict], results: List[dict]) -> Dict[str, dict]:
+    """ Return per route: count, matching status share, original and replay latencies. """
+    groups = defaultdict(lambda: {'original': [], 'replay': [], 'match': 0,
+                                  'mismatches': Counter()})
+
+    for record, result in zip(records, results):
+        for key in (result['route'], 'ALL'):
+            group = groups[key]
+            group['original'].append(record['duration_ms'])
+            group['replay'].append(result['duration_ms'])
+
+            if result['status'] == record['status']:
+                group['match'] += 1
+            else:
+                group['mismatches'][f"{record['status']}->{result['status']}"] += 1
+
+    return {key: {'count': len(group['original']),
+                  'status_match': round(group['match'] / len(group['original']), 4),
+                  'mismatches': dict(group['mismatches']),
+                  'original_ms': percentiles(group['original']),
+                  'replay_ms': percentiles(group['replay'])}
+            for key, group in sorted(groups.items())}
+
+
+def render(comparison: Dict[str, dict]) -> str:
+    """ Return the comparison as a text table. """
+    lines = [f"{'route':<48} {'count':>6} {'match':>6}  "
+             + '  '.join(f'{f"p{rank} orig/replay":>20}' for rank in PERCENTILES)]
+
+    for key, row in comparison.items():
+        cells = [f"{row['original_ms'].get(f'p{rank}', 0):>9.1f}/"
+                 f"{row['replay_ms'].get(f'p{rank}', 0):<10.1f}" for rank in PERCENTILES]
+        lines.append(f"{key:<48} {row['count']:>6} {row['status_match']:>6.1%}  "
+                     + '  '.join(cells))
+
+        if row['mismatches']:
+            lines.append(f"{'':<48} status changes: {row['mismatches']}")
+
+    return '\n'.join(lines)
+
+
+# ---------------------------------------------------------
+#
+def main():
+    parser = argparse.ArgumentParser(description='Replay an HTTP traffic capture.')
+    parser.add_argument('capture', help='NDJSON capture (TRAFFIC_CAPTURE_FILE).')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--api-key', default=os.getenv('SERVICE_API_KEY'))
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument('--speed', type=float, default=1.0,
+                        help='Pacing factor: 1 original pacing, 4 four times faster.')
+    pacing.add_argument('--max', action='store_true', help='No pacing: maximum throughput.')
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='Connection pool size and maximum requests in flight.')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--json', action='store_true', help='Print the comparison as JSON.')
+    args = parser.parse_args()
+
+    records = load(args.capture)
+
+    if not records:
+        sys.exit('Nothing to replay.')
+
+    results = asyncio.run(replay(records, args.url, args.api_key,
+                                 None if args.max else args.speed,
+                                 args.concurrency, args.timeout))
+    comparison = compare(records, results)
+    print(json.dumps(comparison, indent=2) if args.json else render(comparison))
+
+
+if __name__ == '__main__':
+    main()
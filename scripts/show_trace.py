@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Print the span tree of traces written by the file span exporter.
+
+    python scripts/show_trace.py traces.ndjson [trace_id]
+
+Without trace id, the slowest traces are listed.
+"""
+
+# BUILTIN modules
+import sys
+import json
+from collections import defaultdict
+
+
+# ---------------------------------------------------------
+#
+def load(path: str) -> dict:
+    """ Return the spans of the file, grouped by trace id. """
+    traces = defaultdict(list)
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                span = json.loads(line)
+                traces[span['trace_id']].append(span)
+
+    return traces
+
+
+# ---------------------------------------------------------
+#
+def print_tree(spans: list):
+    """ Print the spans of one trace, children indented under their parent. """
+    children = defaultdict(list)
+    ids = {span['span_id'] for span in spans}
+    origin = min(span['start'] for span in spans)
+
+    for span in spans:
+        parent = span['parent_id'] if span['parent_id'] in ids else None
+        children[parent].append(span)
+
+    def walk(parent, depth):
+        for span in sorted(children[parent], key=lambda item: item['start']):
+            offset = (span['start'] - origin) / 1e6
+            print(f"{offset:10.1f} ms {span['duration_ms']:10.1f} ms  "
+                  f"{'  ' * depth}{span['name']} [{span['status']}] pid={span['pid']}")
+            walk(span['span_id'], depth + 1)
+
+    walk(None, 0)
+
+
+# ---------------------------------------------------------
+
+if __name__ == "__main__":
+    traces = load(sys.argv[1])
+
+    if len(sys.argv) > 2:
+        print_tree(traces[sys.argv[2]])
+
+    else:
+        def elapsed(spans):
+            return (max(span['end'] for span in spans) - min(span['start'] for span in spans)) / 1e6
+
+        for trace_id, spans in sorted(traces.items(), key=lambda item: -elapsed(item[1]))[:20]:
+            print(f'{trace_id}  {elapsed(spans):10.1f} ms  {len(spans)} spans')
@@ -1,3 +1,7 @@
 #/bin/bash
 
-celery -A src.worker.celery_app worker -l info --pool=solo -E
+# CELERY_POOL: prefork (default), threads, gevent or solo (gevent suits the
+# I/O bound tasks: use a high concurrency, e.g. CELERY_CONCURRENCY=500).
+# CELERY_CONCURRENCY: child processes/threads/greenlets (default: CPU count).
+celery -A src.worker.celery_app worker -l info --pool=${CELERY_POOL:-prefork} \
+    ${CELERY_CONCURRENCY:+--concurrency=$CELERY_CONCURRENCY} -E
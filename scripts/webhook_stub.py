@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Local webhook receiver, for the tests and for trying the webhook delivery.
+
+Answers every POST with 202, records the received responses and, when
+started with a batch size, advertises it with the X-Webhook-Batch-Max
+header so the workers batch their deliveries:
+
+    python scripts/webhook_stub.py --port 8001 --batch-max 50
+    python scripts/webhook_stub.py --port 8001 --fail-rate 0.2
+
+Requests are sent with ``X-Reply-To: http://localhost:8001/v1/response``.
+"""
+
+# BUILTIN modules
+import json
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List, Optional
+
+# Constants
+BATCH_HEADER = 'X-Webhook-Batch-Max'
+""" Answer header advertising the batch size accepted. """
+
+
+# ---------------------------------------------------------
+#
+class WebhookStub:
+    """ Threaded HTTP receiver recording the POSTed responses.
+
+    The first answers can be scripted (e.g. 503 twice to exercise the
+    retries), the following ones are 202 (or 503 at fail_rate).
+    """
+
+    def __init__(self, port: int = 0, batch_max: int = 1,
+                 statuses: Iterable[int] = (), fail_rate: float = 0.0,
+                 retry_after: Optional[int] = None, echo: bool = False):
+        """ The class initializer.
+
+        :param port: Listening port (0: any free port).
+        :param batch_max: Advertised batch size (1: not advertised).
+        :param statuses: Scripted first answers.
+        :param fail_rate: Share of 503 answers after the scripted ones.
+        :param retry_after: Retry-After seconds sent with the failed answers.
+        :param echo: Print the received responses.
+        """
+        self.batch_max = batch_max
+        self.statuses = deque(statuses)
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+        self.echo = echo
+        self.messages: List[dict] = []
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1/response'
+
+    def _answer(self) -> int:
+        with self._lock:
+            if self.statuses:
+                return self.statuses.popleft()
+
+        return 503 if random.random() < self.fail_rate else 202
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive: the workers reuse their pooled connections.
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'] or 0)))
+                status = stub._answer()
+                received = body if isinstance(body, list) else [body]
+
+                with stub._lock:
+                    stub.requests.append({'status': status, 'size': len(received),
+                                          'headers': dict(self.headers)})
+
+                    if 200 <= status < 300:
+                        stub.messages.extend(received)
+
+                if stub.echo:
+                    print(f'[{status}] received {len(received)}: {body}')
+
+                self.send_response(status)
+
+                if stub.batch_max > 1:
+                    self.send_header(BATCH_HEADER, str(stub.batch_max))
+
+                if status >= 400 and stub.retry_after is not None:
+                    self.send_header('Retry-After', str(stub.retry_after))
+
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *_):
+                pass
+
+        return Handler
+
+    def start(self) -> 'WebhookStub':
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='webhook-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+
+        self._server.server_close()
+
+    def __enter__(self) -> 'WebhookStub':
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+# ---------------------------------------------------------
+#
+def main():
+    parser = argparse.ArgumentParser(description='Local webhook receiver.')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--batch-max', type=int, default=1,
+                        help='Advertised batch size (1: one response per POST).')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='Share of the requests answered with 503.')
+    parser.add_argument('--retry-after', type=int, help='Retry-After seconds of a 503.')
+    args = parser.parse_args()
+
+    stub = WebhookStub(args.port, args.batch_max, fail_rate=args.fail_rate,
+                       retry_after=args.retry_after, echo=True)
+    print(f'Listening on {stub.url}')
+
+    try:
+        stub._server.serve_forever()
+
+    except KeyboardInterrupt:
+        stub._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
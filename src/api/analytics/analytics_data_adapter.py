@@ -0,0 +1,239 @@
+# BUILTIN modules
+import random
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Third party modules
+from pymongo import ASCENDING, DESCENDING
+
+# Local modules
+from . import durations
+from ..database import db
+from ...tools.metrics import instrument_repository
+
+# Constants
+VIEWS = ('orders_by_status', 'orders_by_service', 'orders_per_month', 'orders_reached',
+         'quotations_by_status', 'realisations_by_status',
+         'realisations_completed_per_month', 'revenue_per_month')
+""" Counter views, fields of the shard documents of the analytics_counters collection. """
+
+COUNTER_SHARDS = 16
+""" Counter documents, an event increments one of them at random. """
+
+ALL = 'all'
+""" Month and service of the time-in-status histograms covering every month or service. """
+
+
+# ---------------------------------------------------------
+#
+def _nest(values: Dict[str, float]) -> dict:
+    """ Turn 'month.service' bucket paths into nested documents. """
+    nested = {}
+
+    for path, amount in values.items():
+        *parents, leaf = path.split('.')
+        node = nested
+
+        for parent in parents:
+            node = node.setdefault(parent, {})
+
+        node[leaf] = amount
+
+    return nested
+
+
+def _add(total: dict, values: dict):
+    """ Add the (nested) buckets of a shard to the totals. """
+    for key, amount in values.items():
+        if isinstance(amount, dict):
+            _add(total.setdefault(key, {}), amount)
+        else:
+            total[key] = total.get(key, 0) + amount
+
+
+@instrument_repository
+class AnalyticsRepository:
+    """ This class implements the data layer adapter for the analytics views.
+
+    The counter views are split in COUNTER_SHARDS documents
+    ``{_id: 'views:<shard>', <view>: {<bucket>: amount}, updated}`` whose
+    buckets (status, service, month or month.service) are changed with
+    ``$inc``: an event updates all its views in one atomic write on a
+    random shard, so the API processes and workers do not all lock the
+    same document, and the views are read by summing the shards,
+    COUNTER_SHARDS documents whatever the number of orders.
+    Employee involvement scores are one document per employee, read
+    through an index on the score.
+
+    Time-in-status histograms (see durations) are one document per
+    entity, status and month, plus one for all months, holding one
+    histogram per service and one for all services.
+    """
+
+    COUNTERS = 'analytics_counters'
+    EMPLOYEE_SCORES = 'analytics_employee_scores'
+    STATUS_DURATIONS = 'analytics_status_durations'
+
+    def __init__(self):
+        self._indexed = False
+        self._durations_indexed = False
+        self._counters_indexed = False
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def scores(self):
+        """ Return the employee scores collection (indexed on score). """
+        collection = db[self.EMPLOYEE_SCORES]
+
+        if not self._indexed:
+            collection.create_index([('score', DESCENDING)])
+            self._indexed = True
+
+        return collection
+
+    @property
+    def counters(self):
+        """ Return the counter shards collection (indexed on the last update). """
+        collection = db[self.COUNTERS]
+
+        if not self._counters_indexed:
+            collection.create_index([('updated', DESCENDING)])
+            self._counters_indexed = True
+
+        return collection
+
+    @property
+    def status_durations(self):
+        """ Return the time-in-status collection (indexed on entity and month). """
+        collection = db[self.STATUS_DURATIONS]
+
+        if not self._durations_indexed:
+            collection.create_index([('entity', ASCENDING), ('month', ASCENDING)])
+            self._durations_indexed = True
+
+        return collection
+
+    # ---------------------------------------------------------
+    #
+    def increment(self, buckets: Dict[str, Dict[str, float]],
+                  scores: Dict[str, int] = None):
+        """ Add amounts to view buckets and employee scores (upserted).
+
+        :param buckets: {view: {bucket path: amount}}, e.g.
+            {'orders_by_status': {'underReview': -1, 'orderAccepted': 1}}.
+        :param scores: {employee_id: amount}.
+        """
+
+        if amounts := {f'{view}.{path}': amount for view, values in buckets.items()
+                       for path, amount in values.items()}:
+            self.counters.update_one(
+                {'_id': f'views:{random.randrange(COUNTER_SHARDS)}'},
+                {'$inc': amounts, '$currentDate': {'updated': True}}, upsert=True)
+
+        for employee_id, amount in (scores or {}).items():
+            self.scores.update_one({'_id': employee_id}, {'$inc': {'score': amount}},
+                                   upsert=True)
+
+    # ---------------------------------------------------------
+    #
+    def read_views(self) -> Dict[str, dict]:
+        """ Return the buckets of every counter view.
+
+        :return: {view: buckets}, empty buckets for a view never written.
+        """
+        views = {view: {} for view in VIEWS}
+
+        for shard in self.counters.find({}, {'updated': 0}):
+            for view in VIEWS:
+                _add(views[view], shard.get(view, {}))
+
+        return views
+
+    # ---------------------------------------------------------
+    #
+    def top_employees(self, limit: int) -> List[Tuple[str, int]]:
+        """ Return the employees with the highest involvement scores.
+
+        :param limit: Number of employees.
+        :return: (employee_id, score) pairs, best first.
+        """
+        cursor = self.scores.find({}, sort=[('score', DESCENDING)], limit=limit)
+
+        return [(document['_id'], document['score']) for document in cursor]
+
+    # ---------------------------------------------------------
+    #
+    def replace(self, views: Dict[str, Dict[str, float]], scores: Dict[str, int]):
+        """ Replace every view and score (rebuild from the source collections).
+
+        :param views: {view: {bucket path: amount}}.
+        :param scores: {employee_id: score}.
+        """
+        document = {view: _nest(views.get(view, {})) for view in VIEWS}
+        document['_id'], document['updated'] = 'views:0', datetime.utcnow()
+
+        self.counters.delete_many({})
+        self.counters.insert_one(document)
+
+        self.scores.delete_many({})
+
+        if scores:
+            self.scores.insert_many([{'_id': employee_id, 'score': score}
+                                     for employee_id, score in scores.items()])
+
+    # ---------------------------------------------------------
+    #
+    def add_duration(self, entity: str, status: str, service: str, month: str,
+                     seconds: float):
+        """ Add the time spent in a status to its histograms (two upserts).
+
+        :param entity: 'orders', 'quotations' or 'realisations'.
+        :param status: Status that was left.
+        :param service: Service of the order.
+        :param month: 'YYYY-MM' month the status was left.
+        :param seconds: Time spent in the status.
+        """
+        index = durations.bucket(seconds)
+        amounts = {}
+
+        for scope in (service, ALL):
+            amounts[f'services.{scope}.count'] = 1
+            amounts[f'services.{scope}.sum'] = seconds
+            amounts[f'services.{scope}.buckets.{index}'] = 1
+
+        for period in (month, ALL):
+            self.status_durations.update_one(
+                {'_id': f'{entity}:{status}:{period}'},
+                {'$inc': amounts,
+                 '$setOnInsert': {'entity': entity, 'status': status, 'month': period}},
+                upsert=True)
+
+    # ---------------------------------------------------------
+    #
+    def replace_durations(self, documents: List[dict]):
+        """ Replace every time-in-status histogram (rebuild from the histories).
+
+        :param documents: Histogram documents, as written by add_duration.
+        """
+        self.status_durations.delete_many({})
+
+        if documents:
+            self.status_durations.insert_many(documents)
+
+    # ---------------------------------------------------------
+    #
+    def read_durations(self, entity: str, month: str = ALL) -> Dict[str, Dict[str, dict]]:
+        """ Return the time-in-status statistics of an entity.
+
+        :param entity: 'orders', 'quotations' or 'realisations'.
+        :param month: 'YYYY-MM' or 'all'.
+        :return: {status: {service or 'all': count, mean, p50, p90, p99 (seconds)}}.
+        """
+        cursor = self.status_durations.find({'entity': entity, 'month': month})
+
+        return {document['status']: {
+                    service: durations.summarize(histogram['count'], histogram['sum'],
+                                                 histogram.get('buckets', {}))
+                    for service, histogram in document.get('services', {}).items()}
+                for document in cursor}
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+""" Incrementally maintained analytics views.
+
+The repositories report every creation and status transition here and
+the matching view buckets are updated with ``$inc`` (see
+AnalyticsRepository), so the dashboard reads O(buckets) documents
+instead of scanning the orders, quotations and realisations.
+
+Transitions also add the time spent in the status that was left to
+the time-in-status histograms of the entity, per service and month.
+
+A failed view update is logged and never fails the business operation;
+``rebuild`` recomputes every view and histogram from the source collections.
+"""
+
+# BUILTIN modules
+from datetime import datetime
+from collections import defaultdict
+from typing import Dict, Optional
+
+# Third party modules
+from bson import ObjectId
+from loguru import logger
+
+# Local modules
+from ..database import db
+from ..orders.models import OrderStatus
+from ..quotations.models import QuotationStatus
+from ..realisations.models import RealisationStatus
+from . import durations
+from .analytics_data_adapter import AnalyticsRepository, ALL
+
+# Constants
+EMPLOYEE_ORDER_STATUSES = {OrderStatus.ORAC, OrderStatus.OREJ,
+                           OrderStatus.REST, OrderStatus.RECO}
+""" Order transitions made by an employee (the others are the customer's). """
+
+EMPLOYEE_QUOTATION_STATUSES = {QuotationStatus.QVAL, QuotationStatus.QCAN}
+""" Quotation transitions made by an employee. """
+
+ANALYTICS = AnalyticsRepository()
+
+
+# ---------------------------------------------------------
+#
+def _value(status) -> str:
+    """ Return the plain value of a status enum member or string. """
+    return getattr(status, 'value', status)
+
+
+def _month(when) -> str:
+    """ Return the 'YYYY-MM' bucket of a datetime or ISO timestamp. """
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+
+    return when.strftime('%Y-%m')
+
+
+def _entered(before: dict, start_field: str) -> Optional[datetime]:
+    """ Return when a document entered its current status.
+
+    :param before: Document with its last history entry (or its whole history).
+    :param start_field: Creation time field, used when the history is empty.
+    """
+    history = before.get('update_history') or []
+    when = history[-1]['when'] if history else before.get(start_field)
+
+    return datetime.fromisoformat(when) if isinstance(when, str) else when
+
+
+def _order_service(before: dict) -> Optional[str]:
+    """ Return the service of a quotation or realisation.
+
+    The service is copied from the order at creation, only the documents
+    created before that are looked up in the orders.
+    """
+    if service := before.get('service'):
+        return _value(service)
+
+    order = db.orders.find_one({'_id': ObjectId(before['order_id'])}, {'service': 1})
+    return _value(order['service']) if order else None
+
+
+def _record_duration(entity: str, before: dict, start_field: str,
+                     service: Optional[str], when: datetime):
+    try:
+        entered = _entered(before, start_field)
+
+        if entered is not None and service is not None:
+            ANALYTICS.add_duration(entity, _value(before['status']), service,
+                                   _month(when), (when - entered).total_seconds())
+
+    except Exception as why:
+        logger.error(f'Time in status not recorded for {entity}: {why}')
+
+
+def _apply(event: str, buckets: Dict[str, Dict[str, float]],
+           scores: Optional[Dict[str, int]] = None):
+    try:
+        ANALYTICS.increment(buckets, scores)
+
+    except Exception as why:
+        # The views drift until the next rebuild, the operation itself succeeded.
+        logger.error(f'Analytics update failed for {event}: {why}')
+
+
+# ---------------------------------------------------------
+#
+def order_created(order: dict):
+    """ Count a new order.
+
+    :param order: Stored order document.
+    """
+    service, month = _value(order['service']), _month(order['created'])
+
+    _apply('order creation', {
+        'orders_by_status': {_value(order['status']): 1},
+        'orders_by_service': {service: 1},
+        'orders_per_month': {f'{month}.{service}': 1},
+        'orders_reached': {_value(order['status']): 1}})
+
+
+def order_transition(before: dict, new_status: OrderStatus, author_id: str,
+                     when: datetime):
+    """ Move an order between status buckets, record its time in the status left.
+
+    :param before: Order before the transition (status, service, created, last history entry).
+    :param new_status: New order status.
+    :param author_id: Author of the transition.
+    :param when: Transition time.
+    """
+    if _value(before['status']) == _value(new_status):
+        return
+
+    scores = {str(author_id): 1} if new_status in EMPLOYEE_ORDER_STATUSES else None
+
+    _apply('order transition', {
+        'orders_by_status': {_value(before['status']): -1, _value(new_status): 1},
+        'orders_reached': {_value(new_status): 1}},
+        scores)
+    _record_duration('orders', before, 'created', _value(before.get('service')), when)
+
+
+# ---------------------------------------------------------
+#
+def quotation_created(quotation: dict):
+    """ Count a new quotation.
+
+    :param quotation: Stored quotation document.
+    """
+    _apply('quotation creation', {
+        'quotations_by_status': {_value(quotation['status']): 1}})
+
+
+def quotation_transition(before: dict, new_status: QuotationStatus, author_id: str,
+                         when: datetime):
+    """ Move a quotation between status buckets, book the revenue on acceptance.
+
+    The revenue month is the quotation creation month.
+
+    :param before: Quotation before the transition (order_id, service, price, created,
+        status, history).
+    :param new_status: New quotation status.
+    :param author_id: Author of the transition.
+    :param when: Transition time.
+    """
+    if _value(before['status']) == _value(new_status):
+        return
+
+    buckets = {'quotations_by_status': {_value(before['status']): -1,
+                                        _value(new_status): 1}}
+    scores = {str(author_id): 1} if new_status in EMPLOYEE_QUOTATION_STATUSES else None
+    service = _order_service(before)
+
+    if new_status == QuotationStatus.QACC and service:
+        buckets['revenue_per_month'] = {
+            f"{_month(before['created'])}.{service}": before['price']}
+
+    _apply('quotation transition', buckets, scores)
+    _record_duration('quotations', before, 'created', service, when)
+
+
+# ---------------------------------------------------------
+#
+def realisation_created(realisation: dict):
+    """ Count a new realisation, it scores for its employee.
+
+    :param realisation: Stored realisation document.
+    """
+    _apply('realisation creation', {
+        'realisations_by_status': {_value(realisation['status']): 1}},
+        {str(realisation['employee_id']): 1})
+
+
+def realisation_transition(before: dict, new_status: RealisationStatus, when: datetime):
+    """ Move a realisation between status buckets, count completions per month.
+
+    :param before: Realisation before the transition (order_id, service, status, history).
+    :param new_status: New realisation status.
+    :param when: Transition time.
+    """
+    if _value(before['status']) == _value(new_status):
+        return
+
+    buckets = {'realisations_by_status': {_value(before['status']): -1,
+                                          _value(new_status): 1}}
+
+    if new_status == RealisationStatus.RCOM:
+        buckets['realisations_completed_per_month'] = {_month(when): 1}
+
+    _apply('realisation transition', buckets)
+    _record_duration('realisations', before, 'assignment_date',
+                     _order_service(before), when)
+
+
+# ---------------------------------------------------------
+#
+def _replay_durations(histograms: Dict[str, dict], entity: str, document: dict,
+                      initial: str, start_field: str, service: Optional[str]):
+    """ Add the times in status of a document history to the rebuilt histograms.
+
+    Replays _record_duration: each entry changing the status adds the
+    time spent in the status it left, entries keeping the status only
+    restart the clock.
+
+    :param histograms: {histogram id: duration document}, updated in place.
+    :param entity: 'orders', 'quotations' or 'realisations'.
+    :param document: Source document with its start field and history (new_status, when).
+    :param initial: Status the document was created with.
+    :param start_field: Creation time field.
+    :param service: Service of the order, no durations without one.
+    """
+    status, entered = initial, document.get(start_field)
+
+    if isinstance(entered, str):
+        entered = datetime.fromisoformat(entered)
+
+    for entry in document.get('update_history') or []:
+        new_status, when = _value(entry['new_status']), entry['when']
+
+        if isinstance(when, str):
+            when = datetime.fromisoformat(when)
+
+        if new_status != status and entered is not None and service is not None:
+            seconds = (when - entered).total_seconds()
+            index = str(durations.bucket(seconds))
+
+            for period in (_month(when), ALL):
+                key = f'{entity}:{status}:{period}'
+                histogram = histograms.setdefault(key, {
+                    '_id': key, 'entity': entity, 'status': status, 'month': period,
+                    'services': {}})
+
+                for scope in (service, ALL):
+                    values = histogram['services'].setdefault(
+                        scope, {'count': 0, 'sum': 0, 'buckets': {}})
+                    values['count'] += 1
+                    values['sum'] += seconds
+                    values['buckets'][index] = values['buckets'].get(index, 0) + 1
+
+        status, entered = new_status, when
+
+
+def rebuild() -> dict:
+    """ Recompute every view from the source collections.
+
+    One pass over each collection (status, service, dates and history),
+    replaying the rules of the incremental updates, the time-in-status
+    histograms included. Orders are read first: their services are kept
+    by id for the quotations and realisations.
+    Updates made while the rebuild runs may be lost: run it when the
+    views are known to have drifted, in a quiet period.
+
+    :return: Number of documents read per collection.
+    """
+    views = defaultdict(lambda: defaultdict(int))
+    scores = defaultdict(int)
+    histograms = {}
+    services = {}
+    counts = {}
+    employee_orders = {status.value for status in EMPLOYEE_ORDER_STATUSES}
+    employee_quotations = {status.value for status in EMPLOYEE_QUOTATION_STATUSES}
+
+    counts['orders'] = 0
+
+    for order in db.orders.find({}, {'status': 1, 'service': 1, 'created': 1,
+                                     'update_history.new_status': 1,
+                                     'update_history.by': 1, 'update_history.when': 1}):
+        service = _value(order['service'])
+        services[str(order['_id'])] = service
+        views['orders_by_status'][_value(order['status'])] += 1
+        views['orders_by_service'][service] += 1
+        views['orders_per_month'][f"{_month(order['created'])}.{service}"] += 1
+        counts['orders'] += 1
+
+        # Orders are created under review, the history holds the later statuses.
+        reached = {OrderStatus.UREV.value, _value(order['status'])}
+        reached.update(_value(entry['new_status'])
+                       for entry in order.get('update_history') or [])
+
+        for status in reached:
+            views['orders_reached'][status] += 1
+
+        for entry in order.get('update_history') or []:
+            if _value(entry['new_status']) in employee_orders:
+                scores[str(entry['by'])] += 1
+
+        _replay_durations(histograms, 'orders', order, OrderStatus.UREV.value,
+                          'created', service)
+
+    counts['quotations'] = 0
+
+    for quotation in db.quotations.find({}, {'status': 1, 'order_id': 1, 'price': 1,
+                                             'created': 1, 'update_history.new_status': 1,
+                                             'update_history.by': 1,
+                                             'update_history.when': 1}):
+        status = _value(quotation['status'])
+        service = services.get(str(quotation['order_id']))
+        views['quotations_by_status'][status] += 1
+        counts['quotations'] += 1
+
+        if status == QuotationStatus.QACC.value and service:
+            views['revenue_per_month'][f"{_month(quotation['created'])}.{service}"] += \
+                quotation['price']
+
+        for entry in quotation.get('update_history') or []:
+            if _value(entry['new_status']) in employee_quotations:
+                scores[str(entry['by'])] += 1
+
+        _replay_durations(histograms, 'quotations', quotation, QuotationStatus.QUREV.value,
+                          'created', service)
+
+    counts['realisations'] = 0
+
+    for realisation in db.realisations.find({}, {'status': 1, 'employee_id': 1, 'order_id': 1,
+                                                 'assignment_date': 1, 'update_history': 1}):
+        views['realisations_by_status'][_value(realisation['status'])] += 1
+        scores[str(realisation['employee_id'])] += 1
+        counts['realisations'] += 1
+
+        for entry in realisation.get('update_history') or []:
+            if _value(entry['new_status']) == RealisationStatus.RCOM.value:
+                views['realisations_completed_per_month'][_month(entry['when'])] += 1
+
+        _replay_durations(histograms, 'realisations', realisation,
+                          RealisationStatus.RSCH.value, 'assignment_date',
+                          services.get(str(realisation['order_id'])))
+
+    ANALYTICS.replace(views, scores)
+    ANALYTICS.replace_durations(list(histograms.values()))
+    logger.info(f'Analytics views rebuilt from {counts}')
+
+    return counts
+
+
+# ---------------------------------------------------------
+#
+def summary() -> dict:
+    """ Return every counter view (one read of the counter shards). """
+    return ANALYTICS.read_views()
+
+
+def time_in_status(entity: str, month: str = 'all') -> dict:
+    """ Return the time-in-status statistics of an entity (one read per status).
+
+    :param entity: 'orders', 'quotations' or 'realisations'.
+    :param month: 'YYYY-MM' month the statuses were left, or 'all'.
+    """
+    return {'entity': entity, 'month': month,
+            'statuses': ANALYTICS.read_durations(entity, month)}
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+""" Log-linear duration histograms (HDR style) for the time-in-status views.
+
+A duration in seconds falls in bucket ``floor(log2(seconds) * SUB_BUCKETS) + 1``
+(bucket 0 holds everything under one second), so a histogram is a small
+``{bucket: count}`` mapping that can be updated with ``$inc`` and whose
+percentiles are read in constant time with a relative error below
+``2 ** (1 / SUB_BUCKETS) - 1`` (about 9 %).
+"""
+
+# BUILTIN modules
+import math
+from typing import Dict
+
+# Constants
+SUB_BUCKETS = 8
+""" Buckets per power of two. """
+
+MAX_BUCKET = 30 * SUB_BUCKETS
+""" Last bucket (2**30 seconds, about 34 years): longer durations are clamped. """
+
+PERCENTILES = (50, 90, 99)
+""" Reported percentiles. """
+
+
+# ---------------------------------------------------------
+#
+def bucket(seconds: float) -> int:
+    """ Return the histogram bucket of a duration.
+
+    :param seconds: Duration, negative values count as zero.
+    """
+    if seconds < 1:
+        return 0
+
+    return min(MAX_BUCKET, int(math.log2(seconds) * SUB_BUCKETS) + 1)
+
+
+def upper_bound(index: int) -> float:
+    """ Return the upper duration of a bucket in seconds. """
+    return 2 ** (index / SUB_BUCKETS)
+
+
+# ---------------------------------------------------------
+#
+def summarize(count: int, total: float, buckets: Dict[str, int]) -> dict:
+    """ Return the statistics of one histogram.
+
+    :param count: Number of durations.
+    :param total: Sum of the durations in seconds.
+    :param buckets: {bucket index (string, as stored): count}.
+    :return: count, mean and p50/p90/p99 in seconds (percentiles are bucket upper bounds).
+    """
+    if not count:
+        return {'count': 0}
+
+    ordered = sorted((int(index), amount) for index, amount in buckets.items())
+    result = {'count': count, 'mean': round(total / count, 3)}
+
+    for rank in PERCENTILES:
+        wanted, seen = math.ceil(rank * count / 100), 0
+
+        for index, amount in ordered:
+            seen += amount
+
+            if seen >= wanted:
+                result[f'p{rank}'] = round(upper_bound(index), 3)
+                break
+
+    return result
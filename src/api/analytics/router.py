@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from kombu.exceptions import OperationalError
+from loguru import logger
+
+from ..models import ProcessResponseModel, UnknownError
+from ...tools.security import validate_authentication
+from ...tools.admission import admit_report
+from ...tools.task_queue import TaskRef
+
+
+# Tasks, sent by name (registered in src/worker/analytics_tasks.py).
+analytics_summary_processor = TaskRef('tasks.analytics_summary')
+rebuild_analytics_processor = TaskRef('tasks.rebuild_analytics')
+analytics_time_in_status_processor = TaskRef('tasks.analytics_time_in_status')
+
+# Create API router
+ROUTER = APIRouter(prefix="/v1/analytics", tags=["Analytics"])
+
+
+# Endpoint for reading the analytics views
+@ROUTER.get(
+    "/summary",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_report)]
+)
+async def get_analytics_summary() -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing to read the views
+        result = analytics_summary_processor.delay()
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
+
+
+# Endpoint for reading the time-in-status percentiles
+@ROUTER.get(
+    "/time-in-status",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_report)]
+)
+async def get_time_in_status(
+        entity: Literal['orders', 'quotations', 'realisations'] = 'orders',
+        month: str = Query('all', pattern=r'^(all|\d{4}-\d{2})$')) -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing to read the histograms
+        result = analytics_time_in_status_processor.delay(entity, month)
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
+
+
+# Endpoint for recomputing the analytics views from the source collections
+@ROUTER.post(
+    "/rebuild",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_report)]
+)
+async def rebuild_analytics() -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing of the rebuild
+        result = rebuild_analytics_processor.delay()
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
@@ -1,7 +1,9 @@
 # Local modules
 from .models import CustomerModel
 from ..database import db, BaseRepository
+from ...tools.metrics import instrument_repository
 
+@instrument_repository
 class CustomersRepository(BaseRepository[CustomerModel]):
     def __init__(self):
         super().__init__(db,"customers")
\ No newline at end of file
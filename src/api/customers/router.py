@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Depends
 from kombu.exceptions import OperationalError
@@ -9,9 +9,16 @@ from loguru import logger
 from .models import CustomerCreateModel
 from ..models import ProcessResponseModel, UnknownError
 from ...tools.security import validate_authentication
-from ...worker.customers_tasks import create_customer_processor, read_customer_processor, list_customers_processor
+from ...tools.admission import admit_critical, admit_read, admit_report
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
 
 
+# Tasks, sent by name (registered in src/worker/customers_tasks.py).
+create_customer_processor = TaskRef('tasks.create_customer')
+read_customer_processor = TaskRef('tasks.read_customer')
+list_customers_processor = TaskRef('tasks.list_customers')
+
 # Create API router
 router = APIRouter(prefix="/v1/customers", tags=["Customers"])
 
@@ -22,12 +29,14 @@ router = APIRouter(prefix="/v1/customers", tags=["Customers"])
     status_code=202,
     response_model=ProcessResponseModel,
     responses={500: {"model": UnknownError}},
-    dependencies=[Depends(validate_authentication)]
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)]
 )
-async def create_customer(payload: CustomerCreateModel) -> ProcessResponseModel:
+def create_customer(payload: CustomerCreateModel,
+                    key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     try:
         # Trigger Celery task processing of the payload
-        result = create_customer_processor.delay(payload.model_dump())
+        result = enqueue(create_customer_processor, payload.model_dump(), key=key)
         logger.debug(f"Added task [{result.id}] to Celery for processing")
         return ProcessResponseModel(status=result.state, id=result.id)
     except OperationalError as e:
@@ -42,7 +51,8 @@ async def create_customer(payload: CustomerCreateModel) -> ProcessResponseModel:
     status_code=202,
     response_model=ProcessResponseModel,
     responses={500: {"model": UnknownError}},
-    dependencies=[Depends(validate_authentication)]
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_read)]
 )
 async def get_customer(customer_id: str) -> ProcessResponseModel:
     try:
@@ -63,7 +73,8 @@ async def get_customer(customer_id: str) -> ProcessResponseModel:
     status_code=202,
     response_model=ProcessResponseModel,
     responses={500: {"model": UnknownError}},
-    dependencies=[Depends(validate_authentication)]
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_report)]
 )
 async def list_customers() -> ProcessResponseModel:
     try:
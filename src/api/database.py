@@ -2,7 +2,7 @@ from typing import Generic, List
 from typing import List, TypeVar, Generic
 from bson import ObjectId
 from fastapi import HTTPException, status
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from typing import Annotated
 from pydantic import BeforeValidator
 from typing import List, Optional
@@ -10,11 +10,94 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
 
+import os
+import threading
+
 from ..config.setup import config
 
-client = MongoClient(config.mongo_url)
+# The client is created on first use in each process: pymongo is not
+# fork-safe, so a client created before a (Celery prefork) fork must
+# not be used by the children.
+_CLIENT: Optional[MongoClient] = None
+_CLIENT_PID: Optional[int] = None
+_CLIENT_OPTIONS: dict = {}
+_LOCK = threading.Lock()
+
+
+def configure_client(**options):
+    """ Set the MongoClient options (e.g. maxPoolSize) used for new clients.
+
+    :param options: MongoClient keyword options.
+    """
+    _CLIENT_OPTIONS.clear()
+    _CLIENT_OPTIONS.update(options)
+
+
+def get_client() -> MongoClient:
+    """ Return the MongoClient of the current process, creating it when needed. """
+    global _CLIENT, _CLIENT_PID
+
+    if _CLIENT is None or _CLIENT_PID != os.getpid():
+        with _LOCK:
+            if _CLIENT is None or _CLIENT_PID != os.getpid():
+                # A client inherited from the parent process is dropped, not
+                # closed: its sockets are shared with the parent.
+                _CLIENT = MongoClient(config.mongo_url, **_CLIENT_OPTIONS)
+                _CLIENT_PID = os.getpid()
+
+    return _CLIENT
+
+
+def set_client(client):
+    """ Use the given client in this process (tests and benchmarks, e.g. mongomock).
+
+    :param client: MongoClient compatible object.
+    """
+    global _CLIENT, _CLIENT_PID
+
+    with _LOCK:
+        _CLIENT, _CLIENT_PID = client, os.getpid()
+
+
+def reset_client():
+    """ Forget the current client; the next use creates a new one. """
+    global _CLIENT, _CLIENT_PID
+
+    with _LOCK:
+        _CLIENT, _CLIENT_PID = None, None
+
+
+def close_client():
+    """ Close the client of this process (when it owns it). """
+    global _CLIENT, _CLIENT_PID
+
+    with _LOCK:
+        if _CLIENT is not None and _CLIENT_PID == os.getpid():
+            _CLIENT.close()
 
-db = client.get_database(config.database_name)
+        _CLIENT, _CLIENT_PID = None, None
+
+
+def get_db():
+    """ Return the service database of the current process client. """
+    return get_client().get_database(config.database_name)
+
+
+class _LazyDatabase:
+    """ Stand-in for the service Database, resolved on every use.
+
+    Keeps ``db.customers`` and ``db['customers']`` working everywhere
+    while the actual client is created per process on first use.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_db(), name)
+
+    def __getitem__(self, name: str):
+        return get_db()[name]
+
+
+db = _LazyDatabase()
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
@@ -63,7 +146,11 @@ class BaseRepository(Generic[T]):
     def __init__(self, db, collection_name: str):
         self.db = db
         self.collection_name = collection_name
-        self.collection = db[collection_name]
+
+    @property
+    def collection(self):
+        """Return the collection, bound to the current process client."""
+        return self.db[self.collection_name]
 
     def _read(self, obj_id: str) -> T:
         """Read object for matching index key from DB collection."""
@@ -104,28 +191,37 @@ class BaseRepository(Generic[T]):
 class BaseRepositoryWithStatus(BaseRepository[T]):
     """Subclass of BaseRepository to add status-related methods."""
 
+    # Fields of the document before a status change passed to _on_transition.
+    transition_projection = {"status": 1}
+
     def update(self, obj_id: str, new_status: StatusType, author_id: str, comment: str = "") -> bool:
         """Update Object."""
-        if not self.check_exists(obj_id):
+        update_history_entry = StateUpdateSchema(
+            new_status=new_status, when=datetime.utcnow(), by=author_id, comment=comment)
+
+        # Status and history in one write, only when the status changes. The
+        # document returned is the one this write replaced: concurrent
+        # transitions each see the status they actually left.
+        before = self.collection.find_one_and_update(
+            {"_id": ObjectId(obj_id), "status": {"$ne": new_status.value}},
+            {"$set": {"status": new_status.value},
+             "$push": {"update_history": update_history_entry.dict()}},
+            projection=self.transition_projection,
+            return_document=ReturnDocument.BEFORE)
+
+        if before is not None:
+            self._on_transition(before, new_status, author_id, update_history_entry.when)
+            return True
+
+        if self.collection.count_documents({"_id": ObjectId(obj_id)}, limit=1) == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail=f"Object not found: {obj_id}")
 
-        update_history_entry = StateUpdateSchema(
-            new_status=new_status,
-            when=datetime.utcnow(),
-            by=author_id)
-
-        update_result = self.collection.update_one(
-            {"_id": ObjectId(obj_id)}, {"$set": {"status": new_status.value}})
-
-        if update_result.modified_count > 0:
-            update_history_entry = StateUpdateSchema(
-                new_status=new_status, when=datetime.utcnow(), by=author_id, comment=comment)
-            self.collection.update_one({"_id": ObjectId(obj_id)}, {
-                                       "$push": {"update_history": update_history_entry.dict()}})
-            return True
-        else:
-            return False
+        return False
+
+    def _on_transition(self, before: dict, new_status: StatusType, author_id: str,
+                       when: datetime):
+        """Called after a status change (before: transition_projection of the document before it)."""
 
     def get_status(self, obj_id: str) -> str:
         """Get status of an object."""
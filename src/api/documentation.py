@@ -23,7 +23,11 @@ resource_example = {
             "status": True
         },
         {
-            "name": "Celery.backend (MongoDb)",
+            "name": "Celery.backend (Redis)",
+            "status": True
+        },
+        {
+            "name": "MongoDb",
             "status": True
         },
         {
@@ -53,6 +57,12 @@ retry_example = {
     "failed_id": "94624ffb-d5e8-4fbb-a760-dbdef0abb46f"
 }
 
+timing_example = {
+    "count": 1000,
+    "queue_wait": {"p50": 0.012, "p95": 0.35, "p99": 1.2},
+    "execution": {"p50": 0.045, "p95": 0.11, "p99": 0.3}
+}
+
 process_request_body_example = {
     "queue": {
         "summary": "responseQueue",
@@ -61,7 +71,7 @@ process_request_body_example = {
     "url": {
         "summary": "responseUrl",
         "value": {"msg": "test-02 today",
-                  "responseUrl": "http://localhost:8001/v1/response"}},
+                  "responseUrl": "https://caller.example.com/v1/response"}},
     "docker": {
         "summary": "local Docker responseUrl",
         "value": {"msg": "test-03 today",
@@ -75,7 +85,11 @@ tags_metadata = [
     },
     {
         "name": "Health endpoint",
-        "description": "Checks connection status for all Celery workers.",
+        "description": "Connection status for Celery workers, RabbitMQ, Redis and MongoDB (checked in the background).",
+    },
+    {
+        "name": "Metrics endpoint",
+        "description": "API metrics in Prometheus text format (workers export theirs on METRICS_WORKER_PORT).",
     }
 ]
 
@@ -131,6 +145,9 @@ and callbacks to keep a responsive API regardless of processing time.**
   * `422:` Validation error, supplied parameter(s) are incorrect.
   * `500:` Failed Health response.
   * `500:` Failed Celery task initialisation.
+
+<br>**Idempotency:** POST requests may carry an `Idempotency-Key` header. A replayed
+key returns the original task ID instead of starting a new task.
 <br><br>
 ---
 """
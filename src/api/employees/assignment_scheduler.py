@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+import heapq
+import itertools
+import threading
+from time import monotonic
+from collections import deque
+from typing import Callable, Dict, Optional, Set, Tuple
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from ...config.setup import config
+from ..database import db
+from ..realisations.models import RealisationStatus
+
+# Constants
+OPEN_STATUSES = (RealisationStatus.RSCH.value, RealisationStatus.RSTA.value)
+""" Realisation statuses counted as open workload (RSCH/RSTA). """
+
+Loads = Dict[str, int]
+Skills = Dict[str, Set[str]]
+
+
+# ---------------------------------------------------------
+#
+def _service_name(service) -> Optional[str]:
+    """ Return the plain string value of a Services member (or string). """
+    return getattr(service, 'value', service)
+
+
+# ---------------------------------------------------------
+#
+def load_employee_workload() -> Tuple[Loads, Skills]:
+    """ Read every employee and its number of open realisations from DB.
+
+    One projection query for the employees and one aggregation
+    for the open realisation counts (instead of a document scan).
+
+    :return: Open realisation count and skills per employee id.
+    """
+
+    loads, skills = {}, {}
+
+    for employee in db.employees.find({}, {'skills': 1}):
+        employee_id = str(employee['_id'])
+        loads[employee_id] = 0
+        skills[employee_id] = {_service_name(item)
+                               for item in employee.get('skills') or []}
+
+    pipeline = [{'$match': {'status': {'$in': list(OPEN_STATUSES)}}},
+                {'$group': {'_id': '$employee_id', 'count': {'$sum': 1}}}]
+
+    for item in db.realisations.aggregate(pipeline):
+        if item['_id'] in loads:
+            loads[item['_id']] = item['count']
+
+    return loads, skills
+
+
+# ------------------------------------------------------------------------
+#
+class _LoadHeap:
+    """ Min-heap of employee ids keyed on load, with lazy invalidation.
+
+    Changing a load pushes a new entry; stale entries are dropped
+    when they surface at the top. Both operations are O(log N).
+    """
+
+    def __init__(self, loads: Loads, members: Optional[Set[str]] = None):
+        self._seq = itertools.count()
+        self._heap = [(load, next(self._seq), employee_id)
+                      for employee_id, load in loads.items()
+                      if members is None or employee_id in members]
+        heapq.heapify(self._heap)
+
+    def push(self, employee_id: str, load: int):
+        heapq.heappush(self._heap, (load, next(self._seq), employee_id))
+
+    def top(self, loads: Loads) -> Optional[Tuple[int, str]]:
+        """ Return (load, employee_id) with the smallest current load. """
+        while self._heap:
+            load, _, employee_id = self._heap[0]
+
+            if loads.get(employee_id) == load:
+                return load, employee_id
+
+            heapq.heappop(self._heap)
+
+        return None
+
+
+# ------------------------------------------------------------------------
+#
+class AssignmentStrategy:
+    """ Base class for the employee selection strategies. """
+
+    name = ''
+
+    def rebuild(self, loads: Loads, skills: Skills):
+        """ Rebuild internal state from a fresh DB snapshot. """
+        raise NotImplementedError
+
+    def pick(self, loads: Loads, service: Optional[str] = None) -> Optional[str]:
+        """ Return the employee id to assign next (None when nobody is available). """
+        raise NotImplementedError
+
+    def adjust(self, employee_id: str, load: int):
+        """ Register the new load of an employee. """
+
+
+# ------------------------------------------------------------------------
+#
+class RoundRobinStrategy(AssignmentStrategy):
+    """ Assign employees in turn, ignoring their workload. """
+
+    name = 'round_robin'
+
+    def __init__(self):
+        self._ring = deque()
+
+    def rebuild(self, loads: Loads, skills: Skills):
+        self._ring = deque(sorted(loads))
+
+    def pick(self, loads: Loads, service: Optional[str] = None) -> Optional[str]:
+        if not self._ring:
+            return None
+
+        employee_id = self._ring[0]
+        self._ring.rotate(-1)
+
+        return employee_id
+
+
+# ------------------------------------------------------------------------
+#
+class LeastLoadedStrategy(AssignmentStrategy):
+    """ Assign the employee with the fewest open realisations. """
+
+    name = 'least_loaded'
+
+    def __init__(self):
+        self._heap = _LoadHeap({})
+
+    def rebuild(self, loads: Loads, skills: Skills):
+        self._heap = _LoadHeap(loads)
+
+    def pick(self, loads: Loads, service: Optional[str] = None) -> Optional[str]:
+        top = self._heap.top(loads)
+        return top[1] if top else None
+
+    def adjust(self, employee_id: str, load: int):
+        self._heap.push(employee_id, load)
+
+
+# ------------------------------------------------------------------------
+#
+class SkillWeightedStrategy(LeastLoadedStrategy):
+    """ Least loaded assignment preferring employees skilled for the service.
+
+    An employee without the requested skill is charged ``penalty``
+    extra open realisations when compared with skilled employees.
+    """
+
+    name = 'skill_weighted'
+
+    def __init__(self, penalty: int = 3):
+        super().__init__()
+        self.penalty = penalty
+        self._skills: Skills = {}
+        self._skill_heaps: Dict[str, _LoadHeap] = {}
+
+    def rebuild(self, loads: Loads, skills: Skills):
+        super().rebuild(loads, skills)
+        self._skills = skills
+        members: Dict[str, Set[str]] = {}
+
+        for employee_id, items in skills.items():
+            for item in items:
+                members.setdefault(item, set()).add(employee_id)
+
+        self._skill_heaps = {item: _LoadHeap(loads, ids)
+                             for item, ids in members.items()}
+
+    def pick(self, loads: Loads, service: Optional[str] = None) -> Optional[str]:
+        candidates = []
+        service = _service_name(service)
+
+        if service in self._skill_heaps and (top := self._skill_heaps[service].top(loads)):
+            candidates.append(top)
+
+        if top := self._heap.top(loads):
+            load, employee_id = top
+            skilled = service in self._skills.get(employee_id, ())
+            candidates.append((load if skilled else load + self.penalty, employee_id))
+
+        return min(candidates)[1] if candidates else None
+
+    def adjust(self, employee_id: str, load: int):
+        super().adjust(employee_id, load)
+
+        for item in self._skills.get(employee_id, ()):
+            self._skill_heaps[item].push(employee_id, load)
+
+
+STRATEGIES = {strategy.name: strategy for strategy in
+              (RoundRobinStrategy, LeastLoadedStrategy, SkillWeightedStrategy)}
+""" Available strategies, selected with the ASSIGNMENT_STRATEGY setting. """
+
+
+# ------------------------------------------------------------------------
+#
+class AssignmentScheduler:
+    """ Pick the employee a new realisation is assigned to.
+
+    The open realisation count per employee is kept in memory and
+    refreshed from DB every ``refresh_interval`` seconds. In between,
+    counts are updated incrementally when a realisation is scheduled
+    (assign) or completed (release); starting a realisation keeps it
+    open, so the load doesn't change.
+    """
+
+    # ---------------------------------------------------------
+    #
+    def __init__(self, strategy: AssignmentStrategy,
+                 loader: Callable[[], Tuple[Loads, Skills]] = load_employee_workload,
+                 refresh_interval: float = 60.0):
+        """ The class initializer.
+
+        :param strategy: Employee selection strategy.
+        :param loader: Callable returning the (loads, skills) snapshot.
+        :param refresh_interval: Seconds between DB snapshots.
+        """
+        self.strategy = strategy
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+
+        self._loads: Loads = {}
+        self._refreshed = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    #
+    @classmethod
+    def from_config(cls) -> 'AssignmentScheduler':
+        """ Return a scheduler using the configured strategy. """
+        strategy = STRATEGIES.get(config.assignment_strategy, LeastLoadedStrategy)
+        return cls(strategy(), refresh_interval=config.assignment_refresh_interval)
+
+    # ---------------------------------------------------------
+    #
+    def _refresh_if_stale(self):
+        """ Reload the snapshot when the refresh interval has passed (lock held). """
+
+        if self._refreshed is not None and \
+                monotonic() - self._refreshed < self.refresh_interval:
+            return
+
+        self._loads, skills = self.loader()
+        self.strategy.rebuild(self._loads, skills)
+        self._refreshed = monotonic()
+        logger.debug(f'Assignment snapshot refreshed: {len(self._loads)} employees')
+
+    # ---------------------------------------------------------
+    #
+    def refresh(self):
+        """ Force a reload of the DB snapshot. """
+        with self._lock:
+            self._refreshed = None
+            self._refresh_if_stale()
+
+    # ---------------------------------------------------------
+    #
+    def _adjust(self, employee_id: str, delta: int):
+        """ Change the load of an employee (lock held). """
+
+        if employee_id not in self._loads:
+            return
+
+        self._loads[employee_id] = max(0, self._loads[employee_id] + delta)
+        self.strategy.adjust(employee_id, self._loads[employee_id])
+
+    # ---------------------------------------------------------
+    #
+    def assign(self, service=None) -> Optional[str]:
+        """ Return the employee the next realisation is assigned to.
+
+        :param service: Ordered service (used by skill aware strategies).
+        :return: Employee id, or None when there are no employees.
+        """
+
+        with self._lock:
+            self._refresh_if_stale()
+
+            if employee_id := self.strategy.pick(self._loads, service):
+                self._adjust(employee_id, +1)
+
+            return employee_id
+
+    # ---------------------------------------------------------
+    #
+    def release(self, employee_id: str):
+        """ Register that a realisation of the employee is closed (or was not created).
+
+        :param employee_id: Employee id.
+        """
+
+        with self._lock:
+            self._adjust(employee_id, -1)
+
+    # ---------------------------------------------------------
+    #
+    def load_of(self, employee_id: str) -> Optional[int]:
+        """ Return the current open realisation count of an employee. """
+        return self._loads.get(employee_id)
+
+
+ASSIGNMENT_SCHEDULER = AssignmentScheduler.from_config()
+""" Process wide scheduler (the DB snapshot is loaded on first use). """
@@ -8,8 +8,10 @@ from typing import List
 # Local modules
 from .models import EmployeeModel
 from ..database import db, BaseRepository
+from ...tools.metrics import instrument_repository
 
 
+@instrument_repository
 class EmployeesRepository(BaseRepository[EmployeeModel]):
     def __init__(self):
         super().__init__(db, "employees")
@@ -7,6 +7,7 @@ from typing import List
 
 # Local program modules
 from ..database import PyObjectId
+from ..orders.services import Services
 
 
 class EmployeeBase(BaseModel):
@@ -14,6 +15,7 @@ class EmployeeBase(BaseModel):
     first_name: str
     last_name: str
     email: EmailStr
+    skills: List[Services] = []  # used by the skill_weighted assignment
 
 
 class EmployeeCreateModel(EmployeeBase):
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import HTTPException, Depends, APIRouter
 from kombu.exceptions import OperationalError
 from loguru import logger
@@ -5,9 +7,16 @@ from loguru import logger
 from .models import (EmployeeCreateModel)
 from ..models import ProcessResponseModel, UnknownError
 from ...tools.security import validate_authentication
-from ...worker.employees_tasks import create_employee_processor, read_employee_processor, list_employees_processor
+from ...tools.admission import admit_critical, admit_read, admit_report
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
 
 # Constants
+# Tasks, sent by name (registered in src/worker/employees_tasks.py).
+create_employee_processor = TaskRef('tasks.create_employee')
+read_employee_processor = TaskRef('tasks.read_employee')
+list_employees_processor = TaskRef('tasks.list_employees')
+
 ROUTER = APIRouter(prefix=f"/v1/employees", tags=[f"Employees"])
 """ Employee API endpoint router. """
 
@@ -16,12 +25,14 @@ ROUTER = APIRouter(prefix=f"/v1/employees", tags=[f"Employees"])
              status_code=202,
              response_model=ProcessResponseModel,
              responses={500: {"model": UnknownError}},
-             dependencies=[Depends(validate_authentication)])
-async def create_employee(payload: EmployeeCreateModel) -> ProcessResponseModel:
+             dependencies=[Depends(validate_authentication),
+                           Depends(admit_critical)])
+def create_employee(payload: EmployeeCreateModel,
+                    key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     payload_json = EmployeeCreateModel(**payload.model_dump()).model_dump()
     try:
         # Add payload message to Celery for processing.
-        result = create_employee_processor.delay(payload_json)
+        result = enqueue(create_employee_processor, payload_json, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -36,7 +47,8 @@ async def create_employee(payload: EmployeeCreateModel) -> ProcessResponseModel:
         status_code=202,
         response_model=ProcessResponseModel,
         responses={500: {"model": UnknownError}},
-        dependencies=[Depends(validate_authentication)])
+        dependencies=[Depends(validate_authentication),
+                      Depends(admit_read)])
 async def get_employee(employee_id: str) -> ProcessResponseModel:
     try:
         result = read_employee_processor.delay(employee_id)
@@ -52,7 +64,8 @@ async def get_employee(employee_id: str) -> ProcessResponseModel:
             status_code=202,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_report)])
 async def list_employees() -> ProcessResponseModel:
     try:
         result = list_employees_processor.delay()
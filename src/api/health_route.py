@@ -2,11 +2,11 @@
 
 # Third party modules
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
 # local modules
 from .models import HealthResponseModel, HealthStatusError
-from ..tools.health_manager import get_health_status
+from ..tools.health_manager import HEALTH_MONITOR
 
 # Constants
 ROUTER = APIRouter(prefix="/health", tags=["Health endpoint"])
@@ -21,10 +21,15 @@ ROUTER = APIRouter(prefix="/health", tags=["Health endpoint"])
     responses={500: {"model": HealthStatusError}},
 )
 async def health_check() -> HealthResponseModel:
-    """ **Return connection status for Celery workers.** """
+    """ **Return connection status for Celery workers, RabbitMQ, Redis and MongoDB.**
 
-    content = await get_health_status()
-    response_code = (200 if content.status else 500)
+    The status is checked in the background and served from cache.
+    """
 
-    return JSONResponse(status_code=response_code,
-                        content=content.model_dump())
+    if HEALTH_MONITOR.stale:
+        await HEALTH_MONITOR.refresh()
+
+    response_code, content = HEALTH_MONITOR.response
+
+    return Response(status_code=response_code, content=content,
+                    media_type='application/json')
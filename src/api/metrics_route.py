@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+# Third party modules
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+# local modules
+from ..tools.metrics import CONTENT_TYPE, generate_latest
+
+# Constants
+ROUTER = APIRouter(prefix="/metrics", tags=["Metrics endpoint"])
+""" Metrics API endpoint router. """
+
+
+# ---------------------------------------------------------
+#
+@ROUTER.get('', response_class=Response)
+async def metrics() -> Response:
+    """ **Return the API metrics in Prometheus text format.** """
+
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE)
@@ -11,14 +11,14 @@ VERSION INFO::
 """
 
 # BUILTIN modules
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict
 
 # Third party modules
 from pydantic import ConfigDict, UUID4, BaseModel
 
 # local modules
 from .documentation import (process_example, status_example,
-                            retry_example, resource_example)
+                            retry_example, resource_example, timing_example)
 
 
 # -----------------------------------------------------------------------------
@@ -132,3 +132,19 @@ class RetryResponseModel(BaseModel):
     task_id: UUID4
     failed_id: UUID4
     model_config = ConfigDict(json_schema_extra={"example": retry_example})
+
+
+# -----------------------------------------------------------------------------
+#
+class TaskTimingModel(BaseModel):
+    """ Define Swagger model for the rolling timing percentiles of one task.
+
+    :ivar count: Number of timings in the rolling window.
+    :ivar queue_wait: Queue wait percentiles in seconds (p50, p95, p99).
+    :ivar execution: Execution time percentiles in seconds (p50, p95, p99).
+    """
+
+    count: int
+    queue_wait: Dict[str, float]
+    execution: Dict[str, float]
+    model_config = ConfigDict(json_schema_extra={"example": timing_example})
@@ -10,7 +10,7 @@ from .order_data_adapter import OrdersRepository
 from ..quotations.quotation_api_adapter import QuotationsApi
 from ..quotations.models import QuotationCreateModel, QuotationModel
 from ..quotations.quotation_data_adapter import QuotationsRepository
-from .services import get_service_prices
+from ..pricing.pricing_engine import PRICING_ENGINE
 from ..utils import validate_user_is_customer, validate_user_is_employee, validate_order_exist
 
 
@@ -114,7 +114,7 @@ class OrderApiLogic:
 
         # Generate quotation
         product = order.get('service')
-        product_price = get_service_prices(product)
+        product_price = PRICING_ENGINE.price(product, order.get('customer_id'))
         logger.debug(f"Service: {product}")
         logger.debug(f"Type: {type(order.get('service'))}")
         logger.debug(f"Price: {product_price}")
@@ -1,16 +1,28 @@
 # BUILTIN modules
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+
+# Third party modules
+from bson import ObjectId
+from fastapi import HTTPException
 
 # Local modules
 from src.api.orders.models import OrderModel, OrderStatus
 from src.api.database import db, PyObjectId, BaseRepositoryWithStatus
 from src.api.quotations.models import QuotationModel
 from ..quotations.quotation_data_adapter import QuotationsRepository
+from ..analytics import analytics_views
+from ...tools.metrics import instrument_repository
 
 
+@instrument_repository
 class OrdersRepository(BaseRepositoryWithStatus[OrderModel]):
     """Repository for managing orders."""
 
+    # The time in the status left is measured from the last history entry.
+    transition_projection = {"status": 1, "service": 1, "created": 1,
+                             "update_history": {"$slice": -1}}
+
     def __init__(self):
         super().__init__(db, "orders")
 
@@ -20,10 +32,20 @@ class OrdersRepository(BaseRepositoryWithStatus[OrderModel]):
         obj = super().read(obj_id)
         return OrderModel(**obj).to_dict()
 
+    def create(self, payload: dict) -> str:
+        """Create order in the collection."""
+        order_id = super().create(payload)
+        analytics_views.order_created(payload)
+        return order_id
+
     def update(self, order_id: str, new_status: OrderStatus, author_id: str, comment: str = "") -> bool:
         """Update Order."""
         return super().update(order_id, new_status, author_id, comment)
 
+    def _on_transition(self, before: dict, new_status: OrderStatus, author_id: str,
+                       when: datetime):
+        analytics_views.order_transition(before, new_status, author_id, when)
+
     def read_all(self) -> List[OrderModel]:
         """Read all objects from the collection."""
         # Call parent class's read_all method
@@ -37,6 +59,19 @@ class OrdersRepository(BaseRepositoryWithStatus[OrderModel]):
         q_repo = QuotationsRepository()
         return q_repo.read_order_quotations(order_id)
 
+    def read_status(self, order_id: PyObjectId) -> Optional[dict]:
+        """Read the status and service of an order (one projected read).
+
+        :param order_id: The ID of the order to read.
+        :return: {status, service}, None when the order does not exist.
+        """
+        try:
+            return self.collection.find_one({"_id": ObjectId(order_id)},
+                                            {"_id": 0, "status": 1, "service": 1})
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to get status: {e}")
+
     def is_validated(self, order_id: PyObjectId) -> bool:
         """Check if an order is accepted.
 
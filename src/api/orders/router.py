@@ -1,5 +1,5 @@
 # BUILTIN modules
-from typing import List
+from typing import List, Optional
 
 # Third party modules
 from pydantic import UUID4
@@ -17,9 +17,20 @@ from .models import (OrderCreateModel,
                      NotFoundError, FailedUpdateError, ConnectError)
 from ..models import ProcessResponseModel, UnknownError
 from ...tools.security import validate_authentication
-from ...worker.orders_tasks import create_order_processor, read_order_processor, list_orders_processor, cancel_order_processor, validate_order_processor, reject_order_processor, list_order_quotations_processor
+from ...tools.admission import admit_critical, admit_read, admit_report
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
 from ..database import UpdateModel
 
+# Tasks, sent by name (registered in src/worker/orders_tasks.py).
+create_order_processor = TaskRef('tasks.create_order')
+read_order_processor = TaskRef('tasks.read_order')
+list_orders_processor = TaskRef('tasks.list_orders')
+cancel_order_processor = TaskRef('tasks.cancel_order')
+validate_order_processor = TaskRef('tasks.validate_order')
+reject_order_processor = TaskRef('tasks.reject_order')
+list_order_quotations_processor = TaskRef('tasks.list_order_quotations')
+
 router = APIRouter(prefix="/v1/orders", tags=["Orders"])
 adapter = OrdersAPIAdapter(OrdersRepository())
 
@@ -33,11 +44,13 @@ adapter = OrdersAPIAdapter(OrdersRepository())
     responses={
         500: {"model": UnknownError}
     },
-    dependencies=[Depends(validate_authentication)]
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)]
 )
-async def create_order(payload: OrderCreateModel) -> ProcessResponseModel:
+def create_order(payload: OrderCreateModel,
+                 key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     try:
-        result = create_order_processor.delay(payload.model_dump())
+        result = enqueue(create_order_processor, payload.model_dump(), key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -52,7 +65,8 @@ async def create_order(payload: OrderCreateModel) -> ProcessResponseModel:
     status_code=status.HTTP_202_ACCEPTED,
     response_model=ProcessResponseModel,
     responses={500: {"model": UnknownError}},
-    dependencies=[Depends(validate_authentication)]
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_read)]
 )
 async def get_order(order_id: str) -> ProcessResponseModel:
     try:
@@ -70,7 +84,8 @@ async def get_order(order_id: str) -> ProcessResponseModel:
             status_code=202,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_read)])
 async def list_order_quotations(order_id: str) -> ProcessResponseModel:
     try:
         result = list_order_quotations_processor.delay(order_id)
@@ -89,7 +104,8 @@ async def list_order_quotations(order_id: str) -> ProcessResponseModel:
             status_code=status.HTTP_202_ACCEPTED,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_report)])
 async def list_orders() -> ProcessResponseModel:
     try:
         result = list_orders_processor.delay()
@@ -113,10 +129,12 @@ async def list_orders() -> ProcessResponseModel:
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def cancel_order(payload: UpdateModel) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def cancel_order(payload: UpdateModel,
+                 key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     try:
-        result = cancel_order_processor.delay(payload.model_dump())
+        result = enqueue(cancel_order_processor, payload.model_dump(), key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -137,10 +155,12 @@ async def cancel_order(payload: UpdateModel) -> ProcessResponseModel:
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def validate_order(payload: UpdateModel)-> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def validate_order(payload: UpdateModel,
+                   key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     try:
-        result = validate_order_processor.delay(payload.model_dump())
+        result = enqueue(validate_order_processor, payload.model_dump(), key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -161,10 +181,12 @@ async def validate_order(payload: UpdateModel)-> ProcessResponseModel:
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def reject_order(payload: UpdateModel) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def reject_order(payload: UpdateModel,
+                 key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     try:
-        result = reject_order_processor.delay(payload.model_dump())
+        result = enqueue(reject_order_processor, payload.model_dump(), key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -7,13 +7,17 @@ class Services(str, Enum):
     desktop_app = 'Make a desktop app'
 
 
-def get_service_prices(service: Services):
-    if service == Services.web_site:
-        return 5000
-    elif service == Services.mobile_app:
-        return 8000
-    else:
-        return 10000
-    
+DEFAULT_SERVICE_PRICES = {
+    Services.web_site: 5000,
+    Services.mobile_app: 8000,
+    Services.desktop_app: 10000,
+}
+""" Built-in price table, used until a price table is published in DB. """
+
+FALLBACK_PRICE = 10000
+""" Price of a service missing from the price table. """
 
-#print(get_service_prices('Make a web site'))
+
+def get_service_prices(service: Services):
+    """ Return the built-in price of a service (see pricing.PricingEngine for DB prices). """
+    return DEFAULT_SERVICE_PRICES.get(service, FALLBACK_PRICE)
@@ -0,0 +1,48 @@
+# BUILTIN modules
+from datetime import datetime
+
+# Third party modules
+from pydantic import (BaseModel, Field)
+from typing import Dict, List, Optional
+
+# Local program modules
+from ..database import PyObjectId
+from ..orders.services import Services
+
+
+class CustomerPriceModel(BaseModel):
+    """ Negotiated price of a service for one customer. """
+    customer_id: PyObjectId
+    service: Services
+    price: int
+
+
+class PriceRuleModel(BaseModel):
+    """ Percentage adjustment applied to the matching prices.
+
+    A rule without service applies to every service and a rule
+    without customer applies to every customer.
+    """
+    percent: float  # e.g. -10 for a 10% discount
+    service: Optional[Services] = None
+    customer_id: Optional[PyObjectId] = None
+    comment: str = ""
+
+
+class PriceTableCreateModel(BaseModel):
+    """ Representation of data required when publishing a price table. """
+    prices: Dict[Services, int]
+    overrides: List[CustomerPriceModel] = []
+    rules: List[PriceRuleModel] = []
+
+
+class PriceTableModel(PriceTableCreateModel):
+    """ Representation of a published (versioned) price table. """
+    version: int
+    created: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PriceQueryModel(BaseModel):
+    """ One item of a batch pricing request. """
+    service: Services
+    customer_id: Optional[PyObjectId] = None
@@ -0,0 +1,87 @@
+# BUILTIN modules
+from datetime import datetime
+from typing import Optional
+
+# Third party modules
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+# Local modules
+from .models import PriceTableModel, PriceTableCreateModel
+from ..database import db
+from ...tools.metrics import instrument_repository
+
+
+@instrument_repository
+class PricingRepository:
+    """ This class implements the data layer adapter for the versioned price tables.
+
+    Every publication is a new document with an increasing version,
+    the current price table is the one with the highest version.
+    """
+
+    COLLECTION = 'price_tables'
+
+    def __init__(self):
+        self._indexed = False
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def collection(self):
+        """ Return the price tables collection (unique index on version). """
+        collection = db[self.COLLECTION]
+
+        if not self._indexed:
+            collection.create_index([('version', DESCENDING)], unique=True)
+            self._indexed = True
+
+        return collection
+
+    # ---------------------------------------------------------
+    #
+    def current_version(self) -> Optional[int]:
+        """ Return the version of the current price table (an index-only lookup).
+
+        :return: Current version, None when no table is published.
+        """
+        response = self.collection.find_one(
+            {}, {'_id': 0, 'version': 1}, sort=[('version', DESCENDING)])
+
+        return response['version'] if response else None
+
+    # ---------------------------------------------------------
+    #
+    def read_current(self) -> Optional[PriceTableModel]:
+        """ Return the current price table.
+
+        :return: Current price table, None when no table is published.
+        """
+        response = self.collection.find_one(
+            {}, {'_id': 0}, sort=[('version', DESCENDING)])
+
+        return PriceTableModel(**response) if response else None
+
+    # ---------------------------------------------------------
+    #
+    def publish(self, payload: PriceTableCreateModel) -> int:
+        """ Publish a new price table version.
+
+        Running pricing engines pick it up on their next version check.
+
+        :param payload: New price table.
+        :return: Published version.
+        """
+
+        while True:
+            version = (self.current_version() or 0) + 1
+            document = payload.model_dump(mode='json')
+            document.update(version=version, created=datetime.utcnow())
+
+            try:
+                self.collection.insert_one(document)
+                return version
+
+            except DuplicateKeyError:
+                # Somebody else published the same version, try the next one.
+                continue
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+import threading
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from ...config.setup import config
+from .models import PriceTableModel
+from .pricing_data_adapter import PricingRepository
+from ..orders.services import DEFAULT_SERVICE_PRICES, FALLBACK_PRICE
+
+
+# ---------------------------------------------------------
+#
+def _key(value) -> Optional[str]:
+    """ Return the plain string value of a Services member, ObjectId or string. """
+    if value is None:
+        return None
+
+    return str(getattr(value, 'value', value))
+
+
+# ------------------------------------------------------------------------
+#
+class CompiledPriceTable:
+    """ Price table compiled into dict lookups.
+
+    Rules are folded into one multiplier per service (rules for every
+    customer) and one per (customer, service); a price is then at most
+    three dict lookups. Resolved prices are memoized, the compiled table
+    is immutable once built and replaced as a whole on reload.
+    """
+
+    def __init__(self, table: PriceTableModel):
+        self.version = table.version
+        self.prices = {_key(service): price for service, price in table.prices.items()}
+        self.overrides = {(_key(item.customer_id), _key(item.service)): item.price
+                          for item in table.overrides}
+        self.service_factors: Dict[Optional[str], float] = {}
+        self.customer_factors: Dict[Tuple[str, Optional[str]], float] = {}
+        self._resolved: Dict[Tuple[Optional[str], str], int] = {}
+
+        for rule in table.rules:
+            factor = 1 + rule.percent / 100
+            service = _key(rule.service)
+
+            if rule.customer_id is None:
+                factors, key = self.service_factors, service
+            else:
+                factors, key = self.customer_factors, (_key(rule.customer_id), service)
+
+            factors[key] = factors.get(key, 1.0) * factor
+
+    # ---------------------------------------------------------
+    #
+    def price(self, service: str, customer_id: Optional[str] = None) -> int:
+        """ Return the price of a service for a customer.
+
+        :param service: Service value.
+        :param customer_id: Customer id (None for the public price).
+        :return: Price, rounded to an int.
+        """
+
+        key = (customer_id, service)
+
+        if (price := self._resolved.get(key)) is not None:
+            return price
+
+        if (price := self.overrides.get(key)) is None:
+            factor = (self.service_factors.get(None, 1.0)
+                      * self.service_factors.get(service, 1.0))
+
+            if customer_id is not None:
+                factor *= (self.customer_factors.get((customer_id, None), 1.0)
+                           * self.customer_factors.get((customer_id, service), 1.0))
+
+            price = round(self.prices.get(service, FALLBACK_PRICE) * factor)
+
+        # Concurrent writers store the same value, no lock needed.
+        self._resolved[key] = price
+        return price
+
+
+DEFAULT_TABLE = PriceTableModel(version=0, prices=DEFAULT_SERVICE_PRICES)
+""" Price table used until a table is published in DB. """
+
+
+# ------------------------------------------------------------------------
+#
+class PricingEngine:
+    """ Price services from the current price table.
+
+    The compiled table is kept in memory. Every ``reload_interval``
+    seconds the table version is read from DB (an index-only lookup)
+    and the table is only fetched and recompiled when a new version
+    was published, so price changes apply without a restart.
+    """
+
+    # ---------------------------------------------------------
+    #
+    def __init__(self, repository: Optional[PricingRepository] = None,
+                 reload_interval: float = 30.0):
+        """ The class initializer.
+
+        :param repository: Price table repository.
+        :param reload_interval: Seconds between version checks.
+        """
+        self.repo = repository or PricingRepository()
+        self.reload_interval = reload_interval
+
+        self._table = CompiledPriceTable(DEFAULT_TABLE)
+        self._checked = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def version(self) -> int:
+        """ Return the version of the price table in use. """
+        return self._table.version
+
+    # ---------------------------------------------------------
+    #
+    def _current_table(self) -> CompiledPriceTable:
+        """ Return the compiled table, reloading it when a new version exists. """
+
+        if self._checked is not None and \
+                monotonic() - self._checked < self.reload_interval:
+            return self._table
+
+        with self._lock:
+            if self._checked is None or \
+                    monotonic() - self._checked >= self.reload_interval:
+                self._reload()
+
+        return self._table
+
+    # ---------------------------------------------------------
+    #
+    def _reload(self):
+        """ Fetch and compile the current table if its version changed (lock held). """
+
+        try:
+            version = self.repo.current_version()
+
+            if version is not None and version != self._table.version:
+                if table := self.repo.read_current():
+                    self._table = CompiledPriceTable(table)
+                    logger.info(f'Price table version {table.version} loaded')
+
+        except Exception as why:
+            # Keep pricing with the table in use, retry on the next check.
+            logger.error(f'Price table reload failed: {why}')
+
+        self._checked = monotonic()
+
+    # ---------------------------------------------------------
+    #
+    def refresh(self):
+        """ Force a version check on the next price request. """
+        self._checked = None
+
+    # ---------------------------------------------------------
+    #
+    def price(self, service, customer_id=None) -> int:
+        """ Return the price of a service for a customer.
+
+        :param service: Ordered service.
+        :param customer_id: Customer id (None for the public price).
+        :return: Price.
+        """
+        return self._current_table().price(_key(service), _key(customer_id))
+
+    # ---------------------------------------------------------
+    #
+    def price_many(self, items: Iterable[Tuple[object, object]]) -> List[int]:
+        """ Return the prices of many (service, customer_id) pairs.
+
+        All items are priced in one pass against the same table
+        version (one version check for the whole batch).
+
+        :param items: (service, customer_id) pairs.
+        :return: Prices, in the items order.
+        """
+        return self.quote(items)[1]
+
+    # ---------------------------------------------------------
+    #
+    def quote(self, items: Iterable[Tuple[object, object]]) -> Tuple[int, List[int]]:
+        """ Return the prices of many (service, customer_id) pairs and their table version.
+
+        The version is the one of the table the prices were taken from
+        (read after the reload check, not before).
+
+        :param items: (service, customer_id) pairs.
+        :return: Table version and prices, in the items order.
+        """
+        table = self._current_table()
+        return table.version, [table.price(_key(service), _key(customer_id))
+                               for service, customer_id in items]
+
+
+PRICING_ENGINE = PricingEngine(reload_interval=config.pricing_reload_interval)
+""" Process wide pricing engine (the table is loaded on first use). """
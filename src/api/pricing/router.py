@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+from kombu.exceptions import OperationalError
+from loguru import logger
+
+from .models import PriceTableCreateModel, PriceQueryModel
+from ..models import ProcessResponseModel, UnknownError
+from ...tools.security import validate_authentication
+from ...tools.admission import admit_critical, admit_read
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
+
+
+# Tasks, sent by name (registered in src/worker/pricing_tasks.py).
+publish_price_table_processor = TaskRef('tasks.publish_price_table')
+read_price_table_processor = TaskRef('tasks.read_price_table')
+quote_prices_processor = TaskRef('tasks.quote_prices')
+
+# Create API router
+ROUTER = APIRouter(prefix="/v1/pricing", tags=["Pricing"])
+
+
+# Endpoint for publishing a new price table version
+@ROUTER.post(
+    "",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)]
+)
+def publish_price_table(payload: PriceTableCreateModel,
+                        key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing of the payload
+        result = enqueue(publish_price_table_processor, payload.model_dump(mode='json'), key=key)
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
+
+
+# Endpoint for retrieving the current price table
+@ROUTER.get(
+    "",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_read)]
+)
+async def get_price_table() -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing to retrieve the price table
+        result = read_price_table_processor.delay()
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
+
+
+# Endpoint for pricing a batch of services
+@ROUTER.post(
+    "/quotes",
+    status_code=202,
+    response_model=ProcessResponseModel,
+    responses={500: {"model": UnknownError}},
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_read)]
+)
+async def quote_prices(payload: List[PriceQueryModel]) -> ProcessResponseModel:
+    try:
+        # Trigger Celery task processing to price the whole batch
+        items = [item.model_dump(mode='json') for item in payload]
+        result = quote_prices_processor.delay(items)
+        logger.debug(f"Added task [{result.id}] to Celery for processing")
+        return ProcessResponseModel(status=result.state, id=result.id)
+    except OperationalError as e:
+        errmsg = f"Celery task initialization failed: {e}"
+        logger.error(errmsg)
+        raise HTTPException(status_code=500, detail=errmsg)
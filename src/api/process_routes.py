@@ -11,7 +11,7 @@ VERSION INFO::
 """
 
 # BUILTIN modules
-from typing import Annotated
+from typing import Annotated, Dict
 
 # Third party modules
 from loguru import logger
@@ -21,24 +21,46 @@ from kombu.exceptions import OperationalError
 from fastapi import HTTPException, Depends, APIRouter, Body
 
 # local modules
-from ..worker.tasks import processor, WORKER
-from ..tools.security import validate_authentication
+from ..tools.task_queue import WORKER, TaskRef, task_owner
+from ..tools import idempotency, task_timings, keyset
+from ..tools.security import TASK_SCOPE, validate_authentication
+from ..tools.admission import admit_critical, admit_read
 from .documentation import process_request_body_example
 from .models import (NotFoundError, UnknownError, BadStateError,
                      ProcessResponseModel, StatusResponseModel,
-                     RetryResponseModel)
+                     RetryResponseModel, TaskTimingModel)
 
 # Constants
 ROUTER = APIRouter(prefix="/v1/process", tags=["Process endpoints"])
 """ Process API endpoint router. """
 
+processor = TaskRef('tasks.processor')
+""" Long-running demo task (registered in src/worker/tasks.py). """
+
+
+# ---------------------------------------------------------
+#
+def _visible(task_id: str) -> bool:
+    """ Return True when the current key may see a task.
+
+    A key not granted the process scope only sees the tasks it published,
+    recorded when they start (a pending task shows no more than its state).
+    """
+    principal = keyset.current_principal()
+
+    if principal is None or principal.allows(TASK_SCOPE):
+        return True
+
+    return task_owner(task_id) in (None, principal.name)
+
 
 # ---------------------------------------------------------
 #
 @ROUTER.post('', status_code=202,
              response_model=ProcessResponseModel,
              responses={500: {"model": UnknownError}},
-             dependencies=[Depends(validate_authentication)])
+             dependencies=[Depends(validate_authentication),
+                           Depends(admit_read)])
 async def process_payload(payload: Annotated[
     dict,
     Body(openapi_examples=process_request_body_example)
@@ -63,16 +85,24 @@ async def process_payload(payload: Annotated[
              response_model=RetryResponseModel,
              responses={400: {"model": BadStateError},
                         404: {"model": NotFoundError}},
-             dependencies=[Depends(validate_authentication)])
-async def retry_failed_task(failed_id: UUID4) -> RetryResponseModel:
+             dependencies=[Depends(validate_authentication),
+                           Depends(admit_critical)])
+def retry_failed_task(failed_id: UUID4) -> RetryResponseModel:
     """**Trigger a retry for a previously failed task.**"""
 
     # Extract and return Celery processing status from DB.
-    if meta := WORKER.backend.get_task_meta(str(failed_id)):
+    if _visible(str(failed_id)) and (meta := WORKER.backend.get_task_meta(str(failed_id))):
 
         if meta['status'] == 'FAILURE':
-            task = WORKER.tasks[meta['name']]
-            result = task.apply_async(args=meta['args'])
+            task = TaskRef(meta['name'])
+            kwargs = meta.get('kwargs') or {}
+            result = task.apply_async(args=meta['args'], kwargs=kwargs)
+
+            # Keep idempotency key replays pointing at the live task.
+            if key := kwargs.get('idempotency_key'):
+                idempotency.rebind(task.name, key, result.id,
+                                   kwargs.get('idempotency_owner'))
+
             return RetryResponseModel(task_id=result.id,
                                       failed_id=failed_id,
                                       status=result.state)
@@ -92,11 +122,11 @@ async def retry_failed_task(failed_id: UUID4) -> RetryResponseModel:
             response_model=StatusResponseModel,
             responses={404: {"model": NotFoundError}},
             dependencies=[Depends(validate_authentication)])
-async def check_task_status(task_id: UUID4) -> StatusResponseModel:
+def check_task_status(task_id: UUID4) -> StatusResponseModel:
     """**Return specified Celery task progress status.**"""
 
     # Extract and return Celery processing status from DB.
-    if not WORKER.backend.get_task_meta(str(task_id)):
+    if not _visible(str(task_id)) or not WORKER.backend.get_task_meta(str(task_id)):
         raise HTTPException(status_code=404,
                             detail=f"Task ID {task_id} does not exist")
 
@@ -111,3 +141,18 @@ async def check_task_status(task_id: UUID4) -> StatusResponseModel:
     if result := WORKER.backend.get_task_meta(str(task_id)):
         key = ('result' if result['status'] == 'SUCCESS' else 'traceback')
         return StatusResponseModel(status=result['status'], result=result[key])
+
+
+# ---------------------------------------------------------
+#
+@ROUTER.get('/timings',
+            response_model=Dict[str, TaskTimingModel],
+            dependencies=[Depends(validate_authentication)])
+def task_timing_percentiles() -> Dict[str, TaskTimingModel]:
+    """**Return queue wait and execution time percentiles per task name.**
+
+    Computed over the last TIMING_WINDOW executions of every task. A high
+    queue wait calls for more workers, a high execution time for faster tasks.
+    """
+
+    return task_timings.summary()
@@ -59,6 +59,7 @@ class QuotationCreateInternalModel(QuotationCreateModel):
     status: QuotationStatus
     update_history: Optional[List[StateUpdateSchema]]
     created: datetime = Field(default_factory=datetime.utcnow)
+    service: Optional[str] = None  # copied from the order, for the analytics views
     
 
 
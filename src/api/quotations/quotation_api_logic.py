@@ -1,7 +1,6 @@
 # BUILTIN modules
 from datetime import datetime
 from typing import Optional, List
-import random
 
 
 # Third party modules
@@ -13,8 +12,8 @@ from .models import QuotationStatus, QuotationModel, StateUpdateSchema, Quotatio
 from .quotation_data_adapter import QuotationsRepository
 from ..orders.order_data_adapter import OrdersRepository
 from ..orders.models import OrderStatus
-from ..employees.employee_data_adapter import EmployeesRepository
-from ..customers.customer_data_adapter import CustomersRepository
+from ..utils import is_customer, is_employee
+from ..employees.assignment_scheduler import ASSIGNMENT_SCHEDULER
 from ..realisations.realisation_data_adapter import RealisationsRepository
 from ..realisations.realisation_api_adapter import RealisationsApi
 from ..realisations.models import RealisationCreateModel
@@ -88,7 +87,7 @@ class QuotationApiLogic:
             # check if it is an employee
             # check if the author can perform this operation
             # author must be an employee
-            employee_exist = EmployeesRepository().check_employee(self.owner_id)
+            employee_exist = is_employee(self.owner_id)
             if not employee_exist:
                 errmsg = f"Operation not allowed."
                 raise HTTPException(status_code=403, detail=errmsg)
@@ -115,7 +114,8 @@ class QuotationApiLogic:
                                                     owner_id=self.owner_id,
                                                     status=QuotationStatus.QUREV,
                                                     created=datetime.utcnow(),
-                                                    update_history=[])
+                                                    update_history=[],
+                                                    service=order['service'])
         new_quotation_id = self.repo.create(db_quotation)
 
         if not new_quotation_id:
@@ -138,7 +138,7 @@ class QuotationApiLogic:
         # check if it is an employee
         # check if the author can perform this operation
         # author must be an employee
-        employee_exist = EmployeesRepository().check_employee(self.updater_id)
+        employee_exist = is_employee(self.updater_id)
         if not employee_exist:
             errmsg = f"Operation not allowed. You must be an employee."
             raise HTTPException(status_code=403, detail=errmsg)
@@ -170,7 +170,7 @@ class QuotationApiLogic:
         # check if it is an employee
         # check if the author can perform this operation
         # author must be an employee
-        employee_exist = EmployeesRepository().check_employee(self.updater_id)
+        employee_exist = is_employee(self.updater_id)
         if not employee_exist:
             errmsg = f"Operation not allowed. You must be an employee."
             raise HTTPException(status_code=403, detail=errmsg)
@@ -192,9 +192,10 @@ class QuotationApiLogic:
     # ---------------------------------------------------------
     #
 
-    def accept(self) -> QuotationModel:
-        """ Accept current quotation.
+    def accept(self) -> str:
+        """ Accept current quotation and schedule its realisation.
 
+        :return: Id of the scheduled realisation.
         :raise HTTPException [403]: when cancel request came too late.
         :raise HTTPException [403]: when the requester don't have enough right.
         :raise HTTPException [400]: when Quotation update in quotations table failed.
@@ -204,7 +205,7 @@ class QuotationApiLogic:
         repo = OrdersRepository()
         order = repo.read(self.order_id)
         customer_id = order["customer_id"]
-        customer_exist = CustomersRepository().check_customer(customer_id)
+        customer_exist = is_customer(customer_id)
 
         if not customer_exist:
             errmsg = f"Customer {customer_id} don't exist"
@@ -226,29 +227,30 @@ class QuotationApiLogic:
             raise HTTPException(status_code=400, detail=errmsg)
 
         # Schedule realisation
-        # choose randomly one employee to assign the order to
-        list_of_employees = EmployeesRepository().read_all()
-        assigned_employee_id = random.choice(
-            list_of_employees).get("id")
-        # logger.info(f'employee: {assigned_employee_id}')
+        # assign the order to the least busy employee (see ASSIGNMENT_STRATEGY)
+        assigned_employee_id = ASSIGNMENT_SCHEDULER.assign(service=order.get("service"))
+        if assigned_employee_id is None:
+            errmsg = f"No employee available to schedule realisation for order={self.order_id}"
+            raise HTTPException(status_code=400, detail=errmsg)
 
         service = RealisationsApi(RealisationsRepository())
         payload = RealisationCreateModel(order_id=self.order_id,
                                          employee_id=assigned_employee_id,
                                          created_by=None)
-        realisation_id = service.create_realisation(payload.model_dump())
+        try:
+            # The realisation creation moves the order to RESC, on behalf of the customer.
+            realisation_id = service.create_realisation(
+                {**payload.model_dump(), 'author_id': customer_id})
+        except BaseException:
+            ASSIGNMENT_SCHEDULER.release(assigned_employee_id)
+            raise
+
         if not realisation_id:
+            ASSIGNMENT_SCHEDULER.release(assigned_employee_id)
             errmsg = f"Failed to schedule realisation for this order={self.order_id}"
             raise HTTPException(status_code=400, detail=errmsg)
 
-        # Update order status
-        response = repo.update(self.order_id, new_status=OrderStatus.RESC,
-                               author_id=customer_id, comment="Quotation accepted")
-        if not response:
-            errmsg = f"Failed updating {self.id=} in order collection"
-            raise HTTPException(status_code=400, detail=errmsg)
-
-        return response
+        return realisation_id
 
     # ---------------------------------------------------------
     #
@@ -264,7 +266,7 @@ class QuotationApiLogic:
         repo = OrdersRepository()
         order = repo.read(self.order_id)
         customer_id = order["customer_id"]
-        customer_exist = CustomersRepository().check_customer(customer_id)
+        customer_exist = is_customer(customer_id)
 
         if not customer_exist:
             errmsg = f"Customer: {customer_id} don't exist"
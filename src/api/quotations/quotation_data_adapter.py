@@ -4,6 +4,7 @@ from datetime import datetime
 # Third party modules
 from fastapi import HTTPException, status
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pydantic import UUID4
 from typing import List, Optional
 from bson import json_util
@@ -13,8 +14,16 @@ from loguru import logger
 from .models import (QuotationModel, QuotationStatus,
                      QuotationCreateInternalModel, StateUpdateSchema, NotFoundError)
 from ..database import db, from_mongo, PyObjectId
+from ...tools.metrics import instrument_repository
+from ..analytics import analytics_views
 
+# Constants
+TRANSITION_PROJECTION = {"status": 1, "order_id": 1, "service": 1, "price": 1, "created": 1,
+                         "update_history": {"$slice": -1}}
+""" Fields of a quotation before a status change, passed to the analytics views. """
 
+
+@instrument_repository
 class QuotationsRepository:
     """ This class implements the data layer adapter (the CRUD operations).
     """
@@ -60,12 +69,15 @@ class QuotationsRepository:
         :return: Created quotation id.
         """
         try:
-            response = db.quotations.insert_one(payload.model_dump())
-            return str(response.inserted_id)
+            document = payload.model_dump()
+            response = db.quotations.insert_one(document)
         except Exception as e:
             raise HTTPException(status_code=500,
                                 detail=f"Quotation creation failed. Check details provided: {payload}")
 
+        analytics_views.quotation_created(document)
+        return str(response.inserted_id)
+
     # ---------------------------------------------------------
     #
 
@@ -94,27 +106,32 @@ class QuotationsRepository:
         :param author_id: id of who make the modification
         :return: result of update.
         """
-        quotation = self._read(quotation_id=quotation_id)
-
-        if quotation is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail=NotFoundError().detail)
-
         # Update the update history
         update_history_entry = StateUpdateSchema(
             new_status=new_status,
             when=datetime.utcnow(),
             by=author_id)
 
-        response = db.quotations.update_one(
+        # The document replaced by this write: concurrent transitions each
+        # see the status they actually left.
+        quotation = db.quotations.find_one_and_update(
             {"_id": ObjectId(quotation_id)},
             {
                 "$set": {"status": new_status.value},
                 "$push": {"update_history": update_history_entry.model_dump()}
-            }
+            },
+            projection=TRANSITION_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
 
-        return response.raw_result['updatedExisting']
+        if quotation is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=NotFoundError().detail)
+
+        analytics_views.quotation_transition(
+            quotation, new_status, author_id, update_history_entry.when)
+
+        return True
     
     # ---------------------------------------------------------
     #
@@ -11,7 +11,7 @@ VERSION INFO::
 """
 
 # BUILTIN modules
-from typing import List
+from typing import List, Optional
 
 # Third party modules
 from pydantic import UUID4
@@ -29,9 +29,20 @@ from .models import (QuotationCreateModel, QuotationModel,
                      NotFoundError, FailedUpdateError, ConnectError)
 from ..models import ProcessResponseModel, UnknownError
 from ...tools.security import validate_authentication
-from ...worker.quotations_tasks import create_quotation_processor, read_quotation_processor, list_quotations_processor, accept_quotation_processor, reject_quotation_processor, validate_quotation_processor, cancel_quotation_processor
+from ...tools.admission import admit_critical, admit_read, admit_report
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
 
 # Constants
+# Tasks, sent by name (registered in src/worker/quotations_tasks.py).
+create_quotation_processor = TaskRef('tasks.create_quotation')
+read_quotation_processor = TaskRef('tasks.read_quotation')
+list_quotations_processor = TaskRef('tasks.list_quotations')
+accept_quotation_processor = TaskRef('tasks.accept_quotation')
+reject_quotation_processor = TaskRef('tasks.reject_quotation')
+validate_quotation_processor = TaskRef('tasks.validate_quotation')
+cancel_quotation_processor = TaskRef('tasks.cancel_quotation')
+
 ROUTER = APIRouter(prefix=f"/v1/quotations", tags=[f"Quotations"])
 """ Quotation API endpoint router. """
 
@@ -42,15 +53,17 @@ ROUTER = APIRouter(prefix=f"/v1/quotations", tags=[f"Quotations"])
              status_code=202,
              response_model=ProcessResponseModel,
              responses={500: {"model": UnknownError}},
-             dependencies=[Depends(validate_authentication)])
-def create_quotation(payload: QuotationCreateModel) -> ProcessResponseModel:
+             dependencies=[Depends(validate_authentication),
+                           Depends(admit_critical)])
+def create_quotation(payload: QuotationCreateModel,
+                     key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     # payload_json = QuotationCreateModel(**payload.model_dump()).model_dump()
     payload_json = payload.model_dump()
     #print(payload_json)
     try:
         # Add payload message to Celery for processing.
-        result = create_quotation_processor.delay(payload_json)
+        result = enqueue(create_quotation_processor, payload_json, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -68,11 +81,12 @@ def create_quotation(payload: QuotationCreateModel) -> ProcessResponseModel:
 #
 
 
-@ROUTER.get('{/quotation_id}',
+@ROUTER.get('/{quotation_id}',
             status_code=202,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_read)])
 async def get_quotation(quotation_id: str) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
@@ -93,7 +107,8 @@ async def get_quotation(quotation_id: str) -> ProcessResponseModel:
             status_code=status.HTTP_202_ACCEPTED,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_report)])
 async def list_quotations() -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
@@ -120,12 +135,14 @@ async def list_quotations() -> ProcessResponseModel:
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def cancel_quotation(quotation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def cancel_quotation(quotation_id: str, author_id: str,
+                     key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = cancel_quotation_processor.delay(quotation_id, author_id)
+        result = enqueue(cancel_quotation_processor, quotation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -146,12 +163,14 @@ async def cancel_quotation(quotation_id: str, author_id: str) -> ProcessResponse
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def validate_quotation(quotation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def validate_quotation(quotation_id: str, author_id: str,
+                       key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = validate_quotation_processor.delay(quotation_id, author_id)
+        result = enqueue(validate_quotation_processor, quotation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -172,12 +191,14 @@ async def validate_quotation(quotation_id: str, author_id: str) -> ProcessRespon
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def reject_quotation(quotation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def reject_quotation(quotation_id: str, author_id: str,
+                     key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = reject_quotation_processor.delay(quotation_id, author_id)
+        result = enqueue(reject_quotation_processor, quotation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -198,12 +219,14 @@ async def reject_quotation(quotation_id: str, author_id: str) -> ProcessResponse
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def accept_quotation(quotation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def accept_quotation(quotation_id: str, author_id: str,
+                     key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = accept_quotation_processor.delay(quotation_id, author_id)
+        result = enqueue(accept_quotation_processor, quotation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -58,6 +58,7 @@ class RealisationCreateInternalModel(RealisationCreateModel):
     status: RealisationStatus
     assignment_date: datetime = Field(default_factory=datetime.utcnow)
     update_history: Optional[List[StateUpdateSchema]]
+    service: Optional[str] = None  # copied from the order, for the analytics views
 
 
 class RealisationModel(RealisationCreateInternalModel):
@@ -11,7 +11,8 @@ from .realisation_data_adapter import RealisationsRepository
 from ..orders.order_data_adapter import OrdersRepository
 from ..orders.models import OrderStatus
 from ..quotations.quotation_data_adapter import QuotationsRepository
-from ..employees.employee_data_adapter import EmployeesRepository
+from ..utils import is_employee
+from ..employees.assignment_scheduler import ASSIGNMENT_SCHEDULER
 
 
 # ------------------------------------------------------------------------
@@ -70,15 +71,14 @@ class RealisationApiLogic:
 
         # Check the existence of the order
         order_repo = OrdersRepository()
-        order_exist = order_repo.check_order(self.order_id)
-        if not order_exist:
+        order = order_repo.read_status(self.order_id)
+        if not order:
             errmsg = f"Operation not allowed. Order: {self.order_id} don't exist"
             raise HTTPException(status_code=403, detail=errmsg)
 
         # Check if the order status is validated
-        order_validated = order_repo.is_validated(self.order_id)
-        if not order_validated:
-            errmsg = f"Operation not allowed. Order {self.order_id} status is {order_repo.get_status(self.order_id)}"
+        if order['status'] != OrderStatus.ORAC:
+            errmsg = f"Operation not allowed. Order {self.order_id} status is {order['status']}"
             raise HTTPException(status_code=403, detail=errmsg)
         
         # Check if there is a accepted quotation for this order
@@ -91,7 +91,7 @@ class RealisationApiLogic:
         # if the author is set i.e this realisation is created manually
         # check if the author is an employee
         if self.created_by is not None:
-            employee_exist = EmployeesRepository().check_employee(self.created_by)
+            employee_exist = is_employee(self.created_by)
 
             if not employee_exist:
                 errmsg = f"You are not allowed to perform this operation."
@@ -105,7 +105,8 @@ class RealisationApiLogic:
             created_by=self.created_by,
             status=RealisationStatus.RSCH,
             assignment_date=datetime.utcnow(),
-            update_history=[])
+            update_history=[],
+            service=order['service'])
 
         new_realisation_id = self.repo.create(db_realisation)
 
@@ -145,7 +146,7 @@ class RealisationApiLogic:
             errmsg = f"Missing author id."
             raise HTTPException(status_code=403, detail=errmsg)
             
-        employee_exist = EmployeesRepository().check_employee(self.author_id)
+        employee_exist = is_employee(self.author_id)
         if not employee_exist:
                 errmsg = f"You are not allowed to perform this operation."
                 raise HTTPException(status_code=403, detail=errmsg)
@@ -193,7 +194,7 @@ class RealisationApiLogic:
             errmsg = f"Missing author id."
             raise HTTPException(status_code=403, detail=errmsg)
 
-        employee_exist = EmployeesRepository().check_employee(self.author_id)
+        employee_exist = is_employee(self.author_id)
         if not employee_exist:
             errmsg = f"You are not allowed to perform this operation."
             raise HTTPException(status_code=403, detail=errmsg)
@@ -211,6 +212,9 @@ class RealisationApiLogic:
             errmsg = f"Failed updating {self.id=} in realisations table"
             raise HTTPException(status_code=400, detail=errmsg)
 
+        # The employee has one open realisation less.
+        ASSIGNMENT_SCHEDULER.release(self.employee_id)
+
         # Update order status to REST
         order_repo = OrdersRepository()
         response = order_repo.update(
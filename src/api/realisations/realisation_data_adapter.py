@@ -4,6 +4,7 @@ from datetime import datetime
 # Third party modules
 from fastapi import HTTPException, status
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pydantic import UUID4
 from typing import List
 from bson import json_util
@@ -12,8 +13,16 @@ from bson import json_util
 from .models import (RealisationCreateModel, RealisationModel, RealisationStatus,
                      RealisationCreateInternalModel, StateUpdateSchema, NotFoundError, ConnectError)
 from ..database import db, from_mongo, PyObjectId
+from ...tools.metrics import instrument_repository
+from ..analytics import analytics_views
 
+# Constants
+TRANSITION_PROJECTION = {"status": 1, "order_id": 1, "service": 1, "assignment_date": 1,
+                         "update_history": {"$slice": -1}}
+""" Fields of a realisation before a status change, passed to the analytics views. """
 
+
+@instrument_repository
 class RealisationsRepository:
     """ This class implements the data layer adapter (the CRUD operations).
     """
@@ -57,12 +66,15 @@ class RealisationsRepository:
         :return: Created realisation.
         """
         try:
-            response = db.realisations.insert_one(payload.model_dump())
-            return str(response.inserted_id)
+            document = payload.model_dump()
+            response = db.realisations.insert_one(document)
         except Exception as e:
             raise HTTPException(status_code=500,
                                 detail=f"Realisation creation failed. Check details provided: {payload}")
 
+        analytics_views.realisation_created(document)
+        return str(response.inserted_id)
+
     # ---------------------------------------------------------
     #
 
@@ -91,27 +103,32 @@ class RealisationsRepository:
         :param author_id: id of who make the modification
         :return: update result.
         """
-        realisation = self._read(realisation_id=realisation_id)
-
-        if realisation is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail=NotFoundError().detail)
-
         # Update the update history
         update_history_entry = StateUpdateSchema(
             new_status=new_status,
             when=datetime.utcnow(),
             by=author_id)
 
-        response = db.realisations.update_one(
+        # The document replaced by this write: concurrent transitions each
+        # see the status they actually left.
+        realisation = db.realisations.find_one_and_update(
             {"_id": ObjectId(realisation_id)},
             {
                 "$set": {"status": new_status.value},
                 "$push": {"update_history": update_history_entry.model_dump()}
-            }
+            },
+            projection=TRANSITION_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
 
-        return response.raw_result["updatedExisting"]
+        if realisation is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=NotFoundError().detail)
+
+        analytics_views.realisation_transition(
+            realisation, new_status, update_history_entry.when)
+
+        return True
 
     # ---------------------------------------------------------
     #
@@ -11,7 +11,7 @@ VERSION INFO::
 """
 
 # BUILTIN modules
-from typing import List
+from typing import List, Optional
 
 # Third party modules
 from pydantic import UUID4
@@ -29,9 +29,18 @@ from .models import (RealisationCreateModel, RealisationModel,
                      NotFoundError, FailedUpdateError, ConnectError)
 from ..models import ProcessResponseModel, UnknownError
 from ...tools.security import validate_authentication
-from ...worker.realisations_tasks import create_realisation_processor, read_realisation_processor, list_realisations_processor, start_realisation_processor, complete_realisation_processor
+from ...tools.admission import admit_critical, admit_read, admit_report
+from ...tools.idempotency import idempotency_key, enqueue
+from ...tools.task_queue import TaskRef
 
 # Constants
+# Tasks, sent by name (registered in src/worker/realisations_tasks.py).
+create_realisation_processor = TaskRef('tasks.create_realisation')
+read_realisation_processor = TaskRef('tasks.read_realisation')
+list_realisations_processor = TaskRef('tasks.list_realisations')
+start_realisation_processor = TaskRef('tasks.start_realisation')
+complete_realisation_processor = TaskRef('tasks.complete_realisation')
+
 ROUTER = APIRouter(prefix=f"/v1/realisations", tags=[f"Realisations"])
 """ Realisation API endpoint router. """
 
@@ -42,15 +51,17 @@ ROUTER = APIRouter(prefix=f"/v1/realisations", tags=[f"Realisations"])
              status_code=202,
              response_model=ProcessResponseModel,
              responses={500: {"model": UnknownError}},
-             dependencies=[Depends(validate_authentication)])
-def create_realisation(payload: RealisationCreateModel) -> ProcessResponseModel:
+             dependencies=[Depends(validate_authentication),
+                           Depends(admit_critical)])
+def create_realisation(payload: RealisationCreateModel,
+                       key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     # payload_json = RealisationCreateModel(**payload.model_dump()).model_dump()
     payload_json = payload.model_dump()
     #print(payload_json)
     try:
         # Add payload message to Celery for processing.
-        result = create_realisation_processor.delay(payload_json)
+        result = enqueue(create_realisation_processor, payload_json, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -63,11 +74,12 @@ def create_realisation(payload: RealisationCreateModel) -> ProcessResponseModel:
 #
 
 
-@ROUTER.get('{/realisation_id}',
+@ROUTER.get('/{realisation_id}',
             status_code=202,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_read)])
 async def get_realisation(realisation_id: str) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
@@ -88,7 +100,8 @@ async def get_realisation(realisation_id: str) -> ProcessResponseModel:
             status_code=status.HTTP_202_ACCEPTED,
             response_model=ProcessResponseModel,
             responses={500: {"model": UnknownError}},
-            dependencies=[Depends(validate_authentication)])
+            dependencies=[Depends(validate_authentication),
+                          Depends(admit_report)])
 async def list_realisations() -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
@@ -114,12 +127,14 @@ async def list_realisations() -> ProcessResponseModel:
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def start_realisation(realisation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def start_realisation(realisation_id: str, author_id: str,
+                      key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = start_realisation_processor.delay(realisation_id, author_id)
+        result = enqueue(start_realisation_processor, realisation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -140,12 +155,14 @@ async def start_realisation(realisation_id: str, author_id: str) -> ProcessRespo
         404: {'model': NotFoundError},
         400: {'model': FailedUpdateError}
     },
-    dependencies=[Depends(validate_authentication)])
-async def complete_realisation(realisation_id: str, author_id: str) -> ProcessResponseModel:
+    dependencies=[Depends(validate_authentication),
+                  Depends(admit_critical)])
+def complete_realisation(realisation_id: str, author_id: str,
+                         key: Optional[str] = Depends(idempotency_key)) -> ProcessResponseModel:
     """**Trigger Celery task processing of specified payload.**"""
     try:
         # Add payload message to Celery for processing.
-        result = complete_realisation_processor.delay(realisation_id, author_id)
+        result = enqueue(complete_realisation_processor, realisation_id, author_id, key=key)
         logger.debug(f'Added task [{result.id}] to Celery for processing')
         return ProcessResponseModel(status=result.state, id=result.id)
 
@@ -1,19 +1,36 @@
 from ..api.employees.employee_data_adapter import EmployeesRepository
 from ..api.customers.customer_data_adapter import CustomersRepository
 from ..api.orders.order_data_adapter import OrdersRepository
+from ..tools.keyset import current_principal
 from fastapi import HTTPException, status
 
 
+def is_employee(user_id) -> bool:
+    """Check if the user is an employee, without a lookup when the API key acts for that user."""
+    principal = current_principal()
+    if principal is not None and user_id and principal.employee_id == str(user_id):
+        return True
+    return EmployeesRepository().check_exists(user_id)
+
+
+def is_customer(user_id) -> bool:
+    """Check if the user is a customer, without a lookup when the API key acts for that user."""
+    principal = current_principal()
+    if principal is not None and user_id and principal.customer_id == str(user_id):
+        return True
+    return CustomersRepository().check_exists(user_id)
+
+
 def validate_user_is_employee(user_id) -> None:
     """Check if the author is an employee."""
-    if not EmployeesRepository().check_exists(user_id):
+    if not is_employee(user_id):
         raise HTTPException(
             status_code=403, detail=f"Operation not allowed. You must be an employee.")
     
 
 def validate_user_is_customer(user_id) -> None:
     """Check if the author is a customer."""
-    if not CustomersRepository().check_exists(user_id):
+    if not is_customer(user_id):
         raise HTTPException(
             status_code=403, detail=f"Operation not allowed. You must be a customer.")
 
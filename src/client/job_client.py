@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+""" Caller SDK: submit requests and await their task results.
+
+The API answers a request with a task id (202) and the worker publishes
+the task result ``{job_id, status, result, timing}`` on the response
+topic exchange, with the routing key sent in the X-Reply-To header.
+JobClient sends the requests over one pooled httpx AsyncClient and
+consumes its own queue, bound to its routing key, with one subscription,
+resolving a future per job id:
+
+    async with JobClient(api_url, api_key, rabbit_url) as client:
+        order = await client.call('POST', '/v1/orders', json=payload)
+
+Every client gets a unique routing key and a queue deleted with its
+connection by default: it only receives its own results. Give a queue
+name to keep the results published while the client is down.
+SyncJobClient offers the same calls to blocking code.
+"""
+
+# BUILTIN modules
+import asyncio
+import threading
+from uuid import uuid4
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Third party modules
+import httpx
+from loguru import logger
+
+# Local modules
+from ..tools.rabbit_client import RabbitClient
+from ..tools.reply_to import HTTP_HEADER, RESPONSE_EXCHANGE, TOPIC
+
+# Constants
+ROUTING_KEY_PREFIX = 'jobs.'
+""" Prefix of the generated routing keys. """
+
+EARLY_RESULTS = 10_000
+""" Results kept for job ids not submitted yet (the result can beat the HTTP answer). """
+
+
+# ---------------------------------------------------------
+#
+class JobError(Exception):
+    """ A task finished in an other state than SUCCESS. """
+
+    def __init__(self, job_id: str, status: str, result: Any):
+        super().__init__(f'Job {job_id} ended with {status}: {result}')
+        self.job_id = job_id
+        self.status = status
+        self.result = result
+
+
+class JobTimeout(TimeoutError):
+    """ No result was received for a job within the timeout. """
+
+
+# -----------------------------------------------------------------------------
+#
+class JobClient:
+    """ Asynchronous caller of the order processing API. """
+
+    # ---------------------------------------------------------
+    #
+    def __init__(self, base_url: str, api_key: str, rabbit_url: str,
+                 queue: Optional[str] = None, routing_key: Optional[str] = None,
+                 max_connections: int = 100, timeout: float = 60.0, prefetch: int = 500,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """ The class initializer.
+
+        :param base_url: API URL.
+        :param api_key: API key (X-API-Key header).
+        :param rabbit_url: RabbitMQ's connection URL.
+        :param queue: Durable response queue (default: a connection scoped queue).
+        :param routing_key: Routing key of the results (default: unique per client).
+        :param max_connections: HTTP connection pool size.
+        :param timeout: Default seconds to wait for a job result.
+        :param prefetch: Results delivered at once by RabbitMQ.
+        :param transport: httpx transport (tests, in-process app).
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+        self._transport = transport
+        self.routing_key = routing_key or f'{ROUTING_KEY_PREFIX}{uuid4().hex}'
+        self._subscriber = RabbitClient(rabbit_url, queue, self._on_response, prefetch,
+                                        RESPONSE_EXCHANGE, self.routing_key)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._early: OrderedDict = OrderedDict()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._connection = None
+
+    # ---------------------------------------------------------
+    #
+    async def start(self):
+        """ Open the HTTP connection pool and the response subscription. """
+        self._http = httpx.AsyncClient(base_url=self.base_url, limits=self._limits,
+                                       headers={'X-API-Key': self.api_key,
+                                                HTTP_HEADER: f'{TOPIC}:{self.routing_key}'},
+                                       transport=self._transport)
+        self._connection = await self._subscriber.start_subscription()
+
+    async def close(self):
+        """ Close the subscription and the pool, fail the jobs still waiting. """
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+
+        self._pending.clear()
+
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self) -> 'JobClient':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    # ---------------------------------------------------------
+    #
+    async def _on_response(self, message: dict):
+        """ Resolve the future of a received task result. """
+        job_id = message.get('job_id')
+        future = self._pending.get(job_id)
+
+        if future is None:
+            # Not submitted yet (or already given up): keep it a while.
+            self._early[job_id] = message
+
+            if len(self._early) > EARLY_RESULTS:
+                self._early.popitem(last=False)
+
+        elif not future.done():
+            self._resolve(future, message)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, message: dict):
+        if message.get('status') == 'SUCCESS':
+            future.set_result(message.get('result'))
+        else:
+            future.set_exception(JobError(message.get('job_id'), message.get('status'),
+                                          message.get('result')))
+
+    # ---------------------------------------------------------
+    #
+    async def submit(self, method: str, path: str, json: Any = None,
+                     params: Optional[dict] = None,
+                     idempotency_key: Optional[str] = None) -> str:
+        """ Send a request and register its job.
+
+        :param method: HTTP method.
+        :param path: API path, e.g. '/v1/orders'.
+        :param json: JSON body.
+        :param params: Query parameters.
+        :param idempotency_key: Idempotency-Key header (safe resubmission).
+        :return: Job (task) id.
+        :raise httpx.HTTPStatusError: When the API refused the request.
+        """
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        response = await self._http.request(method, path, json=json, params=params,
+                                            headers=headers)
+        response.raise_for_status()
+        job_id = response.json()['id']
+
+        # An idempotent resubmission returns the id of a job already known.
+        if job_id not in self._pending:
+            future = self._pending[job_id] = asyncio.get_running_loop().create_future()
+
+            if (message := self._early.pop(job_id, None)) is not None:
+                self._resolve(future, message)
+
+        return job_id
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        """ Return the result of a submitted job, once (every submitted job must be waited).
+
+        :param job_id: Job id returned by submit.
+        :param timeout: Seconds to wait (default: the client timeout).
+        :raise JobError: When the task failed.
+        :raise JobTimeout: When no result arrived in time (the job is forgotten).
+        """
+        future = self._pending.get(job_id)
+
+        if future is None:
+            raise KeyError(f'Unknown job: {job_id}')
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+
+        except asyncio.TimeoutError:
+            logger.warning(f'No result for job {job_id}')
+            raise JobTimeout(f'No result for job {job_id}') from None
+
+        finally:
+            # Done, timed out or cancelled by the caller: the job is forgotten.
+            if self._pending.get(job_id) is future:
+                del self._pending[job_id]
+
+    async def call(self, method: str, path: str, json: Any = None,
+                   params: Optional[dict] = None, timeout: Optional[float] = None,
+                   idempotency_key: Optional[str] = None) -> Any:
+        """ Send a request and return its task result (see submit and wait). """
+        job_id = await self.submit(method, path, json, params, idempotency_key)
+        return await self.wait(job_id, timeout)
+
+    @property
+    def in_flight(self) -> int:
+        """ Number of jobs waiting for their result. """
+        return sum(not future.done() for future in self._pending.values())
+
+
+# -----------------------------------------------------------------------------
+#
+class SyncJobClient:
+    """ Blocking facade of JobClient, its event loop runs in a daemon thread. """
+
+    def __init__(self, *args, **kwargs):
+        """ The class initializer (arguments of JobClient). """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='job-client', daemon=True)
+        self._thread.start()
+        self._client = JobClient(*args, **kwargs)
+        self._run(self._client.start())
+
+    def _run(self, coroutine, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def submit(self, method: str, path: str, **kwargs) -> str:
+        return self._run(self._client.submit(method, path, **kwargs))
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        return self._run(self._client.wait(job_id, timeout))
+
+    def call(self, method: str, path: str, **kwargs) -> Any:
+        return self._run(self._client.call(method, path, **kwargs))
+
+    def close(self):
+        """ Close the client and stop its event loop. """
+        self._run(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> 'SyncJobClient':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
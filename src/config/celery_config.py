@@ -28,7 +28,8 @@ result_extended = True
 # worker starts (improves start time).
 imports = ('src.worker.tasks', 'src.worker.customers_tasks',
            'src.worker.employees_tasks', 'src.worker.orders_tasks',
-           'src.worker.quotations_tasks', 'src.worker.realisations_tasks')
+           'src.worker.quotations_tasks', 'src.worker.realisations_tasks',
+           'src.worker.pricing_tasks', 'src.worker.analytics_tasks')
 
 # Normalize logging format.
 worker_log_format = '%(asctime)s | %(levelname)-8s | %(processName)s | %(message)s'
@@ -3,6 +3,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from pydantic import ConfigDict
 from pydantic_settings import (BaseSettings, SettingsConfigDict)
+import json
 import os
 
 
@@ -43,5 +44,95 @@ class CommonConfig(BaseSettings):
     service_api_key: str = os.getenv("SERVICE_API_KEY", MISSING_ENV)
     database_name: str = os.getenv("DATABASE_NAME", MISSING_ENV)
 
+    # MongoClient pool size per process (0: derived from the Celery pool).
+    mongo_max_pool_size: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 0))
+
+    # Health checks (background check interval and per check timeout, seconds).
+    health_check_interval: float = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+    health_check_timeout: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", 2))
+
+    # Worker metrics exporter base port (0: disabled); prefork children use port + index.
+    metrics_worker_port: int = int(os.getenv("METRICS_WORKER_PORT", 0))
+
+    # Number of recent timings kept per task name (percentiles window).
+    timing_window: int = int(os.getenv("TIMING_WINDOW", 1000))
+
+    # Tracing span exporter (none, log or file) and file exporter path.
+    trace_exporter: str = os.getenv("TRACE_EXPORTER", "none")
+    trace_file: str = os.getenv("TRACE_FILE", "traces.ndjson")
+
+    # HTTP traffic capture file (empty: disabled) and body bytes kept per request.
+    traffic_capture_file: str = os.getenv("TRAFFIC_CAPTURE_FILE", "")
+    traffic_capture_max_body: int = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY", 65536))
+
+    # Task response transport (kombu, aio_pika or null).
+    response_transport: str = os.getenv("RESPONSE_TRANSPORT", "kombu")
+
+    # Reply routes every caller may use, besides the ones registered on its API
+    # key (reply_queues and reply_hosts of API_KEYS or api_keys), e.g.
+    # REPLY_QUEUES='["billing"]' and REPLY_HOSTS='["hooks.example.com"]'.
+    # CallerService and the topic routes are always allowed; webhooks to
+    # private, loopback and link-local addresses are always refused.
+    reply_queues: list = []
+    reply_hosts: list = []
+
+    # Webhook responses: (connect, read) timeouts in seconds and request headers,
+    # as JSON. No credential belongs here, the callers choose the webhook hosts:
+    # a receiver checks the sender with the body signature, made with the
+    # secret of its host, e.g. WEBHOOK_SECRETS='{"hooks.example.com": "<secret>"}'.
+    url_timeout: tuple = tuple(json.loads(os.getenv("URL_TIMEOUT", "[1.0, 5.0]")))
+    hdr_data: dict = json.loads(os.getenv("HDR_DATA", '{"Content-Type": "application/json"}'))
+    webhook_secrets: dict = {}
+
+    # Webhook delivery (attempts, exponential backoff base and cap in seconds,
+    # batching linger seconds and HTTP/2 when the h2 package is installed).
+    webhook_max_attempts: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 8))
+    webhook_backoff: float = float(os.getenv("WEBHOOK_BACKOFF", 1))
+    webhook_backoff_max: float = float(os.getenv("WEBHOOK_BACKOFF_MAX", 300))
+    webhook_batch_linger: float = float(os.getenv("WEBHOOK_BATCH_LINGER", 0.05))
+    webhook_http2: bool = os.getenv("WEBHOOK_HTTP2", "1") == "1"
+
+    # Webhook circuit breaker (consecutive failures opening a host, seconds open).
+    webhook_breaker_threshold: int = int(os.getenv("WEBHOOK_BREAKER_THRESHOLD", 5))
+    webhook_breaker_cooldown: float = float(os.getenv("WEBHOOK_BREAKER_COOLDOWN", 30))
+
+    # API keys of the integrations, their quotas and the customer or employee
+    # they act for, e.g. API_KEYS='{"sha256:<hex>": {"name": "erp", "rate": 20,
+    # "burst": 40, "employee_id": "<id>", "scopes": ["orders"],
+    # "reply_queues": ["erp"], "reply_hosts": ["erp.example.com"]}}' (plaintext
+    # keys are accepted too). The scopes are the resources the key may call,
+    # the path segment after /v1 ("*", the default, for all of them). Every
+    # key may poll and retry its own tasks, "process" grants all the tasks.
+    # SERVICE_API_KEY is named "service" and unlimited,
+    # unless listed here. Keys of the api_keys collection are checked for
+    # changes every API_KEYS_RELOAD_INTERVAL seconds.
+    api_keys: dict = {}
+    api_keys_reload_interval: float = float(os.getenv("API_KEYS_RELOAD_INTERVAL", 30))
+
+    # Default quota of the integrations (requests per second, 0: unlimited,
+    # and burst) and seconds of quota an API process leases from Redis at once.
+    rate_limit_rate: float = float(os.getenv("RATE_LIMIT_RATE", 50))
+    rate_limit_burst: int = int(os.getenv("RATE_LIMIT_BURST", 100))
+    rate_limit_lease: float = float(os.getenv("RATE_LIMIT_LEASE", 0.2))
+
+    # Admission control: task queue depth above which the report, read and
+    # critical requests are refused (0: never), seconds the depth is cached
+    # and Retry-After seconds at the threshold.
+    admission_report_depth: int = int(os.getenv("ADMISSION_REPORT_DEPTH", 2000))
+    admission_read_depth: int = int(os.getenv("ADMISSION_READ_DEPTH", 10000))
+    admission_critical_depth: int = int(os.getenv("ADMISSION_CRITICAL_DEPTH", 50000))
+    admission_depth_ttl: float = float(os.getenv("ADMISSION_DEPTH_TTL", 1))
+    admission_retry_after: int = int(os.getenv("ADMISSION_RETRY_AFTER", 5))
+
+    # Idempotency keys (seconds a key and its stored result are kept).
+    idempotency_ttl: int = int(os.getenv("IDEMPOTENCY_TTL", 86400))
+
+    # Realisation assignment (round_robin, least_loaded or skill_weighted).
+    assignment_strategy: str = os.getenv("ASSIGNMENT_STRATEGY", "least_loaded")
+    assignment_refresh_interval: float = float(os.getenv("ASSIGNMENT_REFRESH_INTERVAL", 60))
+
+    # Pricing (seconds between price table version checks).
+    pricing_reload_interval: float = float(os.getenv("PRICING_RELOAD_INTERVAL", 30))
+
 
 config = CommonConfig()
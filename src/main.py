@@ -1,5 +1,7 @@
 # BUILTIN modules
+import asyncio
 from typing import Any
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Third party modules
@@ -8,13 +10,37 @@ from fastapi.staticfiles import StaticFiles
 
 # local modules
 from .config.setup import config
-from .api import process_routes, health_route
+from .api import process_routes, health_route, metrics_route
 from .api.customers.router import router as customers_router
 from .api.employees.router import ROUTER as employees_router
 from .api.orders.router import router as orders_router
 from .api.quotations.router import ROUTER as quotations_router
 from .api.realisations.router import ROUTER as realisations_router
+from .api.pricing.router import ROUTER as pricing_router
+from .api.analytics.router import ROUTER as analytics_router
 from .api.documentation import (license_info, tags_metadata, description)
+from .tools.health_manager import HEALTH_MONITOR
+from .tools.metrics import MetricsMiddleware
+from .tools.tracing import TracingMiddleware
+from .tools.traffic_capture import TrafficCaptureMiddleware, get_writer
+from .tools.reply_to import ReplyToMiddleware
+from .tools.keyset import get_keyset
+
+
+# ---------------------------------------------------------
+#
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """ Load the API keyset, then run the background resource health checks while the service is up. """
+
+    await asyncio.to_thread(get_keyset().reload)
+    await HEALTH_MONITOR.start()
+    yield
+    await HEALTH_MONITOR.stop()
+
+    # Write the traffic capture records still queued.
+    if writer := get_writer():
+        await asyncio.to_thread(writer.close)
 
 
 # -----------------------------------------------------------------------------
@@ -38,6 +64,7 @@ class Service(FastAPI):
         :param kwargs: key-value pair arguments.
         """
 
+        kwargs.setdefault('lifespan', lifespan)
         super().__init__(*args, **kwargs)
 
         # Needed for OpenAPI Markdown images to be displayed.
@@ -48,11 +75,26 @@ class Service(FastAPI):
         # the order is related to the documentation order).
         self.include_router(process_routes.ROUTER)
         self.include_router(health_route.ROUTER)
+        self.include_router(metrics_route.ROUTER)
         self.include_router(customers_router)
         self.include_router(employees_router)
         self.include_router(orders_router)
         self.include_router(quotations_router)
         self.include_router(realisations_router)
+        self.include_router(pricing_router)
+        self.include_router(analytics_router)
+
+        # The X-Reply-To route of a request travels with its tasks.
+        self.add_middleware(ReplyToMiddleware)
+
+        # Per route latency histograms, served by the /metrics endpoint.
+        self.add_middleware(MetricsMiddleware)
+
+        # Every request runs in a trace span, propagated to the tasks.
+        self.add_middleware(TracingMiddleware)
+
+        # Outermost: the captured durations include the other middlewares.
+        self.add_middleware(TrafficCaptureMiddleware)
 
 
 # ---------------------------------------------------------
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+""" Admission control of the task requests, by broker queue depth.
+
+Every route publishing a task declares its class with a dependency:
+
+    critical  state changes (create, cancel, validate...), shed last
+    read      single document reads
+    report    lists and analytics, shed first
+
+The depth of the Celery task queue is read with a passive queue_declare
+on a pooled broker connection, at most every ADMISSION_DEPTH_TTL seconds
+per API process. Above the depth threshold of its class, a request is
+refused before anything is published: 429 for the read and report
+classes, 503 for the critical one, both with a Retry-After growing with
+the backlog. A depth that cannot be read admits the requests (the publish
+itself reports the broker failure) and is read again after
+HEALTH_CHECK_INTERVAL seconds.
+"""
+
+# BUILTIN modules
+import threading
+from math import ceil
+from time import monotonic
+from typing import Callable, Optional, Tuple
+
+# Third party modules
+from loguru import logger
+from fastapi import HTTPException, status
+
+# Local modules
+from ..config.setup import config
+from .metrics import ADMISSION_REJECTIONS
+from .task_queue import WORKER
+
+# Constants
+CRITICAL, READ, REPORT = 'critical', 'read', 'report'
+""" Task classes, by decreasing priority. """
+
+RETRY_AFTER_MAX = 120
+""" Longest Retry-After sent, in seconds. """
+
+
+# ---------------------------------------------------------
+#
+def broker_queue_depth() -> int:
+    """ Return the number of ready messages of the Celery task queue.
+
+    :return: Ready messages.
+    :raise Exception: When the broker can't be reached or the queue is missing.
+    """
+    # Eagerly applied tasks never wait in a queue.
+    if WORKER.conf.task_always_eager:
+        return 0
+
+    queue = WORKER.conf.task_default_queue
+
+    with WORKER.pool.acquire(block=True, timeout=config.health_check_timeout) as conn:
+        return conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+
+
+# ------------------------------------------------------------------------
+#
+class AdmissionController:
+    """ Shed the requests of the classes whose depth threshold is exceeded. """
+
+    def __init__(self, depth_reader: Callable[[], int] = broker_queue_depth,
+                 clock: Callable = monotonic):
+        """ The class initializer.
+
+        :param depth_reader: Return the task queue depth.
+        :param clock: Monotonic clock of the depth cache.
+        """
+        self.depth_reader = depth_reader
+        self.clock = clock
+        self.limits = {CRITICAL: config.admission_critical_depth,
+                       READ: config.admission_read_depth,
+                       REPORT: config.admission_report_depth}
+        self._depth: Optional[int] = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def depth(self) -> Optional[int]:
+        """ Return the cached queue depth, read again when older than the TTL.
+
+        One request refreshes it, the concurrent ones use the previous value.
+
+        :return: Queue depth, None when unknown.
+        """
+        if self.clock() - self._checked < config.admission_depth_ttl:
+            return self._depth
+
+        if not self._lock.acquire(blocking=False):
+            return self._depth
+
+        try:
+            try:
+                self._depth = self.depth_reader()
+                self._checked = self.clock()
+
+            except Exception as why:
+                logger.warning(f'Task queue depth unavailable: {why}')
+                self._depth = None
+
+                # Not retried on every TTL: a broker down costs a connect timeout.
+                self._checked = self.clock() + config.health_check_interval
+
+        finally:
+            self._lock.release()
+
+        return self._depth
+
+    def check(self, task_class: str) -> Optional[Tuple[int, int]]:
+        """ Return the refusal of a request, None when it is admitted.
+
+        :param task_class: CRITICAL, READ or REPORT.
+        :return: HTTP status and Retry-After seconds.
+        """
+        limit = self.limits.get(task_class)
+
+        if not limit or (depth := self.depth()) is None or depth < limit:
+            return None
+
+        code = (status.HTTP_503_SERVICE_UNAVAILABLE if task_class == CRITICAL
+                else status.HTTP_429_TOO_MANY_REQUESTS)
+
+        return code, min(RETRY_AFTER_MAX, ceil(config.admission_retry_after * depth / limit))
+
+
+_CONTROLLER: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    """ Return the admission controller of this process. """
+    global _CONTROLLER
+
+    if _CONTROLLER is None:
+        _CONTROLLER = AdmissionController()
+
+    return _CONTROLLER
+
+
+def set_controller(controller: Optional[AdmissionController]):
+    """ Replace the admission controller of this process (None: back to default). """
+    global _CONTROLLER
+    _CONTROLLER = controller
+
+
+# ---------------------------------------------------------
+#
+def admission(task_class: str) -> Callable:
+    """ Return the route dependency admitting the requests of a task class.
+
+    :param task_class: CRITICAL, READ or REPORT.
+    :return: FastAPI dependency.
+    """
+
+    def admit():
+        if refusal := get_controller().check(task_class):
+            code, retry_after = refusal
+            ADMISSION_REJECTIONS.labels(task_class, str(code)).inc()
+            raise HTTPException(status_code=code,
+                                detail='Too many tasks waiting, retry later',
+                                headers={'Retry-After': str(retry_after)})
+
+    return admit
+
+
+admit_critical = admission(CRITICAL)
+admit_read = admission(READ)
+admit_report = admission(REPORT)
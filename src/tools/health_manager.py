@@ -11,20 +11,29 @@ VERSION INFO::
 """
 
 # BUILTIN modules
-from typing import List
+import asyncio
+from time import monotonic
+from typing import List, Optional, Tuple
 
 # Third party modules
+import pymongo
 from loguru import logger
 
 # local modules
-from ..worker.tasks import WORKER
+from .task_queue import WORKER
 from ..config.setup import config
+from ..api import database
 from ..api.models import ResourceModel, HealthResponseModel
+from .redis_client import get_redis
+
+# Constants
+WORKER_PING_TIMEOUT = 1.0
+""" Seconds to wait for Celery worker ping replies. """
 
 
 # ---------------------------------------------------------
 #
-async def _get_celery_worker_status() -> List[ResourceModel]:
+def _get_celery_worker_status() -> List[ResourceModel]:
     """ Return Celery worker(s) connection status.
 
     :return: Celery worker(s) connection status.
@@ -33,7 +42,7 @@ async def _get_celery_worker_status() -> List[ResourceModel]:
     result = []
 
     try:
-        if items := WORKER.control.ping(timeout=0.1):
+        if items := WORKER.control.ping(timeout=WORKER_PING_TIMEOUT):
 
             for worker in [key for elem in items for key in elem.keys()]:
                 result += [ResourceModel(name=f'Celery.worker ({worker})', status=True)]
@@ -51,8 +60,10 @@ async def _get_celery_worker_status() -> List[ResourceModel]:
 
 # ---------------------------------------------------------
 #
-async def _get_celery_main_status() -> list:
-    """ Return Celery RabbitMQ broker and MongoDB backend connection status.
+def _get_celery_main_status() -> List[ResourceModel]:
+    """ Return Celery RabbitMQ broker and Redis backend connection status.
+
+    The broker check uses a pooled connection, kept open between checks.
 
     :return: Celery broker and backend connection status.
     """
@@ -60,9 +71,8 @@ async def _get_celery_main_status() -> list:
     result = []
 
     try:
-        with WORKER.connection_for_write() as conn:
-            conn.connect()
-            conn.release()
+        with WORKER.pool.acquire(block=True, timeout=config.health_check_timeout) as conn:
+            conn.ensure_connection(max_retries=1)
             broker_state = True
 
     except BaseException as why:
@@ -72,33 +82,177 @@ async def _get_celery_main_status() -> list:
     result += [ResourceModel(name='Celery.broker (RabbitMq)', status=broker_state)]
 
     try:
-        # noinspection PyProtectedMember
-        WORKER.backend._get_connection().server_info()
-        backend_state = True
+        backend_state = get_redis().ping()
 
     except BaseException as why:
         logger.error(f'BACKEND: {why}')
         backend_state = False
 
-    result += [ResourceModel(name='Celery.backend (MongoDb)', status=backend_state)]
+    result += [ResourceModel(name='Celery.backend (Redis)', status=backend_state)]
 
     return result
 
 
+# ---------------------------------------------------------
+#
+def _get_mongo_status() -> List[ResourceModel]:
+    """ Return the service database connection status.
+
+    :return: MongoDb connection status.
+    """
+
+    try:
+        with pymongo.timeout(config.health_check_timeout):
+            database.get_client().admin.command('ping')
+        mongo_state = True
+
+    except BaseException as why:
+        logger.error(f'MONGO: {why}')
+        mongo_state = False
+
+    return [ResourceModel(name='MongoDb', status=mongo_state)]
+
+
+CHECKS = (_get_celery_main_status, _get_mongo_status, _get_celery_worker_status)
+""" Resource checks, in the reported order. """
+
+
+# ------------------------------------------------------------------------
+#
+class HealthMonitor:
+    """ Run the resource checks in the background and cache the result.
+
+    The blocking checks run concurrently in worker threads every
+    ``interval`` seconds; the health endpoint only reads the cached,
+    already serialized, response.
+    """
+
+    # ---------------------------------------------------------
+    #
+    def __init__(self, interval: float = 10.0):
+        """ The class initializer.
+
+        :param interval: Seconds between two check rounds.
+        """
+        self.interval = interval
+
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._checked: Optional[float] = None
+        self._status = HealthResponseModel(status=False, version=config.version,
+                                           name=config.service_name, resources=[])
+        self._response: Tuple[int, bytes] = (500, self._status.model_dump_json().encode())
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def status(self) -> HealthResponseModel:
+        """ Return the last health status. """
+        return self._status
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def response(self) -> Tuple[int, bytes]:
+        """ Return the last (HTTP status code, JSON body) health response. """
+        return self._response
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def stale(self) -> bool:
+        """ Return True when no check round completed recently. """
+        return self._checked is None or \
+            monotonic() - self._checked > 3 * self.interval
+
+    # ---------------------------------------------------------
+    #
+    async def refresh(self) -> HealthResponseModel:
+        """ Run all checks once and update the cached status.
+
+        Concurrent callers share the check round already running, so a
+        burst of probes on a stale cache runs the blocking checks once.
+
+        :return: Service health status.
+        """
+
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh())
+
+        # Shielded: a cancelled probe does not cancel the shared round.
+        return await asyncio.shield(self._refreshing)
+
+    # ---------------------------------------------------------
+    #
+    async def _refresh(self) -> HealthResponseModel:
+        """ Run all checks once and update the cached status.
+
+        :return: Service health status.
+        """
+
+        results = await asyncio.gather(*[asyncio.to_thread(check) for check in CHECKS])
+        resource_items = [item for items in results for item in items]
+        total_status = (all(key.status for key in resource_items)
+                        if resource_items else False)
+
+        self._status = HealthResponseModel(status=total_status,
+                                           version=config.version,
+                                           name=config.service_name,
+                                           resources=resource_items)
+        self._response = (200 if total_status else 500,
+                          self._status.model_dump_json().encode())
+        self._checked = monotonic()
+
+        return self._status
+
+    # ---------------------------------------------------------
+    #
+    async def _run(self):
+        """ Check the resources every interval until cancelled. """
+
+        while True:
+            try:
+                await self.refresh()
+
+            except Exception as why:
+                logger.error(f'HEALTH: {why}')
+
+            await asyncio.sleep(self.interval)
+
+    # ---------------------------------------------------------
+    #
+    async def start(self):
+        """ Start the background checks in the running event loop. """
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    # ---------------------------------------------------------
+    #
+    async def stop(self):
+        """ Stop the background checks. """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+HEALTH_MONITOR = HealthMonitor(interval=config.health_check_interval)
+""" Process wide health monitor (started with the API service). """
+
+
 # ---------------------------------------------------------
 #
 async def get_health_status() -> HealthResponseModel:
     """ Return Health status for used resources.
 
+    Served from the background check cache; checks run inline only
+    when the background checks are not running.
+
     :return: Service health status.
     """
-    resource_items = []
-    resource_items += await _get_celery_main_status()
-    resource_items += await _get_celery_worker_status()
-    total_status = (all(key.status for key in resource_items)
-                    if resource_items else False)
-
-    return HealthResponseModel(status=total_status,
-                               version=config.version,
-                               name=config.service_name,
-                               resources=resource_items)
+
+    if HEALTH_MONITOR.stale:
+        return await HEALTH_MONITOR.refresh()
+
+    return HEALTH_MONITOR.status
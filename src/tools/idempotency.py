@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+import json
+import hashlib
+from uuid import uuid4
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+# Third party modules
+from loguru import logger
+from fastapi import Header, HTTPException
+from celery.result import AsyncResult
+from kombu.exceptions import OperationalError
+from pymongo.errors import DuplicateKeyError
+
+# local modules
+from .redis_client import get_redis
+from .keyset import current_principal
+from ..config.setup import config
+
+# Constants
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+""" HTTP header carrying the client supplied idempotency key. """
+KEY_PREFIX = 'idempotency'
+""" Redis key prefix for reservations, claims and stored results. """
+COLLECTION = 'idempotency_keys'
+""" Mongo collection holding stored results (unique on _id). """
+CLAIM_TTL = 300
+""" Seconds a worker claim is held while the task body runs. """
+ANONYMOUS = '-'
+""" Key owner of the requests made without a principal. """
+TAKE_OVER = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+""" Replace the reservation record ARGV[1] by ARGV[2], only when unchanged. """
+
+_INDEXES_CREATED = False
+
+
+# -----------------------------------------------------------------------------
+#
+class DuplicateInProgressError(Exception):
+    """ Raised when another task run currently holds the idempotency claim. """
+
+
+# ---------------------------------------------------------
+#
+def idempotency_key(key: Optional[str] = Header(
+        None, alias=IDEMPOTENCY_HEADER, max_length=255)) -> Optional[str]:
+    """ Return the optional Idempotency-Key header of the request.
+
+    :param key: Client supplied idempotency key.
+    :return: Idempotency key or None.
+    """
+    return key
+
+
+# ---------------------------------------------------------
+#
+def _scope(task_name: str, key: str, owner: Optional[str] = None) -> str:
+    """ Return the key scope, so the same key can be used by different
+    integrations and on different endpoints.
+
+    :param task_name: Celery task name.
+    :param key: Client supplied idempotency key.
+    :param owner: Principal name of the request that used the key.
+    :return: Scoped key.
+    """
+    return f'{KEY_PREFIX}:{owner or ANONYMOUS}:{task_name}:{key}'
+
+
+def _digest(args: tuple) -> str:
+    """ Return the SHA-256 of the task arguments, to tell a replay from a reused key. """
+    return hashlib.sha256(json.dumps(args, sort_keys=True, default=str)
+                          .encode('utf-8')).hexdigest()
+
+
+def _record(value: bytes) -> dict:
+    """ Return a reservation record: the task id and the arguments digest. """
+    return json.loads(value)
+
+
+# ---------------------------------------------------------
+#
+def enqueue(task, *args, key: Optional[str] = None) -> AsyncResult:
+    """ Add task to Celery, short-circuiting duplicate requests.
+
+    A request carrying an idempotency key reserves the key of its
+    principal in Redis (SET NX) with the task id and a digest of the
+    arguments before it is published. A replay of the same key returns
+    the original task instead of reaching the broker again, unless the
+    original task failed: the new task then takes the key over with a
+    compare-and-set, only the request winning it publishes.
+
+    :param task: Celery task to send.
+    :param args: Task arguments.
+    :param key: Optional idempotency key.
+    :return: Celery result for the new (or original) task.
+    :raise HTTPException(422): When the key was used with other arguments.
+    :raise OperationalError: when the broker is not reachable.
+    """
+
+    if not key:
+        return task.delay(*args)
+
+    redis = get_redis()
+    task_id = str(uuid4())
+    owner = getattr(current_principal(), 'name', None)
+    reservation = _scope(task.name, key, owner)
+    digest = _digest(args)
+    record = json.dumps({'task_id': task_id, 'digest': digest})
+
+    while not redis.set(reservation, record, nx=True, ex=config.idempotency_ttl):
+
+        # Expired in between: reserve again.
+        if (existing := redis.get(reservation)) is None:
+            continue
+
+        stored = _record(existing)
+
+        if stored['digest'] != digest:
+            raise HTTPException(
+                status_code=422,
+                detail=f'Idempotency key {key} was used with a different payload')
+
+        result = AsyncResult(stored['task_id'], app=task.app)
+
+        if result.state != 'FAILURE':
+            logger.debug(f'Idempotency key {key} replayed, '
+                         f'returning task [{result.id}]')
+            return result
+
+        # The original task failed: take over, unless a concurrent replay did.
+        if redis.register_script(TAKE_OVER)(keys=[reservation],
+                                            args=[existing, record, config.idempotency_ttl]):
+            break
+
+    try:
+        return task.apply_async(args=args, kwargs={'idempotency_key': key,
+                                                   'idempotency_owner': owner},
+                                task_id=task_id)
+
+    except OperationalError:
+        redis.delete(reservation)
+        raise
+
+
+# ---------------------------------------------------------
+#
+def rebind(task_name: str, key: str, task_id: str, owner: Optional[str] = None):
+    """ Point an idempotency key reservation to a new task (used by retries).
+
+    :param task_name: Celery task name.
+    :param key: Idempotency key.
+    :param task_id: New task id.
+    :param owner: Principal name of the original request.
+    """
+    redis = get_redis()
+    reservation = _scope(task_name, key, owner)
+
+    if existing := redis.get(reservation):
+        redis.set(reservation, json.dumps({**_record(existing), 'task_id': task_id}),
+                  ex=config.idempotency_ttl)
+
+
+# ---------------------------------------------------------
+#
+def _collection():
+    """ Return the stored results collection, creating its indexes once. """
+    global _INDEXES_CREATED
+
+    from ..api.database import db
+
+    collection = db[COLLECTION]
+
+    if not _INDEXES_CREATED:
+        collection.create_index('created', expireAfterSeconds=config.idempotency_ttl)
+        _INDEXES_CREATED = True
+
+    return collection
+
+
+# ---------------------------------------------------------
+#
+def load_result(scope: str) -> Tuple[bool, Any]:
+    """ Return a previously stored task result.
+
+    :param scope: Scoped idempotency key.
+    :return: (found, result) tuple.
+    """
+
+    redis = get_redis()
+
+    if (stored := redis.get(f'{scope}:result')) is not None:
+        return True, json.loads(stored)
+
+    if doc := _collection().find_one({'_id': scope}):
+        redis.set(f'{scope}:result', json.dumps(doc['result'], default=str),
+                  ex=config.idempotency_ttl)
+        return True, doc['result']
+
+    return False, None
+
+
+# ---------------------------------------------------------
+#
+def save_result(scope: str, task_id: str, result: Any) -> Any:
+    """ Store a task result, the first writer for a key wins.
+
+    :param scope: Scoped idempotency key.
+    :param task_id: Id of the task that produced the result.
+    :param result: Task result.
+    :return: Stored result (the earlier one when a duplicate got there first).
+    """
+
+    collection = _collection()
+
+    try:
+        collection.insert_one({'_id': scope, 'task_id': task_id,
+                               'result': result, 'created': datetime.utcnow()})
+
+    except DuplicateKeyError:
+        result = collection.find_one({'_id': scope})['result']
+
+    get_redis().set(f'{scope}:result', json.dumps(result, default=str),
+                    ex=config.idempotency_ttl)
+
+    return result
+
+
+# ---------------------------------------------------------
+#
+def idempotent(func: Callable) -> Callable:
+    """ Task decorator returning the stored result on idempotency key replays.
+
+    The key and its owner are received as the ``idempotency_key`` and
+    ``idempotency_owner`` keyword arguments (see enqueue), so they survive
+    broker redeliveries, autoretries and the retry endpoint. Tasks sent
+    without a key run unchanged.
+
+    :param func: Bound Celery task function.
+    :return: Wrapped task function.
+    """
+
+    @wraps(func)
+    def wrapper(task, *args, idempotency_key: Optional[str] = None,
+                idempotency_owner: Optional[str] = None, **kwargs):
+
+        if not idempotency_key:
+            return func(task, *args, **kwargs)
+
+        scope = _scope(task.name, idempotency_key, idempotency_owner)
+        found, stored = load_result(scope)
+
+        if found:
+            logger.info(f"Task '{task.name}' replayed idempotency key "
+                        f"{idempotency_key}, returning stored result")
+            return stored
+
+        redis = get_redis()
+        claim = f'{scope}:claim'
+
+        if not redis.set(claim, task.request.id, nx=True, ex=CLAIM_TTL):
+            owner = redis.get(claim)
+
+            if owner and owner.decode() != task.request.id:
+                raise DuplicateInProgressError(
+                    f'Idempotency key {idempotency_key} is being '
+                    f'processed by task [{owner.decode()}]')
+
+        try:
+            result = func(task, *args, **kwargs)
+
+        except BaseException:
+            redis.delete(claim)
+            raise
+
+        # Release the claim only once the result is stored.
+        result = save_result(scope, task.request.id, result)
+        redis.delete(claim)
+
+        return result
+
+    return wrapper
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+""" API keys, kept as SHA-256 hashes, and the principals owning them.
+
+The keyset maps the hash of every valid key to its principal: the
+integration name, its request quota, the customer or employee it acts
+for, its scopes and the reply queues and webhook hosts it registered. It is built from the configuration (SERVICE_API_KEY
+and API_KEYS) and the ``api_keys`` collection:
+
+    {_id: <sha256 hex of the key>, name, rate, burst, customer_id,
+     employee_id, scopes, reply_queues, reply_hosts, active, updated}
+
+A key is authenticated with one hash and one dict lookup, the plaintext
+keys are never stored. Every ``reload_interval`` seconds a daemon thread
+checks the collection version (document count, revoked key count and
+last ``updated``) and rebuilds the keyset when it changed, so added and
+revoked keys (active false) apply without a restart while the requests
+never wait for Mongo. Other changes of a key (quota, scopes...) must set
+a later ``updated`` to be seen.
+
+Scopes name the resources a key may call, the first path segment after
+the API version (orders, quotations, customers...), '*' for all of them.
+A key without a ``scopes`` entry gets '*'; they are checked by
+validate_authentication (src/tools/security.py). Every key may poll and
+retry the tasks it published (``process``); granting ``process`` opens
+all the tasks.
+
+The principal of a request is kept in a context variable, carried in the
+task message headers and restored around the task run in the worker.
+"""
+
+# BUILTIN modules
+import hashlib
+import threading
+from time import monotonic
+from contextvars import ContextVar, Token
+from typing import Dict, Iterable, Optional, Tuple
+
+# Third party modules
+from loguru import logger
+from pymongo import DESCENDING
+
+# Local modules
+from ..config.setup import config
+
+# Constants
+COLLECTION = 'api_keys'
+""" Mongo collection of the hashed API keys. """
+
+HASH_PREFIX = 'sha256:'
+""" Marks an API_KEYS entry given as a hash instead of a plaintext key. """
+
+HEADER = 'principal'
+""" Celery message header carrying the principal of the request. """
+
+SERVICE_NAME = 'service'
+""" Name of the SERVICE_API_KEY owner. """
+
+ALL_SCOPES = '*'
+""" Scope granting every resource. """
+
+_INDEXES_CREATED = False
+
+
+# ---------------------------------------------------------
+#
+def hash_key(api_key: str) -> str:
+    """ Return the SHA-256 hex digest of an API key. """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+#
+class Principal:
+    """ Owner of an API key: integration, quota, actor, scopes and reply routes. """
+
+    __slots__ = ('name', 'rate', 'burst', 'customer_id', 'employee_id', 'scopes',
+                 'reply_queues', 'reply_hosts')
+
+    def __init__(self, name: str, rate: float = 0, burst: int = 0,
+                 customer_id: Optional[str] = None, employee_id: Optional[str] = None,
+                 scopes: Iterable[str] = (), reply_queues: Iterable[str] = (),
+                 reply_hosts: Iterable[str] = ()):
+        """ The class initializer.
+
+        :param name: Integration name.
+        :param rate: Requests per second (0: unlimited).
+        :param burst: Requests allowed at once.
+        :param customer_id: Customer the key acts for.
+        :param employee_id: Employee the key acts for.
+        :param scopes: Granted scopes.
+        :param reply_queues: Reply queues registered for the key.
+        :param reply_hosts: Webhook hosts registered for the key.
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.customer_id = str(customer_id) if customer_id else None
+        self.employee_id = str(employee_id) if employee_id else None
+        self.scopes: Tuple[str, ...] = tuple(scopes)
+        self.reply_queues: Tuple[str, ...] = tuple(reply_queues)
+        self.reply_hosts: Tuple[str, ...] = tuple(host.lower() for host in reply_hosts)
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> 'Principal':
+        """ Return the principal of an API_KEYS entry or api_keys document. """
+        return cls(spec['name'], float(spec.get('rate', config.rate_limit_rate)),
+                   int(spec.get('burst', config.rate_limit_burst)),
+                   spec.get('customer_id'), spec.get('employee_id'),
+                   spec.get('scopes', (ALL_SCOPES,)),
+                   spec.get('reply_queues', ()), spec.get('reply_hosts', ()))
+
+    def allows(self, scope: str) -> bool:
+        """ Return True when the principal may call a resource scope. """
+        return ALL_SCOPES in self.scopes or scope in self.scopes
+
+    def to_header(self) -> dict:
+        """ Return the principal as a message header value (no quota). """
+        return {'name': self.name, 'customer_id': self.customer_id,
+                'employee_id': self.employee_id, 'scopes': list(self.scopes),
+                'reply_queues': list(self.reply_queues), 'reply_hosts': list(self.reply_hosts)}
+
+    def __repr__(self) -> str:
+        return f'Principal({self.name!r}, rate={self.rate}, burst={self.burst})'
+
+
+# ---------------------------------------------------------
+#
+def _collection():
+    """ Return the API keys collection, creating its index once. """
+    global _INDEXES_CREATED
+
+    from ..api.database import db
+
+    collection = db[COLLECTION]
+
+    if not _INDEXES_CREATED:
+        collection.create_index([('updated', DESCENDING)])
+        _INDEXES_CREATED = True
+
+    return collection
+
+
+def config_keys() -> Dict[str, Principal]:
+    """ Return the principals of SERVICE_API_KEY and API_KEYS, by key hash. """
+    keys = {hash_key(config.service_api_key): Principal(SERVICE_NAME, scopes=(ALL_SCOPES,))}
+
+    for key, spec in config.api_keys.items():
+        digest = key[len(HASH_PREFIX):] if key.startswith(HASH_PREFIX) else hash_key(key)
+        keys[digest.lower()] = Principal.from_spec(spec)
+
+    return keys
+
+
+# ------------------------------------------------------------------------
+#
+class KeySet:
+    """ Hash to principal map of the valid API keys, reloaded in the background. """
+
+    def __init__(self, reload_interval: float = 30.0, collection=None):
+        """ The class initializer.
+
+        :param reload_interval: Seconds between collection version checks.
+        :param collection: API keys collection (default: the service database).
+        """
+        self.reload_interval = reload_interval
+        self._source = collection
+        self._keys: Optional[Dict[str, Principal]] = None
+        self._version = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        return self._source if self._source is not None else _collection()
+
+    # ---------------------------------------------------------
+    #
+    def lookup(self, api_key: Optional[str]) -> Optional[Principal]:
+        """ Return the principal of an API key, None when the key is not valid.
+
+        :param api_key: Plaintext key of the request.
+        """
+        if self._keys is None:
+            self._keys = config_keys()
+
+        if self._checked is None or monotonic() - self._checked >= self.reload_interval:
+            self._reload_in_background()
+
+        return self._keys.get(hash_key(api_key)) if api_key else None
+
+    def _reload_in_background(self):
+        if self._lock.acquire(blocking=False):
+            self._checked = monotonic()
+            threading.Thread(target=self._reload_locked, name='keyset-reload',
+                             daemon=True).start()
+
+    def _reload_locked(self):
+        try:
+            self._reload()
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """ Check the collection version now, rebuilding the keyset when it changed. """
+        with self._lock:
+            self._reload()
+
+    def _reload(self):
+        """ Rebuild the keyset if the collection changed (lock held). """
+        try:
+            collection = self.collection
+            last = collection.find_one({}, {'_id': 0, 'updated': 1},
+                                       sort=[('updated', DESCENDING)])
+            version = (collection.estimated_document_count(),
+                       collection.count_documents({'active': False}),
+                       last and last.get('updated'))
+
+            if version != self._version or self._keys is None:
+                keys = config_keys()
+
+                for doc in collection.find({'active': {'$ne': False}}):
+                    keys[doc['_id']] = Principal.from_spec(doc)
+
+                self._keys, self._version = keys, version
+                logger.info(f'API keyset loaded: {len(keys)} keys')
+
+        except Exception as why:
+            # Keep authenticating with the keyset in use, retry on the next check.
+            logger.error(f'API keyset reload failed: {why}')
+
+            if self._keys is None:
+                self._keys = config_keys()
+
+        self._checked = monotonic()
+
+
+_KEYSET: Optional[KeySet] = None
+
+
+def get_keyset() -> KeySet:
+    """ Return the API keyset of this process. """
+    global _KEYSET
+
+    if _KEYSET is None:
+        _KEYSET = KeySet(config.api_keys_reload_interval)
+
+    return _KEYSET
+
+
+def set_keyset(keyset: Optional[KeySet]):
+    """ Replace the API keyset of this process (None: back to default). """
+    global _KEYSET
+    _KEYSET = keyset
+
+
+# ---------------------------------------------------------
+#
+_CURRENT: ContextVar[Optional[Principal]] = ContextVar('principal', default=None)
+
+
+def current_principal() -> Optional[Principal]:
+    """ Return the principal of the current request or task. """
+    return _CURRENT.get()
+
+
+def set_principal(principal: Optional[Principal]) -> Token:
+    """ Make a principal the current one (see reset_principal). """
+    return _CURRENT.set(principal)
+
+
+def reset_principal(token: Token):
+    """ Restore the principal replaced by set_principal. """
+    try:
+        _CURRENT.reset(token)
+
+    except ValueError:
+        # Token created in another context (e.g. Celery signal handlers).
+        _CURRENT.set(None)
+
+
+def inject(headers: dict):
+    """ Add the principal of the current request to outgoing message headers.
+
+    :param headers: Message headers (updated in place).
+    """
+    if principal := _CURRENT.get():
+        headers[HEADER] = principal.to_header()
+
+
+def extract(value: Optional[dict]) -> Optional[Principal]:
+    """ Return the principal of a message header value. """
+    if not value:
+        return None
+
+    return Principal(value['name'], customer_id=value.get('customer_id'),
+                     employee_id=value.get('employee_id'), scopes=value.get('scopes', ()),
+                     reply_queues=value.get('reply_queues', ()),
+                     reply_hosts=value.get('reply_hosts', ()))
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+""" Low overhead Prometheus metrics.
+
+Every metric keeps one value slot per OS thread: a writer only updates
+the slot of its own thread, so no lock is taken on the hot path. Slots
+are summed when the metrics are scraped. Greenlets (gevent/eventlet) of
+one thread share its slot, which is safe since they don't switch while
+a value is updated.
+"""
+
+# BUILTIN modules
+import functools
+import inspect
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from . import tracing
+
+# Constants
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+""" Prometheus text exposition format content type. """
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+""" Default histogram bucket upper bounds, in seconds. """
+
+REGISTRY: List['Metric'] = []
+""" Registered metrics, in exposition order. """
+
+_thread_id = threading.get_native_id
+
+
+# ------------------------------------------------------------------------
+#
+class _Shards:
+    """ Per OS thread value slots of one labelled metric. """
+
+    __slots__ = ('size', 'slots')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.slots: Dict[int, List[float]] = {}
+
+    def slot(self) -> List[float]:
+        """ Return the value slot of the current thread. """
+        try:
+            return self.slots[_thread_id()]
+
+        except KeyError:
+            # dict.setdefault is atomic, a racing thread gets its own key anyway.
+            return self.slots.setdefault(_thread_id(), [0.0] * self.size)
+
+    def totals(self) -> List[float]:
+        """ Return the values summed over all threads. """
+        totals = [0.0] * self.size
+
+        for values in list(self.slots.values()):
+            for index, value in enumerate(values):
+                totals[index] += value
+
+        return totals
+
+
+# ------------------------------------------------------------------------
+#
+class Metric:
+    """ Base class of a metric family with optional labels. """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        """ The class initializer (the metric is registered in REGISTRY).
+
+        :param name: Metric name.
+        :param documentation: Metric help text.
+        :param labelnames: Label names.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """ Return the child metric for the label values (created on first use). """
+        key = tuple(str(value) for value in values)
+
+        try:
+            return self._children[key]
+
+        except KeyError:
+            return self._children.setdefault(key, self._new_child())
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+
+        if extra:
+            pairs.append(extra)
+
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        """ Return the metric family in Prometheus text format. """
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.kind}']
+        lines += self._samples()
+        return '\n'.join(lines)
+
+
+# ------------------------------------------------------------------------
+#
+class _CounterChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0):
+        """ Increment the counter. """
+        self._shards.slot()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class Counter(Metric):
+    """ Monotonically increasing counter. """
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """ Increment the counter (metric without labels). """
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}{self._label_text(key)} {_number(child.value())}'
+                for key, child in list(self._children.items())]
+
+
+# ------------------------------------------------------------------------
+#
+class _HistogramChild:
+    __slots__ = ('_bounds', '_shards')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # One slot per bucket, +Inf bucket, then sum.
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float):
+        """ Record one observation. """
+        slot = self._shards.slot()
+        slot[bisect_left(self._bounds, value)] += 1
+        slot[-1] += value
+
+    @contextmanager
+    def time(self):
+        """ Observe the duration of the with block, in seconds. """
+        started = perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.observe(perf_counter() - started)
+
+    def totals(self) -> List[float]:
+        return self._shards.totals()
+
+
+class Histogram(Metric):
+    """ Histogram with fixed buckets. """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """ Record one observation (metric without labels). """
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+
+        for key, child in list(self._children.items()):
+            totals = child.totals()
+            cumulative = 0.0
+
+            for bound, count in zip(self.buckets + (float('inf'),), totals):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                labels = self._label_text(key, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{labels} {_number(cumulative)}')
+
+            lines.append(f'{self.name}_count{self._label_text(key)} {_number(cumulative)}')
+            lines.append(f'{self.name}_sum{self._label_text(key)} {_number(totals[-1])}')
+
+        return lines
+
+
+# ---------------------------------------------------------
+#
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+# ---------------------------------------------------------
+#
+def generate_latest() -> bytes:
+    """ Return all registered metrics in Prometheus text format. """
+    return ('\n'.join(metric.expose() for metric in REGISTRY) + '\n').encode()
+
+
+# Metrics -----------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'API request latency.',
+    ('method', 'route', 'status'))
+
+TASK_RUNTIME_SECONDS = Histogram(
+    'celery_task_runtime_seconds', 'Task execution time.', ('task', 'state'))
+
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    'celery_task_queue_wait_seconds', 'Time between task publish and task start.', ('task',))
+
+TASK_RETRIES = Counter(
+    'celery_task_retries_total', 'Task retries.', ('task',))
+
+TASK_FAILURES = Counter(
+    'celery_task_failures_total', 'Failed task executions.', ('task',))
+
+MONGO_OPERATION_SECONDS = Histogram(
+    'mongo_operation_duration_seconds', 'Repository method latency.',
+    ('repository', 'method'))
+
+RABBIT_PUBLISH_SECONDS = Histogram(
+    'rabbit_publish_duration_seconds', 'RabbitMQ message publish latency.',
+    ('client', 'queue'))
+
+RABBIT_PUBLISH_FAILURES = Counter(
+    'rabbit_publish_failures_total', 'Failed RabbitMQ message publications.',
+    ('client', 'queue'))
+
+ADMISSION_REJECTIONS = Counter(
+    'admission_rejections_total', 'Requests refused by the admission control.',
+    ('task_class', 'status'))
+
+RATE_LIMITED = Counter(
+    'api_rate_limited_total', 'Requests refused by the API key rate limit.', ('client',))
+
+WEBHOOK_DELIVERIES = Counter(
+    'webhook_deliveries_total', 'Webhook responses, per outcome '
+    '(delivered, retried, deferred, dead).', ('outcome',))
+
+WEBHOOK_POST_SECONDS = Histogram(
+    'webhook_post_duration_seconds', 'Webhook POST latency, per HTTP status or error.',
+    ('status',))
+
+WEBHOOK_BATCH_SIZE = Histogram(
+    'webhook_batch_size', 'Responses sent per webhook POST.', (),
+    (1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+WEBHOOK_CIRCUIT_OPENINGS = Counter(
+    'webhook_circuit_openings_total', 'Webhook circuit breaker openings.', ('host',))
+
+
+# ---------------------------------------------------------
+#
+def instrument_repository(cls):
+    """ Class decorator timing (and tracing) every public repository method.
+
+    Methods inherited from a base repository are wrapped too, observed
+    in MONGO_OPERATION_SECONDS with the class name as repository label.
+    """
+
+    for name in dir(cls):
+        if name.startswith('_'):
+            continue
+
+        attribute = inspect.getattr_static(cls, name)
+
+        if isinstance(attribute, staticmethod):
+            wrapped = staticmethod(_timed(attribute.__func__, cls.__name__, name))
+
+        elif inspect.isfunction(attribute):
+            wrapped = _timed(attribute, cls.__name__, name)
+
+        else:
+            continue
+
+        setattr(cls, name, wrapped)
+
+    return cls
+
+
+def _timed(func, repository: str, method: str):
+    histogram = MONGO_OPERATION_SECONDS.labels(repository, method)
+    span_name = f'{repository}.{method}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+
+        try:
+            # Traced as a child of the running task/request span, if any.
+            with tracing.start_span(span_name, child_only=True):
+                return func(*args, **kwargs)
+
+        finally:
+            histogram.observe(perf_counter() - started)
+
+    return wrapper
+
+
+# ------------------------------------------------------------------------
+#
+class MetricsMiddleware:
+    """ ASGI middleware observing the latency of every HTTP request.
+
+    The route label is the matched route template (``/v1/orders/{order_id}``),
+    not the raw path, to keep the label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        started = perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            HTTP_REQUEST_SECONDS.labels(scope['method'], path, status[0]).observe(
+                perf_counter() - started)
+
+
+# ------------------------------------------------------------------------
+#
+class _ExporterHandler(BaseHTTPRequestHandler):
+    """ Serve the registered metrics on any GET path. """
+
+    def do_GET(self):
+        body = generate_latest()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+_EXPORTER: Optional[ThreadingHTTPServer] = None
+
+
+def start_exporter(port: int, host: str = '0.0.0.0') -> Optional[ThreadingHTTPServer]:
+    """ Serve the metrics of this process over HTTP, in a daemon thread.
+
+    :param port: Listening port.
+    :param host: Listening address.
+    :return: HTTP server, None when the port could not be bound.
+    """
+    global _EXPORTER
+
+    if _EXPORTER is not None:
+        return _EXPORTER
+
+    try:
+        _EXPORTER = ThreadingHTTPServer((host, port), _ExporterHandler)
+
+    except OSError as why:
+        logger.error(f'Metrics exporter not started on port {port}: {why}')
+        return None
+
+    _EXPORTER.daemon_threads = True
+    threading.Thread(target=_EXPORTER.serve_forever, name='metrics-exporter',
+                     daemon=True).start()
+    logger.info(f'Metrics exporter listening on port {port}')
+
+    return _EXPORTER
@@ -13,12 +13,17 @@ VERSION INFO::
 # BUILTIN modules
 import json
 import asyncio
+from time import perf_counter
 from typing import Callable, Optional
 
 # Third party modules
-from aio_pika import connect, connect_robust, Message, DeliveryMode
+from aio_pika import connect, connect_robust, Message, DeliveryMode, ExchangeType
 from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
 
+# Local modules
+from . import tracing
+from .metrics import RABBIT_PUBLISH_SECONDS, RABBIT_PUBLISH_FAILURES
+
 
 # -----------------------------------------------------------------------------
 #
@@ -32,18 +37,25 @@ class RabbitClient:
     # ---------------------------------------------------------
     #
     def __init__(self, rabbit_url: str, service: Optional[str] = None,
-                 incoming_message_handler: Optional[Callable] = None):
+                 incoming_message_handler: Optional[Callable] = None, prefetch: int = 1,
+                 exchange: Optional[str] = None, routing_key: Optional[str] = None):
         """ The class initializer.
 
         :param rabbit_url: RabbitMQ's connection URL.
         :param service: Name of message subscription queue.
         :param incoming_message_handler: Received message callback method.
+        :param prefetch: Unacknowledged messages delivered at once to this consumer.
+        :param exchange: Topic exchange the subscription queue is bound to.
+        :param routing_key: Binding key of the subscription queue.
         """
 
         # Unique parameters.
         self.rabbit_url = rabbit_url
         self.service_name = service
         self.message_handler = incoming_message_handler
+        self.prefetch = prefetch
+        self.exchange = exchange
+        self.routing_key = routing_key
 
     # ---------------------------------------------------------
     #
@@ -69,11 +81,23 @@ class RabbitClient:
         # Creating receive channel and setting quality of service.
         channel = await connection.channel()
 
-        # To make sure the load is evenly distributed between the workers.
-        await channel.set_qos(1)
+        # One message at a time (the default) evenly distributes the load
+        # between competing consumers, a single consumer wants more.
+        await channel.set_qos(self.prefetch)
+
+        if self.exchange:
+            # Bound to the topic exchange: an unnamed queue is server
+            # named and lives as long as this connection.
+            queue = await channel.declare_queue(name=self.service_name or '',
+                                                durable=bool(self.service_name),
+                                                exclusive=not self.service_name)
+            exchange = await channel.declare_exchange(self.exchange, ExchangeType.TOPIC,
+                                                      durable=True)
+            await queue.bind(exchange, routing_key=self.routing_key)
 
-        # Creating a receive queue.
-        queue = await channel.declare_queue(name=self.service_name, durable=True)
+        else:
+            # Creating a receive queue.
+            queue = await channel.declare_queue(name=self.service_name, durable=True)
 
         # Start consuming existing and future messages.
         await queue.consume(self._process_incoming_message, no_ack=False)
@@ -82,22 +106,57 @@ class RabbitClient:
 
     # ---------------------------------------------------------
     #
-    async def publish_message(self, queue: str, message: dict):
+    @staticmethod
+    def build_message(message: dict, headers: Optional[dict] = None) -> Message:
+        """ Return the persistent AMQP message of a JSON message.
+
+        :param message: Message to be published.
+        :param headers: AMQP message headers.
+        :return: AMQP message.
+        """
+        return Message(content_type='application/json',
+                       delivery_mode=DeliveryMode.PERSISTENT,
+                       headers=headers or {},
+                       body=json.dumps(message, ensure_ascii=False).encode())
+
+    # ---------------------------------------------------------
+    #
+    async def publish_message(self, queue: str, message: dict,
+                              exchange: Optional[str] = None):
         """ Publish message on specified RabbitMQ queue asynchronously.
 
-        :param queue: Publishing queue.
+        :param queue: Publishing queue (routing key when an exchange is given).
         :param message: Message to be published.
+        :param exchange: Topic exchange to publish on (default: the default exchange).
         """
-        connection = await connect(url=self.rabbit_url)
-        channel = await connection.channel()
+        target = exchange or queue
+        started = perf_counter()
+
+        try:
+            with tracing.start_span(f'publish {target}', child_only=True):
+                connection = await connect(url=self.rabbit_url)
+                channel = await connection.channel()
+
+                if exchange:
+                    destination = await channel.declare_exchange(
+                        exchange, ExchangeType.TOPIC, durable=True)
+                else:
+                    destination = channel.default_exchange
+
+                # Trace context travels with the message to the caller.
+                headers = {}
+                tracing.inject(headers)
+
+                # Create message and publish it.
+                message_body = self.build_message(message, headers)
+                await destination.publish(routing_key=queue, message=message_body)
+
+                # Close the connection properly.
+                await connection.close()
 
-        # Create message and publish it.
-        message_body = Message(
-            content_type='application/json',
-            delivery_mode=DeliveryMode.PERSISTENT,
-            body=json.dumps(message, ensure_ascii=False).encode())
-        await channel.default_exchange.publish(
-            routing_key=queue, message=message_body)
+        except BaseException:
+            RABBIT_PUBLISH_FAILURES.labels('aio_pika', target).inc()
+            raise
 
-        # Close the connection properly.
-        await connection.close()
+        finally:
+            RABBIT_PUBLISH_SECONDS.labels('aio_pika', target).observe(perf_counter() - started)
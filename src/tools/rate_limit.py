@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+""" Per API key rate limiting with Redis token buckets.
+
+Every API key owns one token bucket in Redis (``rate`` tokens per second,
+up to ``burst``), shared by all the API processes. The bucket is refilled
+and debited by a Lua script, atomically and in one round trip, using the
+Redis clock so the processes need no clock agreement.
+
+A process does not ask Redis for every request: it leases up to
+RATE_LIMIT_LEASE seconds worth of tokens at once and spends them
+locally, going back to Redis when the lease is used up or expired
+(unspent tokens of an expired lease are lost, which errs on the safe
+side). A refused key is remembered until its next token is due, so a
+noisy integration is turned away without a Redis call either.
+
+When Redis fails, the quotas are not enforced rather than the API, and
+Redis is left alone for HEALTH_CHECK_INTERVAL seconds: the requests of
+that period do not wait for a connect timeout each.
+"""
+
+# BUILTIN modules
+import threading
+from math import ceil
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from ..config.setup import config
+from .redis_client import get_redis
+from .metrics import RATE_LIMITED
+
+# Constants
+KEY_PREFIX = 'ratelimit'
+""" Redis key prefix of the token buckets. """
+
+TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+
+local wait = 0
+if granted == 0 then wait = (1 - tokens) / rate end
+return {granted, tostring(wait)}
+"""
+""" Refill, then take up to ARGV[3] tokens: returns the granted tokens and the wait for one. """
+
+
+# ------------------------------------------------------------------------
+#
+class RateLimiter:
+    """ Token buckets of the API keys, leased to the local process. """
+
+    def __init__(self, redis=None, clock: Callable = monotonic):
+        """ The class initializer.
+
+        :param redis: Redis client (default: the shared client).
+        :param clock: Monotonic clock of the leases.
+        """
+        self._redis = redis
+        self.clock = clock
+        self._script = None
+        self._tokens: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+        self._blocked: Dict[str, float] = {}
+        self._down_until = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def script(self):
+        if self._script is None:
+            redis = self._redis if self._redis is not None else get_redis()
+            self._script = redis.register_script(TOKEN_BUCKET)
+
+        return self._script
+
+    def acquire(self, name: str, rate: float, burst: int) -> float:
+        """ Take one request token of a key.
+
+        :param name: Key (integration) name.
+        :param rate: Tokens per second (0: unlimited).
+        :param burst: Bucket size.
+        :return: 0 when granted, else the seconds before a token is due.
+        """
+        if rate <= 0:
+            return 0.0
+
+        now = self.clock()
+
+        with self._lock:
+            if self._tokens.get(name) and now < self._expires[name]:
+                self._tokens[name] -= 1
+                return 0.0
+
+            if (blocked := self._blocked.get(name, 0.0) - now) > 0:
+                RATE_LIMITED.labels(name).inc()
+                return blocked
+
+            if now < self._down_until:
+                return 0.0
+
+        lease = max(1, min(burst, ceil(rate * config.rate_limit_lease)))
+
+        try:
+            granted, wait = self.script(keys=[f'{KEY_PREFIX}:{name}'],
+                                        args=[rate, burst, lease])
+
+        except Exception as why:
+            # Redis down: the quotas are not enforced rather than the API.
+            logger.warning(f'Rate limits not checked for {config.health_check_interval}s: {why}')
+            self._down_until = self.clock() + config.health_check_interval
+            return 0.0
+
+        with self._lock:
+            if granted:
+                self._tokens[name] = int(granted) - 1
+                self._expires[name] = now + config.rate_limit_lease
+                self._blocked.pop(name, None)
+                return 0.0
+
+            self._blocked[name] = now + float(wait)
+
+        RATE_LIMITED.labels(name).inc()
+        return float(wait)
+
+
+_LIMITER: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    """ Return the rate limiter of this process. """
+    global _LIMITER
+
+    if _LIMITER is None:
+        _LIMITER = RateLimiter()
+
+    return _LIMITER
+
+
+def set_limiter(limiter: Optional[RateLimiter]):
+    """ Replace the rate limiter of this process (None: back to default). """
+    global _LIMITER
+    _LIMITER = limiter
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+from typing import Optional
+
+# Third party modules
+from redis import Redis
+
+# local modules
+from ..config.setup import config
+
+# Constants
+_CLIENT: Optional[Redis] = None
+""" Shared Redis client (created on first use). """
+
+
+# ---------------------------------------------------------
+#
+def get_redis() -> Redis:
+    """ Return the shared Redis client, connecting on first use.
+
+    redis-py keeps its own connection pool, so one client
+    per process is enough for the API and the workers.
+
+    :return: Redis client.
+    """
+    global _CLIENT
+
+    if _CLIENT is None:
+        _CLIENT = Redis.from_url(config.redis_url)
+
+    return _CLIENT
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+""" Per-caller routing of the task responses.
+
+A caller chooses where the result of its request is delivered with the
+``X-Reply-To`` HTTP header, one of:
+
+    queue:<name>          publish on the named queue (default exchange)
+    topic:<routing key>   publish on the RESPONSE_EXCHANGE topic exchange
+    https://host/path     POST to a webhook
+
+The route is kept in a context variable for the duration of the request
+and stamped in the Celery message headers when the task is published,
+where the worker response handler reads it back.
+Requests without a route are answered on the shared DEFAULT_QUEUE.
+
+A caller may only use the queues and webhook hosts registered on its
+API key or allowed to everyone (REPLY_QUEUES and REPLY_HOSTS), see
+authorize(). Webhooks to loopback, private and link-local addresses are
+refused whatever the configuration.
+"""
+
+# BUILTIN modules
+import re
+import json
+import ipaddress
+from urllib.parse import urlsplit
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+# Local modules
+from ..config.setup import config
+from .keyset import Principal
+
+# Constants
+HTTP_HEADER = 'X-Reply-To'
+""" Request header carrying the reply route. """
+
+HEADER = 'reply_route'
+""" Celery message header carrying the reply route (Celery owns reply_to). """
+
+RESPONSE_EXCHANGE = 'caller.responses'
+""" Topic exchange of the routed responses. """
+
+DEFAULT_QUEUE = 'CallerService'
+""" Response queue of the requests without a reply route. """
+
+QUEUE, TOPIC, URL = 'queue', 'topic', 'url'
+""" Reply route kinds. """
+
+NAME = re.compile(r'^[A-Za-z0-9_.:-]{1,200}$')
+""" Valid queue names and routing keys (no wildcards). """
+
+_CURRENT: ContextVar[Optional[str]] = ContextVar('reply_route', default=None)
+
+
+# ---------------------------------------------------------
+#
+def parse(value: Optional[str]) -> Tuple[str, str]:
+    """ Return the kind and target of a reply route.
+
+    :param value: Reply route, None for the default queue.
+    :return: (QUEUE, name), (TOPIC, routing key) or (URL, url).
+    :raise ValueError: When the route is malformed.
+    """
+
+    if not value:
+        return QUEUE, DEFAULT_QUEUE
+
+    if value.startswith(('http://', 'https://')):
+        host = _host(value)
+
+        if not host or _internal(host):
+            raise ValueError(f'Reply webhook host refused: {host!r}')
+
+        return URL, value
+
+    kind, _, target = value.partition(':')
+
+    if kind not in (QUEUE, TOPIC) or not NAME.match(target):
+        raise ValueError(f'Invalid reply route: {value!r}')
+
+    # Celery (task, event and control) queues are not reply queues.
+    if kind == QUEUE and target.startswith('celery'):
+        raise ValueError(f'Reserved reply queue: {target!r}')
+
+    return kind, target
+
+
+def _host(url: str) -> Optional[str]:
+    try:
+        return urlsplit(url).hostname
+
+    except ValueError:
+        return None
+
+
+def _internal(host: str) -> bool:
+    """ Return True for localhost and the non public (loopback, private, link-local...) addresses. """
+    if host == 'localhost' or host.endswith('.localhost'):
+        return True
+
+    try:
+        return not ipaddress.ip_address(host).is_global
+
+    except ValueError:
+        return False
+
+
+def authorize(value: Optional[str], principal: Optional[Principal] = None) -> Tuple[str, str]:
+    """ Return the kind and target of a reply route the principal may use.
+
+    Topic routes and the default queue are open to every caller, the
+    other queues and the webhook hosts must be registered on the API key
+    of the principal or listed in REPLY_QUEUES and REPLY_HOSTS.
+
+    :param value: Reply route, None for the default queue.
+    :param principal: Caller of the request (None: configured routes only).
+    :return: (QUEUE, name), (TOPIC, routing key) or (URL, url).
+    :raise ValueError: When the route is malformed or not allowed.
+    """
+    kind, target = parse(value)
+
+    if kind == QUEUE and target != DEFAULT_QUEUE:
+        if target not in config.reply_queues and \
+                target not in getattr(principal, 'reply_queues', ()):
+            raise ValueError(f'Reply queue not registered: {target!r}')
+
+    elif kind == URL:
+        host = _host(target)
+
+        if host not in config.reply_hosts and host not in getattr(principal, 'reply_hosts', ()):
+            raise ValueError(f'Reply webhook host not registered: {host!r}')
+
+    return kind, target
+
+
+def current() -> Optional[str]:
+    """ Return the reply route of the current request (None: default queue). """
+    return _CURRENT.get()
+
+
+def inject(headers: dict):
+    """ Add the reply route of the current request to outgoing message headers.
+
+    :param headers: Message headers (updated in place).
+    """
+    if route := _CURRENT.get():
+        headers[HEADER] = route
+
+
+# ------------------------------------------------------------------------
+#
+class ReplyToMiddleware:
+    """ ASGI middleware keeping the X-Reply-To route of every HTTP request.
+
+    A malformed route is refused (400) before any task is published, the
+    authentication checks that the caller may use it (see authorize).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get('headers') or [])
+        route = headers.get(HTTP_HEADER.lower().encode(), b'').decode('latin-1') or None
+
+        try:
+            parse(route)
+
+        except ValueError as why:
+            body = json.dumps({'detail': str(why)}).encode()
+            await send({'type': 'http.response.start', 'status': 400,
+                        'headers': [(b'content-type', b'application/json'),
+                                    (b'content-length', str(len(body)).encode())]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        token = _CURRENT.set(route)
+
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            _CURRENT.reset(token)
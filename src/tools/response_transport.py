@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+import json
+import asyncio
+from time import perf_counter
+from typing import Optional
+
+# Third party modules
+from kombu import Exchange, Queue
+from loguru import logger
+
+# Local modules
+from ..config.setup import config
+from .rabbit_client import RabbitClient
+from . import tracing
+from .reply_to import RESPONSE_EXCHANGE
+from .metrics import RABBIT_PUBLISH_SECONDS, RABBIT_PUBLISH_FAILURES
+
+
+# ------------------------------------------------------------------------
+#
+class ResponseTransport:
+    """ Base class for the task response transports. """
+
+    name = ''
+
+    def send(self, queue: str, message: dict):
+        """ Publish a task response on the caller queue.
+
+        :param queue: Caller response queue name.
+        :param message: Response message.
+        """
+        raise NotImplementedError
+
+    def publish(self, routing_key: str, message: dict):
+        """ Publish a task response on the topic exchange of the routed responses.
+
+        :param routing_key: Caller routing key.
+        :param message: Response message.
+        """
+        raise NotImplementedError
+
+
+# ------------------------------------------------------------------------
+#
+class KombuTransport(ResponseTransport):
+    """ Publish responses through the Celery broker connection pool.
+
+    Blocking kombu I/O: it is cooperative under the gevent/eventlet
+    pools (sockets are monkey patched) and reuses pooled broker
+    connections instead of opening one connection per response.
+    """
+
+    name = 'kombu'
+
+    def __init__(self, app):
+        """ The class initializer.
+
+        :param app: Celery application (owner of the producer pool).
+        """
+        self.app = app
+
+    def send(self, queue: str, message: dict):
+        self._publish(queue, message, exchange='', routing_key=queue,
+                      declare=[Queue(queue, durable=True)])
+
+    def publish(self, routing_key: str, message: dict):
+        exchange = Exchange(RESPONSE_EXCHANGE, 'topic', durable=True)
+
+        # Labelled by exchange: the routing keys are per caller.
+        self._publish(RESPONSE_EXCHANGE, message, exchange=exchange,
+                      routing_key=routing_key, declare=[exchange])
+
+    def _publish(self, target: str, message: dict, **options):
+        body = json.dumps(message, ensure_ascii=False, default=str).encode()
+        started = perf_counter()
+
+        try:
+            with tracing.start_span(f'publish {target}', child_only=True), \
+                    self.app.producer_pool.acquire(block=True) as producer:
+                headers = {}
+                tracing.inject(headers)
+                producer.publish(body, content_type='application/json',
+                                 content_encoding='utf-8', headers=headers,
+                                 delivery_mode=2, retry=True, **options)
+
+        except BaseException:
+            RABBIT_PUBLISH_FAILURES.labels(self.name, target).inc()
+            raise
+
+        finally:
+            RABBIT_PUBLISH_SECONDS.labels(self.name, target).observe(perf_counter() - started)
+
+
+# ------------------------------------------------------------------------
+#
+class AioPikaTransport(ResponseTransport):
+    """ Publish responses with aio-pika (one event loop and connection per response).
+
+    Not suited for the green pools: ``asyncio.run`` blocks the hub.
+    """
+
+    name = 'aio_pika'
+
+    def send(self, queue: str, message: dict):
+        asyncio.run(RabbitClient(config.rabbit_url).publish_message(queue, message))
+
+    def publish(self, routing_key: str, message: dict):
+        asyncio.run(RabbitClient(config.rabbit_url).publish_message(
+            routing_key, message, exchange=RESPONSE_EXCHANGE))
+
+
+# ------------------------------------------------------------------------
+#
+class NullTransport(ResponseTransport):
+    """ Drop responses (benchmarks and tests). """
+
+    name = 'null'
+
+    def send(self, queue: str, message: dict):
+        logger.trace(f"Dropped response for queue {queue}")
+
+    def publish(self, routing_key: str, message: dict):
+        logger.trace(f"Dropped response for routing key {routing_key}")
+
+
+TRANSPORTS = {transport.name: transport for transport in
+              (KombuTransport, AioPikaTransport, NullTransport)}
+""" Available transports, selected with the RESPONSE_TRANSPORT setting. """
+
+_TRANSPORT: Optional[ResponseTransport] = None
+
+
+# ---------------------------------------------------------
+#
+def get_transport(app) -> ResponseTransport:
+    """ Return the configured response transport of this process.
+
+    :param app: Celery application.
+    :return: Response transport.
+    """
+    global _TRANSPORT
+
+    if _TRANSPORT is None:
+        transport = TRANSPORTS.get(config.response_transport, KombuTransport)
+        _TRANSPORT = transport(app) if transport is KombuTransport else transport()
+
+    return _TRANSPORT
+
+
+# ---------------------------------------------------------
+#
+def set_transport(transport: Optional[ResponseTransport]):
+    """ Replace the response transport of this process (None: back to configured).
+
+    :param transport: Response transport.
+    """
+    global _TRANSPORT
+    _TRANSPORT = transport
@@ -10,30 +10,79 @@ VERSION INFO::
      $Rev: 43
 """
 
+# BUILTIN modules
+import re
+from math import ceil
+
 # Third party modules
 from fastapi.security import APIKeyHeader
-from fastapi import HTTPException, Security, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi import HTTPException, Request, Security, status
 
 # local modules
-from ..config.setup import config
+from . import reply_to
+from .rate_limit import get_limiter
+from .keyset import Principal, get_keyset, set_principal
 
 # Constants
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
 """ Using API key authentication. """
 
+SCOPE = re.compile(r'^/(?:v\d+/)?([^/]+)')
+""" Resource scope of a request path: first segment after the API version. """
+
+TASK_SCOPE = 'process'
+""" Scope of the task routes, open to every key for its own tasks (see process_routes). """
+
 
 # ---------------------------------------------------------
 #
-def validate_authentication(api_key: str = Security(API_KEY_HEADER)):
-    """ Validate API key authentication.
+async def validate_authentication(request: Request,
+                                  api_key: str = Security(API_KEY_HEADER)) -> Principal:
+    """ Validate API key authentication, its scope, and take a request from its quota.
 
+    The key is checked against the in-memory keyset (by hash, no database
+    call) and its principal becomes the current one: it is available to
+    the endpoint and travels with the tasks it publishes. The dependency
+    is a coroutine so the principal is set in the request context.
+
+    :param request: Current request (its path gives the scope).
     :param api_key: Authentication credentials.
+    :return: Owner of the key.
     :raise HTTPException(401): When incorrect API key is supplied.
+    :raise HTTPException(403): When the key is not granted the scope of the path.
+    :raise HTTPException(403): When the X-Reply-To route is not registered for the key.
+    :raise HTTPException(429): When the key has used up its quota.
     """
 
-    if api_key != config.service_api_key:
+    principal = get_keyset().lookup(api_key)
+
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API Key",
             headers={"WWW-Authenticate": "X-API-Key"}
         )
+
+    if (match := SCOPE.match(request.url.path)) and match[1] != TASK_SCOPE \
+            and not principal.allows(match[1]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"Scope {match[1]} not granted to {principal.name}")
+
+    try:
+        reply_to.authorize(reply_to.current(), principal)
+
+    except ValueError as why:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(why))
+
+    # The limiter may call Redis: kept off the event loop.
+    if principal.rate > 0 and (retry_after := await run_in_threadpool(
+            get_limiter().acquire, principal.name, principal.rate, principal.burst)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit of {principal.name} exceeded",
+            headers={"Retry-After": str(max(1, ceil(retry_after)))}
+        )
+
+    set_principal(principal)
+    return principal
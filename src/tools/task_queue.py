@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+""" Celery application of the publishers, and the tasks known by name.
+
+The API sends its tasks by name: the routers hold a TaskRef per task
+and never import the worker modules (their repositories, webhook and
+RabbitMQ clients), which keeps the API start short. The worker imports
+this same application from src.worker.celery_app and registers the
+task modules listed in the celery_config imports.
+
+Nothing connects at import: the broker and result backend connections
+are opened by the first publish or result read.
+"""
+
+# BUILTIN modules
+import json
+import datetime
+from time import time
+from typing import Optional
+
+# Third party modules
+from bson import ObjectId
+from celery import Celery
+from celery.result import AsyncResult
+from celery.signals import before_task_publish
+from kombu.serialization import register
+
+# Local modules
+from ..config import celery_config
+from . import tracing, reply_to, keyset
+from .redis_client import get_redis
+
+# Constants
+WORKER = Celery(__name__)
+""" Celery application, shared by the API (publishing) and the worker. """
+
+OWNER_PREFIX = 'task-owner'
+""" Redis key prefix of the principal name that published a task. """
+
+# Read Celery config values.
+WORKER.config_from_object(celery_config)
+
+
+# Used for ObjectID serialization
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime.datetime):
+            return str(o)
+        return json.JSONEncoder.default(self, o)
+
+
+# Register the custom JSON encoder with Celery
+register('customjson', CustomJSONEncoder().encode, json.loads,
+         content_type='application/json', content_encoding='utf-8')
+
+
+WORKER.conf.update(
+    task_serializer='customjson',
+    result_serializer='customjson',
+)
+
+
+# ---------------------------------------------------------
+#
+@before_task_publish.connect
+def stamp_enqueued_at(headers: dict = None, **_):
+    """ Stamp the publish time, the trace context, the reply route and the principal in the message headers.
+
+    Publishing happens inside the router delay() call, so enqueued_at
+    is the enqueue time seen by the API.
+    """
+    if headers is not None:
+        headers['enqueued_at'] = time()
+        tracing.inject(headers)
+        reply_to.inject(headers)
+        keyset.inject(headers)
+
+
+# ---------------------------------------------------------
+#
+def record_owner(task_id: str, owner: str):
+    """ Remember the principal that published a task, as long as its result.
+
+    :param task_id: Celery task id.
+    :param owner: Principal name.
+    """
+    get_redis().set(f'{OWNER_PREFIX}:{task_id}', owner, ex=WORKER.conf.result_expires)
+
+
+def task_owner(task_id: str) -> Optional[str]:
+    """ Return the principal name that published a task (None: unknown or not started). """
+    owner = get_redis().get(f'{OWNER_PREFIX}:{task_id}')
+    return owner.decode() if owner else None
+
+
+# ------------------------------------------------------------------------
+#
+class TaskRef:
+    """ Celery task known by its registered name only.
+
+    Offers the delay() and apply_async() calls of a task, published with
+    send_task(). Eagerly applied tasks (tests, benchmarks) need the task
+    itself: the worker modules are then imported on first use.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        """ The class initializer.
+
+        :param name: Registered task name, e.g. tasks.create_order.
+        """
+        self.name = name
+
+    @property
+    def app(self) -> Celery:
+        return WORKER
+
+    def delay(self, *args, **kwargs) -> AsyncResult:
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args: Optional[tuple] = None, kwargs: Optional[dict] = None,
+                    **options) -> AsyncResult:
+        """ Add the task to Celery.
+
+        :param args: Task arguments.
+        :param kwargs: Task keyword arguments.
+        :param options: Publishing options (task_id, countdown...).
+        :return: Celery result of the task.
+        """
+        if WORKER.conf.task_always_eager:
+            if self.name not in WORKER.tasks:
+                WORKER.loader.import_default_modules()
+
+            return WORKER.tasks[self.name].apply_async(args, kwargs, **options)
+
+        return WORKER.send_task(self.name, args, kwargs, **options)
+
+    def __repr__(self) -> str:
+        return f'TaskRef({self.name!r})'
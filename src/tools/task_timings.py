@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# BUILTIN modules
+from typing import Dict, List, Optional
+
+# Third party modules
+from loguru import logger
+
+# local modules
+from ..config.setup import config
+from .redis_client import get_redis
+
+# Constants
+KEY_PREFIX = 'timings'
+""" Redis key prefix of the rolling timing lists. """
+
+TASKS_KEY = f'{KEY_PREFIX}:tasks'
+""" Redis set of the task names having timings. """
+
+PERCENTILES = (50, 95, 99)
+""" Reported percentiles. """
+
+
+# ---------------------------------------------------------
+#
+def _key(task_name: str, measure: str) -> str:
+    return f'{KEY_PREFIX}:{task_name}:{measure}'
+
+
+# ---------------------------------------------------------
+#
+def record(task_name: str, queue_wait: Optional[float], execution: float):
+    """ Add one task timing to the rolling windows (one Redis round trip).
+
+    Each task name keeps its last TIMING_WINDOW queue wait and execution
+    times. Failures are logged only: timing must not fail a task.
+
+    :param task_name: Task name.
+    :param queue_wait: Seconds between publish and start (None if unknown).
+    :param execution: Seconds between start and finish.
+    """
+
+    window = config.timing_window
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(TASKS_KEY, task_name)
+
+        for measure, value in (('queue_wait', queue_wait), ('execution', execution)):
+            if value is not None:
+                pipe.lpush(_key(task_name, measure), round(value, 6))
+                pipe.ltrim(_key(task_name, measure), 0, window - 1)
+
+        pipe.execute()
+
+    except Exception as why:
+        logger.error(f'Task timing not recorded: {why}')
+
+
+# ---------------------------------------------------------
+#
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """ Return the nearest-rank percentiles of the values.
+
+    :param values: Measured values.
+    :return: p50, p95 and p99 (empty when there are no values).
+    """
+
+    if not values:
+        return {}
+
+    ordered = sorted(values)
+    last = len(ordered) - 1
+
+    return {f'p{rank}': ordered[min(last, max(0, -(-rank * len(ordered) // 100) - 1))]
+            for rank in PERCENTILES}
+
+
+# ---------------------------------------------------------
+#
+def summary() -> Dict[str, dict]:
+    """ Return the queue wait and execution percentiles per task name.
+
+    :return: {task_name: {'count', 'queue_wait', 'execution'}}.
+    """
+
+    client = get_redis()
+    names = sorted(name.decode() for name in client.smembers(TASKS_KEY))
+    pipe = client.pipeline(transaction=False)
+
+    for name in names:
+        pipe.lrange(_key(name, 'queue_wait'), 0, -1)
+        pipe.lrange(_key(name, 'execution'), 0, -1)
+
+    values = pipe.execute()
+    result = {}
+
+    for index, name in enumerate(names):
+        queue_wait, execution = ([float(item) for item in items]
+                                 for items in values[2 * index: 2 * index + 2])
+        result[name] = {'count': len(execution),
+                        'queue_wait': percentiles(queue_wait),
+                        'execution': percentiles(execution)}
+
+    return result
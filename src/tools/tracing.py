@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+""" Lightweight, OpenTelemetry style, trace propagation.
+
+A trace is started for every API request (or continued from an incoming
+W3C ``traceparent`` header), carried to the worker in the Celery message
+headers and to the caller in the AMQP response headers. Spans are kept
+in a context variable, so nested spans (repository calls, publishing)
+get the right parent in threads, greenlets and asyncio tasks alike.
+
+Finished spans are exported as one JSON line each, to a file or the log,
+selected with the TRACE_EXPORTER setting (none disables tracing).
+"""
+
+# BUILTIN modules
+import os
+import json
+import random
+import threading
+from time import time_ns
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Optional, Tuple
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from ..config.setup import config
+
+# Constants
+TRACEPARENT = 'traceparent'
+""" W3C trace context header name. """
+
+
+# ------------------------------------------------------------------------
+#
+class Span:
+    """ One timed operation of a trace. """
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id',
+                 'start', 'end', 'attributes', 'status')
+
+    def __init__(self, name: str, trace_id: Optional[str] = None,
+                 parent_id: Optional[str] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id or f'{random.getrandbits(128):032x}'
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.status = 'OK'
+        self.start = time_ns()
+        self.end = None
+
+    @property
+    def traceparent(self) -> str:
+        """ Return the W3C traceparent value of this span. """
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'name': self.name,
+                'service': config.service_name, 'pid': os.getpid(),
+                'start': self.start, 'end': self.end,
+                'duration_ms': round((self.end - self.start) / 1e6, 3),
+                'status': self.status, 'attributes': self.attributes}
+
+
+_CURRENT: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+# ------------------------------------------------------------------------
+#
+class FileExporter:
+    """ Append finished spans as JSON lines to a file (one handle per process). """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._file = open(self.path, 'a', encoding='utf-8')
+                self._pid = os.getpid()
+
+            self._file.write(line)
+            self._file.flush()
+
+
+class LogExporter:
+    """ Write finished spans to the log. """
+
+    def export(self, span: Span):
+        logger.info(f'SPAN {json.dumps(span.to_dict(), default=str)}')
+
+
+_EXPORTER = None
+
+
+def get_exporter():
+    """ Return the configured span exporter (None when tracing is disabled). """
+    global _EXPORTER
+
+    if _EXPORTER is None and config.trace_exporter != 'none':
+        _EXPORTER = (FileExporter(config.trace_file) if config.trace_exporter == 'file'
+                     else LogExporter())
+
+    return _EXPORTER
+
+
+def set_exporter(exporter):
+    """ Replace the span exporter of this process (tests and tools). """
+    global _EXPORTER
+    _EXPORTER = exporter
+
+
+def enabled() -> bool:
+    """ Return True when spans are exported. """
+    return get_exporter() is not None
+
+
+# ---------------------------------------------------------
+#
+def parse_traceparent(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """ Return (trace_id, parent span_id) of a traceparent value.
+
+    :param value: W3C traceparent header value.
+    :return: Trace and span id, (None, None) when missing or invalid.
+    """
+
+    parts = (value or '').split('-')
+
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+
+    return parts[1], parts[2]
+
+
+def current_span() -> Optional[Span]:
+    """ Return the active span of the current context. """
+    return _CURRENT.get()
+
+
+def inject(headers: dict):
+    """ Add the traceparent of the active span to outgoing message headers.
+
+    :param headers: Message headers (updated in place).
+    """
+    if span := _CURRENT.get():
+        headers[TRACEPARENT] = span.traceparent
+
+
+# ---------------------------------------------------------
+#
+def begin_span(name: str, traceparent: Optional[str] = None,
+               attributes: Optional[dict] = None) -> Tuple[Optional[Span], Optional[Token]]:
+    """ Start a span and make it the active one (see end_span).
+
+    The parent is the span of the given traceparent, or else the active span.
+
+    :param name: Span name.
+    :param traceparent: Remote parent (incoming header).
+    :param attributes: Span attributes.
+    :return: Span and context token, (None, None) when tracing is disabled.
+    """
+
+    if not enabled():
+        return None, None
+
+    trace_id, parent_id = parse_traceparent(traceparent)
+
+    if trace_id is None and (parent := _CURRENT.get()):
+        trace_id, parent_id = parent.trace_id, parent.span_id
+
+    span = Span(name, trace_id, parent_id, attributes)
+
+    return span, _CURRENT.set(span)
+
+
+def end_span(span: Optional[Span], token: Optional[Token], error: BaseException = None):
+    """ Finish and export a span started with begin_span.
+
+    :param span: Span to finish.
+    :param token: Context token returned by begin_span.
+    :param error: Exception that ended the operation, if any.
+    """
+
+    if span is None:
+        return
+
+    span.end = time_ns()
+
+    if error is not None:
+        span.status = 'ERROR'
+        span.attributes['error'] = repr(error)
+
+    try:
+        _CURRENT.reset(token)
+
+    except ValueError:
+        # Token created in another context (e.g. Celery signal handlers).
+        _CURRENT.set(None)
+
+    try:
+        get_exporter().export(span)
+
+    except Exception as why:
+        logger.error(f'Span export failed: {why}')
+
+
+@contextmanager
+def start_span(name: str, traceparent: Optional[str] = None,
+               attributes: Optional[dict] = None, child_only: bool = False):
+    """ Context manager running the with block in a new active span.
+
+    :param name: Span name.
+    :param traceparent: Remote parent (incoming header).
+    :param attributes: Span attributes.
+    :param child_only: Only trace when there is an active span (no new trace).
+    """
+
+    if child_only and _CURRENT.get() is None:
+        yield None
+        return
+
+    span, token = begin_span(name, traceparent, attributes)
+
+    try:
+        yield span
+
+    except BaseException as error:
+        end_span(span, token, error)
+        span = None
+        raise
+
+    finally:
+        end_span(span, token)
+
+
+# ------------------------------------------------------------------------
+#
+class TracingMiddleware:
+    """ ASGI middleware running every HTTP request in a (root or continued) span. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not enabled():
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get('headers') or [])
+        traceparent = headers.get(TRACEPARENT.encode(), b'').decode() or None
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                message.setdefault('headers', [])
+                message['headers'] = list(message['headers']) + \
+                    [(TRACEPARENT.encode(), span.traceparent.encode())]
+
+            await send(message)
+
+        with start_span(f"HTTP {scope['method']}", traceparent,
+                        {'http.path': scope['path']}) as span:
+            await self.app(scope, receive, send_wrapper)
+
+            route = scope.get('route')
+            span.name = f"HTTP {scope['method']} {getattr(route, 'path', scope['path'])}"
+            span.set_attribute('http.status_code', status[0])
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+""" Capture of the HTTP traffic for replay (scripts/replay_traffic.py).
+
+Every request is appended to an NDJSON file as one compact line:
+arrival time, method, path, query, replayable headers, body, matched
+route, response status and duration. The API key header is never
+written (the replayer sends its own), bodies over
+``traffic_capture_max_body`` bytes are cut and flagged ``truncated``.
+The lines are written in batches by a background thread (CaptureWriter).
+
+Enabled by setting ``TRAFFIC_CAPTURE_FILE``.
+"""
+
+# BUILTIN modules
+import os
+import json
+import time
+import queue
+import base64
+import threading
+from typing import Optional
+
+# Third party modules
+from loguru import logger
+
+# Local modules
+from ..config.setup import config
+
+# Constants
+REPLAYED_HEADERS = (b'content-type', b'idempotency-key', b'accept')
+""" Request headers kept in the capture (X-API-Key is never written). """
+
+BATCH_SIZE = 256
+""" Records serialized and written per file write and flush. """
+
+MAX_PENDING = 10000
+""" Records waiting for the writer thread, later ones are dropped. """
+
+_STOP = object()
+""" Queue marker ending the writer thread. """
+
+
+# ------------------------------------------------------------------------
+#
+class CaptureWriter:
+    """ Append records as compact JSON lines to a file (one handle per process).
+
+    write() only queues the record: a daemon thread serializes the queued
+    records and appends them with one write and flush per batch, so the
+    event loop never waits for the disk. When the thread falls
+    ``MAX_PENDING`` records behind, new records are dropped and counted.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        """ The class initializer.
+
+        :param path: Capture file, opened in append mode.
+        :param batch_size: Records written per flush.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        """ Queue a record for the writer thread (never blocks). """
+        if self._pid != os.getpid():
+            self._start()
+
+        try:
+            self._queue.put_nowait(record)
+
+        except queue.Full:
+            self.dropped += 1
+
+            if self.dropped % MAX_PENDING == 1:
+                logger.warning(f'Traffic capture behind, {self.dropped} records dropped')
+
+    def _start(self):
+        # A forked worker gets its own queue, thread and file handle.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(MAX_PENDING)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='traffic-capture', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self, pending: queue.Queue):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            while True:
+                batch = [pending.get()]
+
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(pending.get_nowait())
+
+                    except queue.Empty:
+                        break
+
+                stop = batch[-1] is _STOP
+                records = batch[:-1] if stop else batch
+
+                try:
+                    file.write(''.join(json.dumps(record, separators=(',', ':'), default=str)
+                                       + '\n' for record in records))
+                    file.flush()
+
+                except Exception as why:
+                    logger.error(f'Traffic capture write failed: {why}')
+
+                if stop:
+                    return
+
+    def close(self):
+        """ Write the queued records and stop the writer thread. """
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join(timeout=5)
+
+            self._queue, self._thread, self._pid = None, None, None
+
+
+_WRITER = None
+
+
+def get_writer() -> Optional[CaptureWriter]:
+    """ Return the capture writer (None when the capture is disabled). """
+    global _WRITER
+
+    if _WRITER is None and config.traffic_capture_file:
+        _WRITER = CaptureWriter(config.traffic_capture_file)
+
+    return _WRITER
+
+
+def set_writer(writer):
+    """ Replace the capture writer of this process (tests and tools). """
+    global _WRITER
+    _WRITER = writer
+
+
+def encode_body(body: bytes) -> dict:
+    """ Return the JSON fields of a body: text when UTF-8, base64 otherwise. """
+    if not body:
+        return {}
+
+    try:
+        return {'body': body.decode('utf-8')}
+
+    except UnicodeDecodeError:
+        return {'body_b64': base64.b64encode(body).decode('ascii')}
+
+
+# ------------------------------------------------------------------------
+#
+class TrafficCaptureMiddleware:
+    """ ASGI middleware writing every HTTP request and its outcome to the capture. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        writer = get_writer() if scope['type'] == 'http' else None
+
+        if writer is None:
+            return await self.app(scope, receive, send)
+
+        arrival = time.time()
+        started = time.perf_counter()
+        limit = config.traffic_capture_max_body
+        body, status, size = bytearray(), [500], [0]
+        truncated = [False]
+
+        async def receive_wrapper():
+            message = await receive()
+
+            if message['type'] == 'http.request':
+                chunk = message.get('body', b'')
+                room = limit - len(body)
+                body.extend(chunk[:max(0, room)])
+                truncated[0] |= len(chunk) > room
+
+            return message
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            elif message['type'] == 'http.response.body':
+                size[0] += len(message.get('body', b''))
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+
+        finally:
+            headers = {name.decode('latin-1'): value.decode('latin-1')
+                       for name, value in scope.get('headers') or []
+                       if name in REPLAYED_HEADERS}
+            record = {'t': round(arrival, 6), 'method': scope['method'],
+                      'path': scope['path'],
+                      'query': scope.get('query_string', b'').decode('latin-1'),
+                      'route': getattr(scope.get('route'), 'path', None),
+                      'headers': headers, 'status': status[0],
+                      'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                      'response_bytes': size[0], **encode_body(bytes(body))}
+
+            if truncated[0]:
+                record['truncated'] = True
+
+            writer.write(record)
@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+""" Delivery of the task responses to the caller webhooks.
+
+Every worker process keeps one pooled (HTTP/2 when the h2 package is
+installed) httpx client. A response is POSTed as a JSON object, expecting
+a 2xx answer. A receiver that can take several responses at once says so
+with the ``X-Webhook-Batch-Max`` response header: later responses for that
+endpoint are buffered for WEBHOOK_BATCH_LINGER seconds and POSTed as one
+JSON array of up to that many responses.
+
+The requests carry no credential of the service. When WEBHOOK_SECRETS
+holds a secret for the endpoint host, the body is signed with it: the
+``X-Webhook-Signature`` header is ``sha256=`` and the hex HMAC-SHA256 of
+the body.
+
+Every response is first stored in a Redis sorted set, scored by its next
+attempt time, and POSTed by the daemon thread of the worker process (see
+start), so a slow receiver never holds a task slot. The thread leases the
+due deliveries (their score is pushed LEASE seconds ahead) and removes them
+only once settled: a worker killed while posting or lingering on a batch
+leaves them to the next worker once the lease expires. Delivery is thus at
+least once, receivers dedupe on the task id.
+
+Failed deliveries (connection errors, 408, 425, 429 and 5xx answers) stay
+in the set with an exponential backoff (a Retry-After answer is honoured).
+After WEBHOOK_MAX_ATTEMPTS attempts, or on another 4xx answer, the delivery
+is moved to a capped dead letter list. Consecutive failures on one host open
+its circuit: deliveries to that host are deferred, without an attempt,
+until WEBHOOK_BREAKER_COOLDOWN seconds have passed.
+"""
+
+# BUILTIN modules
+import os
+import hmac
+import json
+import random
+import hashlib
+import threading
+from uuid import uuid4
+from time import time, monotonic, perf_counter
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+from typing import Callable, Dict, List, Optional
+
+# Third party modules
+import httpx
+from loguru import logger
+
+# Local modules
+from ..config.setup import config
+from .redis_client import get_redis
+from .metrics import (WEBHOOK_DELIVERIES, WEBHOOK_POST_SECONDS, WEBHOOK_BATCH_SIZE,
+                      WEBHOOK_CIRCUIT_OPENINGS)
+
+# Constants
+RETRY_KEY = 'webhooks:retry'
+""" Redis sorted set of the pending deliveries, scored by due time. """
+
+DEAD_KEY = 'webhooks:dead'
+""" Redis list of the deliveries given up (newest first). """
+
+DEAD_LETTERS = 10_000
+""" Deliveries kept in the dead letter list. """
+
+BATCH_HEADER = 'X-Webhook-Batch-Max'
+""" Receiver answer header: maximum responses accepted in one POST. """
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+""" Request header: HMAC-SHA256 of the body with the secret of the host. """
+
+RETRYABLE = frozenset({408, 425, 429, 500, 502, 503, 504})
+""" HTTP answers worth a retry, other non 2xx answers are final. """
+
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+""" Connection pool of a worker process, shared by all the endpoints. """
+
+DRAIN_INTERVAL = 1.0
+""" Seconds between two polls of the retry set. """
+
+DRAIN_SIZE = 100
+""" Due deliveries taken from the retry set per poll. """
+
+LEASE = 60.0
+""" Seconds a claimed delivery is hidden from the other workers (longer than a POST). """
+
+CLAIM = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, member in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[2], member)
+end
+return due
+"""
+""" Lua script: lease the due deliveries (score pushed to the lease expiry). """
+
+
+# ---------------------------------------------------------
+#
+def sign(url: str, body: bytes) -> Dict[str, str]:
+    """ Return the signature header of a webhook body, none without a host secret.
+
+    :param url: Webhook URL.
+    :param body: Request body.
+    """
+    if secret := config.webhook_secrets.get(urlsplit(url).hostname or ''):
+        digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return {SIGNATURE_HEADER: f'sha256={digest}'}
+
+    return {}
+
+
+def _member(delivery: dict) -> str:
+    """ Return the retry set member of a delivery (stable across a JSON round trip). """
+    return json.dumps(delivery, sort_keys=True, default=str)
+
+
+# ------------------------------------------------------------------------
+#
+class CircuitBreaker:
+    """ Per host breaker, opened by consecutive failures.
+
+    An open host is closed again by the first success after the cooldown
+    (half open: one trial at a time).
+    """
+
+    def __init__(self, threshold: int, cooldown: float, clock: Callable = monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._failures: Dict[str, int] = {}
+        self._opened: Dict[str, float] = {}
+        self._trial: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        """ Return True when a request may be sent to the host. """
+        with self._lock:
+            opened = self._opened.get(host)
+
+            if opened is None:
+                return True
+
+            if self.clock() - opened < self.cooldown or self._trial.get(host):
+                return False
+
+            self._trial[host] = True
+            return True
+
+    def retry_in(self, host: str) -> float:
+        """ Return the seconds before the host accepts a trial request. """
+        opened = self._opened.get(host)
+        return 0.0 if opened is None else max(0.0, self.cooldown - (self.clock() - opened))
+
+    def success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+            self._trial.pop(host, None)
+
+    def failure(self, host: str):
+        with self._lock:
+            failures = self._failures[host] = self._failures.get(host, 0) + 1
+
+            if self._trial.pop(host, False):
+                # Failed trial: open for another cooldown.
+                self._opened[host] = self.clock()
+
+            elif failures >= self.threshold and host not in self._opened:
+                self._opened[host] = self.clock()
+                WEBHOOK_CIRCUIT_OPENINGS.labels(host).inc()
+                logger.warning(f'Webhook circuit opened for {host}')
+
+
+# ------------------------------------------------------------------------
+#
+class WebhookDispatcher:
+    """ Deliver, batch and retry the webhook responses of a worker process. """
+
+    def __init__(self, redis=None, transport: Optional[httpx.BaseTransport] = None,
+                 clock: Callable = time):
+        """ The class initializer.
+
+        :param redis: Redis client of the retry set (default: the shared client).
+        :param transport: httpx transport (tests).
+        :param clock: Epoch seconds clock of the retry schedule.
+        """
+        self._redis = redis
+        self._transport = transport
+        self.clock = clock
+        self.breaker = CircuitBreaker(config.webhook_breaker_threshold,
+                                      config.webhook_breaker_cooldown)
+        self._client: Optional[httpx.Client] = None
+        self._pid = None
+        self._batch_max: Dict[str, int] = {}
+        self._buffers: Dict[str, List[dict]] = {}
+        self._oldest: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # ---------------------------------------------------------
+    #
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    @property
+    def client(self) -> httpx.Client:
+        """ Return the HTTP client of this process (a forked child opens its own). """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    http2 = config.webhook_http2 and find_spec('h2') is not None
+                    connect, read = config.url_timeout
+                    self._client = httpx.Client(
+                        http2=http2, limits=POOL_LIMITS, headers=config.hdr_data,
+                        timeout=httpx.Timeout(read, connect=connect),
+                        transport=self._transport)
+                    self._pid = os.getpid()
+
+        return self._client
+
+    def close(self):
+        """ Stop the background thread, flush the batches and close the client. """
+        self._stop.set()
+        self._wake.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+        self._thread = None
+        self.flush(force=True)
+
+        if self._client is not None and self._pid == os.getpid():
+            self._client.close()
+
+        self._client, self._pid = None, None
+
+    # ---------------------------------------------------------
+    #
+    def deliver(self, url: str, message: dict):
+        """ Store a response in the retry set, due now, and wake the dispatcher thread.
+
+        Without Redis the response is POSTed at once, with no retry.
+
+        :param url: Webhook URL.
+        :param message: Response message.
+        """
+        delivery = {'id': uuid4().hex, 'url': url, 'message': message, 'attempts': 0}
+        host = urlsplit(url).netloc
+
+        try:
+            due = self.clock() + self.breaker.retry_in(host)
+            self.redis.zadd(RETRY_KEY, {_member(delivery): due})
+
+        except Exception as why:
+            logger.error(f'Webhook retry set unavailable, posting {url} now: {why}')
+            self._post(url, [delivery])
+            return
+
+        self._wake.set()
+
+    def flush(self, force: bool = False):
+        """ POST the endpoint batches older than the linger time (all of them when forced). """
+        now = monotonic()
+
+        for url in list(self._buffers):
+            if force or now - self._oldest.get(url, now) >= config.webhook_batch_linger:
+                self._flush_endpoint(url)
+
+    def _buffer(self, url: str, deliveries: List[dict]):
+        """ Add leased deliveries to the endpoint batch, POSTed once full or lingered. """
+        with self._lock:
+            self._oldest.setdefault(url, monotonic())
+            buffer = self._buffers.setdefault(url, [])
+            buffer.extend(deliveries)
+            full = len(buffer) >= self._batch_max.get(url, 1)
+
+        if full:
+            self._flush_endpoint(url)
+
+    def _flush_endpoint(self, url: str):
+        with self._lock:
+            deliveries = self._buffers.pop(url, [])
+            self._oldest.pop(url, None)
+
+        size = self._batch_max.get(url, 1)
+
+        for start in range(0, len(deliveries), size):
+            self._post(url, deliveries[start:start + size])
+
+    # ---------------------------------------------------------
+    #
+    def _post(self, url: str, deliveries: List[dict]):
+        """ POST one response (JSON object) or a batch (JSON array), then settle it. """
+        host = urlsplit(url).netloc
+        messages = [delivery['message'] for delivery in deliveries]
+        started = perf_counter()
+        retry_after = None
+
+        try:
+            body = json.dumps(messages if len(messages) > 1 else messages[0],
+                              ensure_ascii=False, default=str).encode('utf-8')
+            response = self.client.post(url, content=body, headers=sign(url, body))
+            status = response.status_code
+
+            if batch_max := response.headers.get(BATCH_HEADER, '').strip():
+                self._batch_max[url] = max(1, int(batch_max)) if batch_max.isdigit() else 1
+
+            retry_after = response.headers.get('Retry-After', '')
+            retry_after = float(retry_after) if retry_after.isdigit() else None
+
+        except httpx.HTTPError as why:
+            status = type(why).__name__
+            logger.warning(f'Webhook POST to {url} failed: {why}')
+
+        WEBHOOK_POST_SECONDS.labels(str(status)).observe(perf_counter() - started)
+        WEBHOOK_BATCH_SIZE.observe(len(deliveries))
+
+        if isinstance(status, int) and 200 <= status < 300:
+            self.breaker.success(host)
+            self._settle(deliveries)
+            WEBHOOK_DELIVERIES.labels('delivered').inc(len(deliveries))
+            logger.success(f'Sent {len(deliveries)} response(s) to URL {url} [{status}].')
+
+        elif isinstance(status, int) and status not in RETRYABLE:
+            # The receiver is up but refuses the response: no retry.
+            self.breaker.success(host)
+            logger.error(f'Webhook {url} refused {len(deliveries)} response(s) [{status}].')
+            self._bury(deliveries)
+
+        else:
+            self.breaker.failure(host)
+            self._schedule(deliveries, retry_after)
+
+    def backoff(self, attempts: int) -> float:
+        """ Return the seconds before the next attempt (exponential, half jittered). """
+        delay = min(config.webhook_backoff_max, config.webhook_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _schedule(self, deliveries: List[dict], retry_after: Optional[float] = None):
+        """ Count a failed attempt and keep the deliveries for a retry, or bury them. """
+        retries, dead = {}, []
+
+        for delivery in deliveries:
+            delivery = {**delivery, 'attempts': delivery['attempts'] + 1}
+
+            if delivery['attempts'] >= config.webhook_max_attempts:
+                dead.append(delivery)
+            else:
+                delay = max(self.backoff(delivery['attempts']), retry_after or 0)
+                retries[_member(delivery)] = self.clock() + delay
+
+        if dead:
+            logger.error(f"Gave up {len(dead)} response(s) to URL {dead[0]['url']}.")
+
+        if self._settle(deliveries, retries, dead):
+            WEBHOOK_DELIVERIES.labels('retried').inc(len(retries))
+        else:
+            WEBHOOK_DELIVERIES.labels('lost').inc(len(retries))
+
+        WEBHOOK_DELIVERIES.labels('dead').inc(len(dead))
+
+    def _defer(self, deliveries: List[dict], delay: float):
+        """ Keep deliveries for later without counting an attempt (open circuit). """
+        due = self.clock() + delay
+
+        if self._settle([], {_member(delivery): due for delivery in deliveries}):
+            WEBHOOK_DELIVERIES.labels('deferred').inc(len(deliveries))
+
+    def _bury(self, deliveries: List[dict]):
+        self._settle(deliveries, dead=deliveries)
+        WEBHOOK_DELIVERIES.labels('dead').inc(len(deliveries))
+
+    def _settle(self, deliveries: List[dict], retries: Optional[Dict[str, float]] = None,
+                dead: List[dict] = ()) -> bool:
+        """ Replace leased deliveries by their retries and dead letters, in one transaction.
+
+        :param deliveries: Deliveries removed from the retry set.
+        :param retries: Members added to the retry set (or rescored), with their due time.
+        :param dead: Deliveries pushed to the dead letter list.
+        :return: False when Redis is unavailable.
+        """
+        if not (deliveries or retries or dead):
+            return True
+
+        try:
+            with self.redis.pipeline() as pipe:
+                if deliveries:
+                    pipe.zrem(RETRY_KEY, *(_member(delivery) for delivery in deliveries))
+
+                if retries:
+                    pipe.zadd(RETRY_KEY, retries)
+
+                if dead:
+                    pipe.lpush(DEAD_KEY, *(_member(delivery) for delivery in dead))
+                    pipe.ltrim(DEAD_KEY, 0, DEAD_LETTERS - 1)
+
+                pipe.execute()
+
+            return True
+
+        except Exception as why:
+            logger.error(f'Webhook retry set unavailable, {len(deliveries or retries or dead)} '
+                         f'response(s) not settled: {why}')
+            return False
+
+    # ---------------------------------------------------------
+    #
+    def drain(self, limit: int = DRAIN_SIZE) -> int:
+        """ Lease the due deliveries of the retry set and POST (or batch) them.
+
+        The lease pushes their score LEASE seconds ahead, in one script, so
+        concurrent workers never take the same delivery; they are removed
+        when settled, or due again for any worker once the lease expires.
+
+        :param limit: Maximum deliveries taken.
+        :return: Number of deliveries claimed.
+        """
+        now = self.clock()
+        claimed = self.redis.register_script(CLAIM)(keys=[RETRY_KEY],
+                                                    args=[now, now + LEASE, limit])
+        endpoints: Dict[str, List[dict]] = {}
+
+        for member in claimed:
+            delivery = json.loads(member)
+            endpoints.setdefault(delivery['url'], []).append(delivery)
+
+        for url, deliveries in endpoints.items():
+            host = urlsplit(url).netloc
+
+            # The first answer of an endpoint may advertise its batch size.
+            while deliveries:
+                size = self._batch_max.get(url, 1)
+
+                if size > 1 and len(deliveries) < size:
+                    self._buffer(url, deliveries)
+                    break
+
+                if not self.breaker.allow(host):
+                    self._defer(deliveries, self.breaker.retry_in(host))
+                    break
+
+                self._post(url, deliveries[:size])
+                deliveries = deliveries[size:]
+
+        return len(claimed)
+
+    def start(self):
+        """ Start the daemon thread flushing the batches and draining the retry set. """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook-dispatcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        tick = max(0.01, min(config.webhook_batch_linger, DRAIN_INTERVAL))
+        next_drain = 0.0
+
+        while not self._stop.is_set():
+            woken = self._wake.wait(tick)
+            self._wake.clear()
+
+            if self._stop.is_set():
+                break
+
+            try:
+                self.flush()
+
+                if woken or monotonic() >= next_drain:
+                    next_drain = monotonic() + DRAIN_INTERVAL
+
+                    # A full drain is followed by the next one at once.
+                    while self.drain() == DRAIN_SIZE and not self._stop.is_set():
+                        pass
+
+            except Exception as why:
+                logger.error(f'Webhook dispatcher error: {why}')
+
+
+_DISPATCHER: Optional[WebhookDispatcher] = None
+
+
+# ---------------------------------------------------------
+#
+def get_dispatcher() -> WebhookDispatcher:
+    """ Return the webhook dispatcher of this process. """
+    global _DISPATCHER
+
+    if _DISPATCHER is None:
+        _DISPATCHER = WebhookDispatcher()
+
+    return _DISPATCHER
+
+
+def set_dispatcher(dispatcher: Optional[WebhookDispatcher]):
+    """ Replace the webhook dispatcher of this process (None: back to default). """
+    global _DISPATCHER
+    _DISPATCHER = dispatcher
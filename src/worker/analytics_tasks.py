@@ -0,0 +1,48 @@
+from loguru import logger
+
+from .celery_app import response_handler, WORKER
+from ..api.analytics import analytics_views
+
+
+def process_analytics_task(task_name: str, **params) -> dict:
+    """Process analytics-related tasks."""
+    logger.debug(f"Task '{task_name}' is processing")
+
+    if task_name == 'tasks.analytics_summary':
+        return analytics_views.summary()
+    elif task_name == 'tasks.rebuild_analytics':
+        return analytics_views.rebuild()
+    elif task_name == 'tasks.analytics_time_in_status':
+        return analytics_views.time_in_status(**params)
+    else:
+        raise ValueError(f"Invalid task name: {task_name}")
+
+
+@WORKER.task(
+    name='tasks.analytics_summary',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+def analytics_summary_processor(task: callable) -> dict:
+    return process_analytics_task(task.name)
+
+
+@WORKER.task(
+    name='tasks.rebuild_analytics',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+def rebuild_analytics_processor(task: callable) -> dict:
+    return process_analytics_task(task.name)
+
+
+@WORKER.task(
+    name='tasks.analytics_time_in_status',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+def analytics_time_in_status_processor(task: callable, entity: str, month: str) -> dict:
+    return process_analytics_task(task.name, entity=entity, month=month)
@@ -1,79 +1,302 @@
-import json
-from bson import ObjectId
-from kombu.serialization import register
-import asyncio
-import datetime
-from typing import Any
+from time import time, perf_counter
+from socket import gethostname
+from typing import Any, Optional
 from traceback import format_exception
 
 # Third party modules
-from celery import Celery
+from celery.signals import (worker_init, worker_shutdown, worker_process_init,
+                            worker_process_shutdown, task_prerun, task_postrun,
+                            task_retry, task_failure)
+from billiard.process import current_process
 from celery.utils.log import get_task_logger
-from httpx import AsyncClient, ConnectTimeout, ConnectError
 
 # Local modules
 from ..config.setup import config
-from ..config import celery_config
 from ..tools.rabbit_client import RabbitClient
+from ..tools.response_transport import get_transport
+from ..tools.task_queue import WORKER, CustomJSONEncoder, stamp_enqueued_at, record_owner
+from ..tools import metrics, tracing, task_timings, reply_to, webhooks, keyset
+from ..api import database
 from loguru import logger
 
-# Constants
-WORKER = Celery(__name__)
-""" Celery worker instance. """
-
 # ---------------------------------------------------------
 
-# Read Celery config values.
-WORKER.config_from_object(celery_config)
-
 # Create unified Celery task logger instance.
 get_task_logger(__name__)
 
-# Used for ObjectID serialization 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        if isinstance(o, datetime):
-            return str(o)
-        return json.JSONEncoder.default(self, o)
+
+# ---------------------------------------------------------
+#
+PROCESS_POOLS = ('prefork', 'processes', 'solo')
+""" Pools running one task at a time per process. """
+
+PROCESS_POOL_SIZE = 2
+""" MongoClient pool size of a single task process (one in use, one spare). """
+
+GREEN_POOLS = ('gevent', 'eventlet')
+""" Pools running tasks as greenlets in one process. """
+
+GREEN_POOL_MAX_SIZE = 100
+""" MongoClient pool size cap for green pools (greenlets queue for a connection). """
+
+GREEN_POOL_WAIT_MS = 10000
+""" Milliseconds a greenlet waits for a free Mongo connection before failing. """
 
 
-# Register the custom JSON encoder with Celery
-register('customjson', CustomJSONEncoder().encode, json.loads,
-         content_type='application/json', content_encoding='utf-8')
+def pool_name(pool_cls) -> str:
+    """ Return the short name of a Celery pool (given by name or class).
+
+    :param pool_cls: Pool name or pool class.
+    :return: Pool name, e.g. prefork, threads, gevent or solo.
+    """
+
+    if isinstance(pool_cls, str):
+        return pool_cls.split(':')[0].split('.')[-1]
+
+    name = pool_cls.__module__.rsplit('.', 1)[-1]
+    return {'thread': 'threads'}.get(name, name)
+
+
+def mongo_pool_size(pool: str, concurrency: int) -> int:
+    """ Return the MongoClient maxPoolSize for a worker process.
+
+    Process pools run one task at a time per child, thread and green
+    pools run ``concurrency`` tasks in one process sharing the client.
+
+    :param pool: Celery pool name.
+    :param concurrency: Worker concurrency.
+    :return: Connection pool size.
+    """
 
+    if config.mongo_max_pool_size:
+        return config.mongo_max_pool_size
 
-WORKER.conf.update(
-    task_serializer='customjson',
-    result_serializer='customjson',
-)
+    if pool in PROCESS_POOLS:
+        return PROCESS_POOL_SIZE
+
+    size = max(concurrency, 1) + PROCESS_POOL_SIZE
+
+    # Hundreds of greenlets mostly wait on I/O, they share a capped pool.
+    return min(size, GREEN_POOL_MAX_SIZE) if pool in GREEN_POOLS else size
+
+
+@worker_init.connect
+def configure_database(sender, **_):
+    """ Size the Mongo connection pool from the worker pool type and concurrency.
+
+    Runs in the main worker process, before the prefork children are
+    forked, so no client is created here.
+    """
+    pool = pool_name(sender.pool_cls)
+    size = mongo_pool_size(pool, sender.concurrency)
+    options = {'maxPoolSize': size}
+
+    if pool in GREEN_POOLS:
+        options['waitQueueTimeoutMS'] = GREEN_POOL_WAIT_MS
+
+    database.configure_client(**options)
+    logger.info(f"Mongo pool size {size} per process ({pool} pool, "
+                f"concurrency {sender.concurrency})")
+
+
+@worker_process_init.connect
+def init_database(**_):
+    """ Give every worker child its own MongoClient (pymongo is not fork-safe). """
+    database.reset_client()
+
+
+@worker_process_shutdown.connect
+def close_database(**_):
+    """ Close the MongoClient of an exiting worker child. """
+    database.close_client()
 
 
 # ---------------------------------------------------------
 #
-async def send_restful_response(url: str, result: dict):
+_TASK_STARTS = {}
+""" Start time (epoch and perf_counter) of the running tasks, per task id. """
+
+
+def message_header(task: callable, name: str):
+    """ Return a custom message header of the current task request.
+
+    Worker requests expose message headers as request attributes,
+    eagerly applied tasks keep them in request.headers.
+
+    :param task: Current task.
+    :param name: Header name.
+    :return: Header value, None when missing.
+    """
+    request = task.request
+    return getattr(request, name, None) or (request.headers or {}).get(name)
+
+
+def task_timing(task: callable, task_id: str) -> dict:
+    """ Return the timing of a running task, up to now.
+
+    :param task: Current task.
+    :param task_id: Unique id of the task.
+    :return: Enqueue, start and finish timestamps (epoch seconds), queue
+        wait and execution seconds, worker host and retry count.
+    """
+
+    started_at, started = _TASK_STARTS.get(task_id, (None, None))
+    enqueued_at = message_header(task, 'enqueued_at')
+    queue_wait = (max(0.0, started_at - enqueued_at)
+                  if started_at is not None and enqueued_at is not None else None)
+
+    return {'enqueued_at': enqueued_at,
+            'started_at': started_at,
+            'finished_at': time(),
+            'queue_wait': queue_wait,
+            'execution': perf_counter() - started if started is not None else None,
+            'host': task.request.hostname or gethostname(),
+            'retries': task.request.retries}
+
+
+@task_prerun.connect
+def observe_task_start(task_id: str, task, **_):
+    """ Remember the task start time and observe its queue wait time. """
+    _TASK_STARTS[task_id] = (time(), perf_counter())
+
+    if (queue_wait := task_timing(task, task_id)['queue_wait']) is not None:
+        metrics.TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(queue_wait)
+
+
+@task_postrun.connect
+def observe_task_runtime(task_id: str, task, state: str = None, **_):
+    """ Observe the task runtime, per final state, and add it to the rolling timings. """
+    if task_id not in _TASK_STARTS:
+        return
+
+    timing = task_timing(task, task_id)
+    del _TASK_STARTS[task_id]
+    metrics.TASK_RUNTIME_SECONDS.labels(task.name, state).observe(timing['execution'])
+    task_timings.record(task.name, timing['queue_wait'], timing['execution'])
+
+
+_TASK_SPANS = {}
+""" Span and context token of the running tasks, per task id. """
+
+
+@task_prerun.connect
+def start_task_span(task_id: str, task, **_):
+    """ Run the task in a span continuing the trace of the publisher. """
+    traceparent = message_header(task, tracing.TRACEPARENT)
+    span, token = tracing.begin_span(f'task {task.name}', traceparent,
+                                     {'celery.task_id': task_id,
+                                      'celery.retries': task.request.retries})
+    if span is not None:
+        _TASK_SPANS[task_id] = (span, token)
+
+
+@task_postrun.connect
+def end_task_span(task_id: str, state: str = None, **_):
+    """ Finish the task span (including the response publication). """
+    if item := _TASK_SPANS.pop(task_id, None):
+        span, token = item
+        span.set_attribute('celery.state', state)
+
+        if state != 'SUCCESS':
+            span.status = 'ERROR'
+
+        tracing.end_span(span, token)
+
+
+_TASK_PRINCIPALS = {}
+""" Principal context token of the running tasks, per task id. """
+
+
+@task_prerun.connect
+def set_task_principal(task_id: str, task, **_):
+    """ Run the task as the principal of the request that published it.
+
+    The principal is recorded as the task owner: keys not granted the
+    process scope only see their own tasks. Eagerly applied tasks already
+    run in the request context.
+    """
+    if principal := keyset.extract(message_header(task, keyset.HEADER)):
+        _TASK_PRINCIPALS[task_id] = keyset.set_principal(principal)
+
+        try:
+            record_owner(task_id, principal.name)
+
+        except Exception as why:
+            logger.error(f'Task owner of [{task_id}] not recorded: {why}')
+
+
+@task_postrun.connect
+def reset_task_principal(task_id: str, **_):
+    if token := _TASK_PRINCIPALS.pop(task_id, None):
+        keyset.reset_principal(token)
+
+
+@task_retry.connect
+def count_task_retry(sender, **_):
+    metrics.TASK_RETRIES.labels(sender.name).inc()
+
+
+@task_failure.connect
+def count_task_failure(sender, **_):
+    metrics.TASK_FAILURES.labels(sender.name).inc()
+
+
+@worker_init.connect
+def start_thread_pool_exporter(sender, **_):
+    """ Start the metrics exporter of a thread or green pool worker (one process). """
+    if config.metrics_worker_port and pool_name(sender.pool_cls) not in PROCESS_POOLS:
+        metrics.start_exporter(config.metrics_worker_port)
+
+
+@worker_init.connect
+def start_thread_pool_dispatcher(sender, **_):
+    """ Start the webhook dispatcher of a thread or green pool worker (one process). """
+    if pool_name(sender.pool_cls) not in PROCESS_POOLS:
+        webhooks.get_dispatcher().start()
+
+
+@worker_process_init.connect
+def start_process_dispatcher(**_):
+    """ Start the webhook dispatcher of a prefork child (or solo worker). """
+    webhooks.get_dispatcher().start()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def stop_dispatcher(**_):
+    """ Send the pending webhook batches of an exiting worker (or worker child). """
+    webhooks.get_dispatcher().close()
+
+
+@worker_process_init.connect
+def start_process_exporter(**_):
+    """ Start the metrics exporter of a prefork child (or solo worker).
+
+    Every child serves its own metrics on METRICS_WORKER_PORT + child index.
+    """
+    if config.metrics_worker_port:
+        index = getattr(current_process(), 'index', 0) or 0
+        metrics.start_exporter(config.metrics_worker_port + index)
+
+
+# ---------------------------------------------------------
+#
+def send_restful_response(url: str, result: dict):
     """ Send processing result to calling service using a RESTful URL call.
 
+    Stored in the webhook retry set and POSTed by the dispatcher thread of
+    the worker process: pooled connections, batching, retries with backoff
+    and a per host circuit breaker (see src/tools/webhooks.py).
+
     :param url: External service callback URL.
     :param result: processing result.
     """
 
     try:
-        async with AsyncClient() as client:
-            resp = await client.post(url=url, timeout=config.url_timeout,
-                                     json=result, headers=config.hdr_data)
-
-        if resp.status_code == 202:
-            logger.success(f"Sent POST response to URL {url} - "
-                           f"[{resp.status_code}: {resp.json()}].")
-
-        else:
-            logger.error(f"Failed POST response to URL {url} - "
-                         f"[{resp.status_code}: {resp.json()}].")
+        webhooks.get_dispatcher().deliver(url, result)
 
-    except (ConnectError, ConnectTimeout):
-        logger.error(f"No connection with response URL: {url}")
+    except BaseException as why:
+        logger.error(f"Webhook delivery to URL {url} failed: {why}")
 
 
 # ---------------------------------------------------------
@@ -94,21 +317,86 @@ async def send_rabbit_response(queue_name: str, result: dict):
         logger.error(f"No connection with RabbitMQ queue {queue_name}: {why}")
 
 
+# ---------------------------------------------------------
+#
+def send_response(queue_name: str, result: dict):
+    """ Send processing result to calling service using the configured transport.
+
+    The default kombu transport is synchronous and reuses the broker
+    connection pool, so it is safe under the gevent/eventlet pools.
+
+    :param queue_name: External service response queue name.
+    :param result: processing result.
+    """
+
+    try:
+        get_transport(WORKER).send(queue_name, result)
+        logger.success(f"Sent response to RabbitMQ queue {queue_name}.")
+
+    except BaseException as why:
+        logger.error(f"No connection with RabbitMQ queue {queue_name}: {why}")
+
+
+# ---------------------------------------------------------
+#
+def publish_response(routing_key: str, result: dict):
+    """ Send processing result to calling service on the response topic exchange.
+
+    :param routing_key: Caller routing key.
+    :param result: processing result.
+    """
+
+    try:
+        get_transport(WORKER).publish(routing_key, result)
+        logger.success(f"Sent response with routing key {routing_key}.")
+
+    except BaseException as why:
+        logger.error(f"No connection with RabbitMQ exchange "
+                     f"{reply_to.RESPONSE_EXCHANGE}: {why}")
+
+
+# ---------------------------------------------------------
+#
+def reply_route(task: callable, args: list) -> Optional[str]:
+    """ Return the reply route of the current task request.
+
+    The X-Reply-To route stamped in the message headers wins over the
+    legacy 'responseUrl' and 'responseQueue' payload parameters.
+
+    :param task: Current task.
+    :param args: Original arguments for the task.
+    :return: Reply route, None for the default queue.
+    """
+
+    if route := message_header(task, reply_to.HEADER):
+        return route
+
+    payload = args[0] if args and isinstance(args[0], dict) else {}
+
+    if url := payload.get('responseUrl'):
+        return url
+
+    if queue := payload.get('responseQueue'):
+        return f'{reply_to.QUEUE}:{queue}'
+
+    return None
+
+
 # ---------------------------------------------------------
 #
 def response_handler(task: callable, status: str, retval: Any,
                      task_id: str, args: list, _, __):
     """
-    Return the processing response, good or bad when the task is finished
-    when the caller has requested it.
+    Return the processing response, good or bad when the task is finished.
 
-    When the 'responseUrl' parameter is one of the input arguments the
-    processing result is returned to the caller by using a RESTful
-    POST call to the specified callback URL.
+    The response is delivered on the reply route of the request (see
+    src/tools/reply_to.py): a queue, a routing key of the response topic
+    exchange or a webhook URL, else on the shared CallerService queue.
+    Routed responses are only seen by their caller; queues and webhook
+    hosts the task principal may not use fall back to CallerService.
 
-    When the 'responseQueue' parameter is one of the input arguments
-    the processing result is returned to the caller by publishing it
-    on the specified RabbitMQ queue.
+    The response carries the task timing (enqueue, start and finish
+    times, queue wait, execution, worker host and retry count).
 
     :param task: Current task.
     :param status: Current task state.
@@ -118,11 +406,6 @@ def response_handler(task: callable, status: str, retval: Any,
     :param _: Not used (needed for correct signature).
     :param __: Not used (needed for correct signature).
     """
-    #payload = args[0]
-
-    # Check if any more work needs to be done here.
-    #if not payload.get('responseUrl', payload.get('responseQueue')):
-    #    return
 
     if status == 'SUCCESS':
         result = retval
@@ -131,15 +414,22 @@ def response_handler(task: callable, status: str, retval: Any,
         logger.error(f"Task '{task.name}' retry processing failed")
         result = {'message': format_exception(retval)}
 
-    response = {'job_id': task_id, 'status': status, 'result': result}
+    response = {'job_id': task_id, 'status': status, 'result': result,
+                'timing': task_timing(task, task_id)}
 
-    """
-    if 'responseUrl' in payload:
-        asyncio.run(send_restful_response(payload['responseUrl'], response))
+    try:
+        kind, target = reply_to.authorize(reply_route(task, args),
+                                          keyset.current_principal())
 
-    if 'responseQueue' in payload:
-        asyncio.run(send_rabbit_response(payload['responseQueue'], response))
-    """
-    #logger.info(f"Type of response before send rabbitmq: {response}")
+    except ValueError as why:
+        logger.error(f"{why}, task {task_id} answered on the default queue")
+        kind, target = reply_to.QUEUE, reply_to.DEFAULT_QUEUE
+
+    if kind == reply_to.URL:
+        send_restful_response(target, response)
 
-    asyncio.run(send_rabbit_response(queue_name='CallerService', result=response))
+    elif kind == reply_to.TOPIC:
+        publish_response(routing_key=target, result=response)
+
+    else:
+        send_response(queue_name=target, result=response)
@@ -4,6 +4,7 @@ from loguru import logger
 
 from ..config.setup import config
 from .celery_app import response_handler, send_rabbit_response, send_restful_response, WORKER
+from ..tools.idempotency import idempotent
 from ..api.customers.customer_api_adapter import CustomersAPIAdapter
 from ..api.customers.customer_data_adapter import CustomersRepository
 
@@ -32,6 +33,7 @@ def process_customer_task(task_name: str, payload: dict = None, customer_id: str
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def create_customer_processor(task: callable, payload: dict) -> dict:
     return process_customer_task(task.name, payload)
 
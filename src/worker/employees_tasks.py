@@ -4,6 +4,7 @@ from loguru import logger
 
 from ..config.setup import config
 from .celery_app import response_handler, WORKER
+from ..tools.idempotency import idempotent
 from ..api.employees.employee_api_adapter import EmployeesAPIAdapter
 from ..api.employees.employee_data_adapter import EmployeesRepository
 
@@ -32,6 +33,7 @@ def process_employee_task(task_name: str, payload: dict = None, employee_id: str
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def create_employee_processor(task: callable, payload: dict) -> dict:
     return process_employee_task(task.name, payload)
 
@@ -6,6 +6,7 @@ import json
 # Local modules
 from ..config.setup import config
 from .celery_app import response_handler, WORKER, logger
+from ..tools.idempotency import idempotent
 from ..api.orders.order_api_adapter import OrdersAPIAdapter
 from ..api.orders.order_data_adapter import OrdersRepository
 from ..api.database import UpdateModel
@@ -21,6 +22,7 @@ MAX_TASK_RETRY = 0
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def create_order_processor(task: callable, payload: dict) -> dict:
     """ Create order in DB
 
@@ -120,6 +122,7 @@ def list_order_quotations_processor(task: callable, order_id: str) -> dict:
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=MAX_TASK_RETRY
 )
+@idempotent
 def cancel_order_processor(task: callable, payload: UpdateModel) -> dict:
     """ Cancel specified order in orders collection
 
@@ -144,6 +147,7 @@ def cancel_order_processor(task: callable, payload: UpdateModel) -> dict:
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=MAX_TASK_RETRY
 )
+@idempotent
 def validate_order_processor(task: callable, payload: UpdateModel) -> dict:
     """ Validate specified order in orders collection
 
@@ -167,6 +171,7 @@ def validate_order_processor(task: callable, payload: UpdateModel) -> dict:
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=MAX_TASK_RETRY
 )
+@idempotent
 def reject_order_processor(task: callable, payload: UpdateModel) -> dict:
     """ Reject specified order in orders collection
 
@@ -0,0 +1,62 @@
+import json
+
+from loguru import logger
+
+from ..config.setup import config
+from .celery_app import response_handler, WORKER
+from ..tools.idempotency import idempotent
+from ..api.pricing.models import PriceTableCreateModel
+from ..api.pricing.pricing_data_adapter import PricingRepository
+from ..api.pricing.pricing_engine import PRICING_ENGINE
+
+
+def process_pricing_task(task_name: str, payload=None) -> dict:
+    """Process pricing-related tasks."""
+    logger.trace(f'config: {json.dumps(config.model_dump(), indent=2)}')
+    logger.debug(
+        f"Task '{task_name}' is processing received payload: {payload}")
+
+    if task_name == 'tasks.publish_price_table':
+        version = PricingRepository().publish(PriceTableCreateModel(**payload))
+        PRICING_ENGINE.refresh()
+        return {'version': version}
+    elif task_name == 'tasks.read_price_table':
+        table = PricingRepository().read_current()
+        return table.model_dump(mode='json') if table else None
+    elif task_name == 'tasks.quote_prices':
+        items = [(item['service'], item.get('customer_id')) for item in payload]
+        version, prices = PRICING_ENGINE.quote(items)
+        return {'version': version, 'prices': prices}
+    else:
+        raise ValueError(f"Invalid task name: {task_name}")
+
+
+@WORKER.task(
+    name='tasks.publish_price_table',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+@idempotent
+def publish_price_table_processor(task: callable, payload: dict) -> dict:
+    return process_pricing_task(task.name, payload)
+
+
+@WORKER.task(
+    name='tasks.read_price_table',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+def read_price_table_processor(task: callable) -> dict:
+    return process_pricing_task(task.name)
+
+
+@WORKER.task(
+    name='tasks.quote_prices',
+    after_return=response_handler,
+    autoretry_for=(BaseException,),
+    bind=True, default_retry_delay=10, max_retries=2
+)
+def quote_prices_processor(task: callable, items: list) -> dict:
+    return process_pricing_task(task.name, items)
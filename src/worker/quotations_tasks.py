@@ -5,6 +5,7 @@ import json
 # Local modules
 from ..config.setup import config
 from .celery_app import response_handler,  WORKER, logger
+from ..tools.idempotency import idempotent
 from ..api.quotations.quotation_api_adapter import QuotationsApi
 from ..api.quotations.quotation_data_adapter import QuotationsRepository
 
@@ -17,6 +18,7 @@ from ..api.quotations.quotation_data_adapter import QuotationsRepository
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def create_quotation_processor(task: callable, payload: dict) -> dict:
     """ Create quotation in DB
 
@@ -90,6 +92,7 @@ def list_quotations_processor(task: callable) -> dict:
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def cancel_quotation_processor(task: callable, quotation_id: str, author_id: str) -> dict:
     """ Cancel specified quotation in quotations collection
 
@@ -114,6 +117,7 @@ def cancel_quotation_processor(task: callable, quotation_id: str, author_id: str
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def validate_quotation_processor(task: callable, quotation_id: str, author_id: str) -> dict:
     """ Validate specified quotation in quotations collection
 
@@ -138,6 +142,7 @@ def validate_quotation_processor(task: callable, quotation_id: str, author_id: s
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def reject_quotation_processor(task: callable, quotation_id: int, author_id: str) -> dict:
     """ Refuse specified quotation in quotations collection
 
@@ -162,6 +167,7 @@ def reject_quotation_processor(task: callable, quotation_id: int, author_id: str
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def accept_quotation_processor(task: callable, quotation_id: int, author_id: str) -> dict:
     """ Accept specified quotation in quotations collection
 
@@ -5,6 +5,7 @@ import json
 # Local modules
 from ..config.setup import config
 from .celery_app import response_handler,  WORKER, logger
+from ..tools.idempotency import idempotent
 from ..api.realisations.realisation_api_adapter import RealisationsApi
 from ..api.realisations.realisation_data_adapter import RealisationsRepository
 
@@ -17,6 +18,7 @@ from ..api.realisations.realisation_data_adapter import RealisationsRepository
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def create_realisation_processor(task: callable, payload: dict) -> dict:
     """ Create realisation in DB
 
@@ -90,6 +92,7 @@ def list_realisations_processor(task: callable) -> dict:
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def complete_realisation_processor(task: callable, realisation_id: str, author_id: str) -> dict:
     """ Complete specified realisation in realisations collection
 
@@ -114,6 +117,7 @@ def complete_realisation_processor(task: callable, realisation_id: str, author_i
     autoretry_for=(BaseException,),
     bind=True, default_retry_delay=10, max_retries=2
 )
+@idempotent
 def start_realisation_processor(task: callable, realisation_id: int, author_id: str) -> dict:
     """ Start specified realisation in realisations collection
 
@@ -1,4 +1,5 @@
 # BUILTIN modules
+import os
 import json
 import time
 import random
@@ -7,6 +8,7 @@ import random
 # Local modules
 from ..config.setup import config
 from .celery_app import response_handler, WORKER, logger
+from ..api.database import db
 
 
 # ---------------------------------------------------------
@@ -41,3 +43,41 @@ def processor(task: callable, payload: dict) -> dict:
 
     # Return the processing result of the lengthy task.
     return {'message': 'Lots of work was done here'}
+
+
+# ---------------------------------------------------------
+#
+@WORKER.task(name='tasks.db_probe', bind=True)
+def db_probe(task: callable) -> dict:
+    """ Do one MongoDB round trip (used by the worker pool benchmark).
+
+    :param task: Current task.
+    :return: Worker process id.
+    """
+
+    db.customers.find_one({}, {'_id': 1})
+
+    return {'pid': os.getpid()}
+
+
+# ---------------------------------------------------------
+#
+@WORKER.task(
+    name='tasks.io_probe',
+    after_return=response_handler,
+    bind=True
+)
+def io_probe(task: callable, delay: float = 0.05) -> dict:
+    """ Simulate an I/O bound task (used by the green pool load test).
+
+    The sleep is cooperative under the gevent/eventlet pools and the
+    response goes through the configured response transport.
+
+    :param task: Current task.
+    :param delay: Simulated I/O time in seconds.
+    :return: Worker process id.
+    """
+
+    time.sleep(delay)
+
+    return {'pid': os.getpid()}
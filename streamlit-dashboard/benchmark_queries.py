@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+""" Time the dashboard top customers/employees queries.
+
+Compares the former per document implementations (one find_one per
+quotation, order and person) with the aggregation pipelines of utils.py,
+on the database utils.py is connected to. Load a large data set first
+with the bulk generator, then run:
+
+    cd streamlit-dashboard
+    python fake_db_generator/bulk_generate.py --orders 1000000 --id-format string --drop
+    python benchmark_queries.py --repeat 3 --output results.json
+
+The former queries look the orders and people up by the stored
+reference as is, so they only work on string ids (--id-format string);
+the pipelines accept both forms. Requires MongoDB 5.0+ ($lookup with
+localField and a sub pipeline, $unionWith). tests/test_dashboard_pipelines.py
+checks that both return the same rows.
+"""
+
+# BUILTIN modules
+import json
+import time
+import argparse
+from collections import defaultdict
+
+# Third party modules
+import pandas as pd
+from pymongo import monitoring
+
+
+# ---------------------------------------------------------
+#
+class CommandCounter(monitoring.CommandListener):
+    """ Count the commands sent to the server (the round trips). """
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Registered before utils creates its client.
+COUNTER = CommandCounter()
+monitoring.register(COUNTER)
+
+import utils  # noqa: E402
+
+
+# ---------------------------------------------------------
+#
+def legacy_top_customers(n: int) -> pd.DataFrame:
+    """ The former implementation: one order and one customer read per row. """
+    top_customers_id = defaultdict(int)
+
+    for q in utils.quotation_collection.find({"status": utils.QuotationStatus.QACC}):
+        order = utils.orders_collection.find_one({"_id": q["order_id"]})
+        top_customers_id[order["customer_id"]] += q["price"]
+
+    top_customers_id = sorted(top_customers_id.items(),
+                              key=lambda x: x[1], reverse=True)[:n]
+
+    rows = []
+    for c_id, amount in top_customers_id:
+        customer = utils.customers_collection.find_one({"_id": c_id})
+        if customer:
+            rows.append({"Name": customer["first_name"] + " " + customer["last_name"],
+                         "Expense": amount})
+
+    return pd.DataFrame(rows)
+
+
+def legacy_top_employees(n: int) -> pd.DataFrame:
+    """ The former implementation: every document decoded in Python. """
+    scores = defaultdict(int)
+
+    for order in utils.orders_collection.find({}, {"update_history": 1}):
+        for entry in order.get("update_history") or []:
+            if entry["new_status"] in utils.EMPLOYEE_ORDER_STATUSES:
+                scores[entry["by"]] += 1
+
+    for quotation in utils.quotation_collection.find({}, {"update_history": 1}):
+        for entry in quotation.get("update_history") or []:
+            if entry["new_status"] in utils.EMPLOYEE_QUOTATION_STATUSES:
+                scores[entry["by"]] += 1
+
+    for realisation in utils.realisation_collection.find({}, {"employee_id": 1}):
+        scores[realisation["employee_id"]] += 1
+
+    rows = []
+    for e_id, score in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:n]:
+        employee = utils.employees_collection.find_one({"_id": e_id})
+        if employee:
+            rows.append({"Name": employee["first_name"] + " " + employee["last_name"],
+                         "Score": score})
+
+    return pd.DataFrame(rows)
+
+
+# ---------------------------------------------------------
+#
+def measure(query, n: int, repeat: int) -> dict:
+    """ Return the best time and the round trips of a query. """
+    timings = []
+
+    for _ in range(repeat):
+        COUNTER.count = 0
+        start = time.perf_counter()
+        frame = query(n)
+        timings.append(time.perf_counter() - start)
+
+    return {"seconds": round(min(timings), 3), "round_trips": COUNTER.count,
+            "rows": len(frame)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = {'orders': utils.orders_collection.estimated_document_count(),
+               'quotations': utils.quotation_collection.estimated_document_count()}
+    print(f"{results['orders']} orders, {results['quotations']} quotations")
+
+    for name, query in (('top_customers (legacy)', legacy_top_customers),
+                        ('top_customers (pipeline)', utils.top_customers.uncached),
+                        ('top_employees (legacy)', legacy_top_employees),
+                        ('top_employees (pipeline)', utils.top_employees_from_history)):
+        results[name] = measure(query, args.top, args.repeat)
+        print(f'{name:<28} {results[name]}')
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -79,40 +79,36 @@ def read(order_id: str):
     response = db.orders.find_one({"_id": ObjectId(order_id)})
     return response
 
-def update(self, order_id: str, new_status: OrderStatus, d: datetime, author_id: str, comment: str = ""):
+def update(order_id: str, new_status: OrderStatus, d: datetime, author_id: str, comment: str = ""):
     """ Update Order in DB collection api_db.orders.
 
     :param order_id: id of the order to update.
     :param new_status: The new status of the order.
+    :param d: When the status changed.
     :param autor_id: id of who make the modification
     :return: updated order.
     """
-    order = read(order_id=order_id)
-
-    db.orders.update_one({"_id": ObjectId(order_id)}, {
-        "$set": {"status": new_status.value}})
-
-    # Update the update history
     update_history_entry = {
-        "new_status": new_status,
-        "when": datetime.utcnow(),
-        "by":author_id,
+        "new_status": new_status.value,
+        "when": d,
+        "by": author_id,
         "comment": comment
     }
 
+    # Status and history in one write.
     db.orders.update_one(
         {"_id": ObjectId(order_id)},
-        {"$push": {"update_history": update_history_entry.model_dump()}}
+        {"$set": {"status": new_status.value},
+         "$push": {"update_history": update_history_entry}}
     )
 
-    updated_order = self.read(order_id=order_id)
-
-    return updated_order
+    return read(order_id=order_id)
 
 
-# Exemple d'utilisation
-start_date_str = "2024-02-14T02:58:28"
-end_date = datetime.now()
+if __name__ == "__main__":
+    # Exemple d'utilisation
+    start_date_str = "2024-02-14T02:58:28"
+    end_date = datetime.now()
 
-created = random_date(start_date_str, end_date)
-#print(created)
+    created = random_date(start_date_str, end_date)
+    print(created)
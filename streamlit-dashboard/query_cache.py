@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+""" Process wide cache of the dashboard queries.
+
+Streamlit reruns the whole script on every widget interaction, in one
+thread per session. Query results are kept per function and arguments
+and tagged with a version made of a data watermark (read from the
+database at most every ``watermark_ttl`` seconds) and a time bucket
+(``bucket_seconds``), so a result is reused until the data changed or
+the bucket ended:
+
+- concurrent calls with the same arguments share one computation,
+- a result whose version is outdated is still returned while a
+  background thread recomputes it, unless it is older than ``max_stale``.
+
+Results are deep copied on return: callers may modify them.
+"""
+
+# BUILTIN modules
+import copy
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional
+
+
+# ---------------------------------------------------------
+#
+class QueryCache:
+    """ Versioned, single flight cache of query results. """
+
+    def __init__(self, watermark: Optional[Callable[[], Hashable]] = None,
+                 watermark_ttl: float = 2.0, bucket_seconds: float = 300.0,
+                 max_stale: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        """ Initialize the cache.
+
+        :param watermark: Return a value that changes with the data (cheap read).
+        :param watermark_ttl: Seconds a read watermark is trusted.
+        :param bucket_seconds: Results are recomputed at least once per bucket.
+        :param max_stale: Age after which an outdated result is not served.
+        :param clock: Time source (seconds).
+        """
+        self.watermark = watermark or (lambda: None)
+        self.watermark_ttl = watermark_ttl
+        self.bucket_seconds = bucket_seconds
+        self.max_stale = max_stale
+        self.clock = clock
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'errors': 0}
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._mark = None
+        self._mark_read = None
+        self._mark_lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2,
+                                             thread_name_prefix='query-cache')
+
+    # ---------------------------------------------------------
+    #
+    def version(self) -> tuple:
+        """ Return the current (watermark, time bucket) version. """
+        now = self.clock()
+
+        if self._stale_mark(now):
+            # One session reads the watermark, the concurrent ones wait for it.
+            with self._mark_lock:
+                if self._stale_mark(now):
+                    self._mark = self.watermark()
+                    self._mark_read = now
+
+        return self._mark, int(now // self.bucket_seconds)
+
+    def _stale_mark(self, now: float) -> bool:
+        return self._mark_read is None or now - self._mark_read >= self.watermark_ttl
+
+    # ---------------------------------------------------------
+    #
+    def get(self, func: Callable, *args, **kwargs) -> Any:
+        """ Return the result of func(*args, **kwargs), cached.
+
+        :param func: Query function, its arguments must be hashable.
+        :return: A copy of the cached result.
+        """
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        version = self.version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry and entry['version'] == version:
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry['value'])
+
+            future = self._inflight.get(key)
+            owner = future is None
+
+            if owner:
+                future = self._inflight[key] = Future()
+
+            if entry and self.clock() - entry['stored'] < self.max_stale:
+                self.stats['stale'] += 1
+
+                if owner:
+                    self._refresher.submit(self._compute, key, version, future,
+                                           func, args, kwargs)
+
+                return copy.deepcopy(entry['value'])
+
+            self.stats['misses'] += 1
+
+        if owner:
+            self._compute(key, version, future, func, args, kwargs)
+
+        return copy.deepcopy(future.result())
+
+    # ---------------------------------------------------------
+    #
+    def _compute(self, key: tuple, version: tuple, future: Future,
+                 func: Callable, args: tuple, kwargs: dict):
+        """ Run a query, store its result and release the waiting callers. """
+        try:
+            value = func(*args, **kwargs)
+
+        except BaseException as why:
+            with self._lock:
+                self.stats['errors'] += 1
+                self._inflight.pop(key, None)
+
+            future.set_exception(why)
+            return
+
+        with self._lock:
+            self._entries[key] = {'version': version, 'value': value,
+                                  'stored': self.clock()}
+            self._inflight.pop(key, None)
+
+        future.set_result(value)
+
+    # ---------------------------------------------------------
+    #
+    def clear(self):
+        """ Forget every result and the last watermark. """
+        with self._lock, self._mark_lock:
+            self._entries.clear()
+            self._mark_read = None
+
+    # ---------------------------------------------------------
+    #
+    def cached(self, func: Callable) -> Callable:
+        """ Decorator serving func through the cache. """
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.get(func, *args, **kwargs)
+
+        wrapper.uncached = func
+        return wrapper
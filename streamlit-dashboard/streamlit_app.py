@@ -5,7 +5,7 @@ import pandas as pd
 import altair as alt
 import plotly.express as px
 
-from utils import top_customers, top_employees, revenue_per_month_per_service, plot_revenue_per_service, realisations_completed_per_month
+from utils import top_customers, top_employees, revenue_per_month_per_service, plot_revenue_per_service, realisations_completed_per_month, order_funnel
 
 TOP = 10
 
@@ -66,6 +66,9 @@ with col[1]:
 
     df = realisations_completed_per_month()
 
+    st.markdown('#### Order Funnel')
+    st.bar_chart(order_funnel(), x="Status", y="Reached")
+
 
 with col[2]:
     st.markdown('#### Top Customers')
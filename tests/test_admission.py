@@ -0,0 +1,82 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.tools import admission
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(admission.config, 'admission_report_depth', 100)
+    monkeypatch.setattr(admission.config, 'admission_read_depth', 500)
+    monkeypatch.setattr(admission.config, 'admission_critical_depth', 1000)
+    monkeypatch.setattr(admission.config, 'admission_depth_ttl', 1.0)
+    monkeypatch.setattr(admission.config, 'admission_retry_after', 5)
+
+
+def test_classes_are_shed_by_priority(limits):
+    depth = [0]
+    controller = admission.AdmissionController(lambda: depth[0], Clock())
+
+    for value, expected in ((99, (None, None, None)),
+                            (200, ((429, 10), None, None)),
+                            (600, ((429, 30), (429, 6), None)),
+                            (5000, ((429, 120), (429, 50), (503, 25)))):
+        depth[0] = value
+        controller._checked = float('-inf')
+        assert tuple(controller.check(task_class) for task_class in
+                     (admission.REPORT, admission.READ, admission.CRITICAL)) == expected
+
+
+def test_depth_is_cached_and_failures_admit(limits):
+    clock, reads = Clock(), []
+
+    def reader():
+        reads.append(clock.now)
+
+        if len(reads) == 3:
+            raise ConnectionError('broker down')
+
+        return 150
+
+    controller = admission.AdmissionController(reader, clock)
+
+    assert controller.check(admission.REPORT) == (429, 8)
+    clock.now = 0.9
+    assert controller.check(admission.REPORT) == (429, 8)
+    clock.now = 1.0
+    assert controller.check(admission.READ) is None
+    clock.now = 2.0
+    assert controller.check(admission.REPORT) is None
+    assert reads == [0.0, 1.0, 2.0]
+
+
+def test_refused_request_carries_retry_after(limits):
+    app = FastAPI()
+
+    @app.get('/orders', dependencies=[Depends(admission.admit_report)])
+    def list_orders():
+        return []
+
+    @app.post('/orders', dependencies=[Depends(admission.admit_critical)])
+    def create_order():
+        return {}
+
+    admission.set_controller(admission.AdmissionController(lambda: 300, Clock()))
+
+    try:
+        client = TestClient(app)
+        refused, admitted = client.get('/orders'), client.post('/orders')
+    finally:
+        admission.set_controller(None)
+
+    assert refused.status_code == 429 and refused.headers['Retry-After'] == '15'
+    assert admitted.status_code == 200
@@ -0,0 +1,193 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+mongomock = pytest.importorskip('mongomock')
+
+from src.api import database
+from src.api.analytics import analytics_views, durations
+from src.api.orders.models import OrderCreateInternalModel, OrderStatus
+from src.api.orders.order_data_adapter import OrdersRepository
+from src.api.quotations.models import QuotationCreateInternalModel, QuotationStatus
+from src.api.quotations.quotation_data_adapter import QuotationsRepository
+from src.api.realisations.models import RealisationCreateInternalModel, RealisationStatus
+from src.api.realisations.realisation_data_adapter import RealisationsRepository
+
+EMPLOYEE = str(ObjectId())
+CUSTOMER = str(ObjectId())
+
+
+@pytest.fixture
+def mongo():
+    database.set_client(mongomock.MongoClient())
+    analytics_views.ANALYTICS._indexed = False
+    analytics_views.ANALYTICS._durations_indexed = False
+    analytics_views.ANALYTICS._counters_indexed = False
+    yield
+    database.reset_client()
+
+
+def run_order_lifecycle(price: int, service: str = None):
+    orders, quotations = OrdersRepository(), QuotationsRepository()
+    order_id = orders.create(OrderCreateInternalModel(
+        customer_id=CUSTOMER, service='Make a web site', description='Site',
+        status=OrderStatus.UREV, created=datetime(2024, 5, 3),
+        update_history=[]).model_dump())
+    orders.update(order_id, OrderStatus.ORAC, EMPLOYEE)
+
+    quotation_id = quotations.create(QuotationCreateInternalModel(
+        price=price, order_id=order_id, details='Quote', owner_id=None,
+        status=QuotationStatus.QUREV, created=datetime(2024, 5, 4), update_history=[],
+        service=service))
+    quotations.update(quotation_id, QuotationStatus.QVAL, EMPLOYEE)
+    quotations.update(quotation_id, QuotationStatus.QACC, CUSTOMER)
+
+    realisations = RealisationsRepository()
+    realisation_id = realisations.create(RealisationCreateInternalModel(
+        order_id=order_id, employee_id=EMPLOYEE, created_by=None,
+        status=RealisationStatus.RSCH, assignment_date=datetime(2024, 5, 5),
+        update_history=[], service=service))
+    orders.update(order_id, OrderStatus.RESC, CUSTOMER)
+    realisations.update(realisation_id, RealisationStatus.RSTA, EMPLOYEE)
+    realisations.update(realisation_id, RealisationStatus.RCOM, EMPLOYEE)
+
+
+def test_views_follow_transitions(mongo):
+    run_order_lifecycle(5000)
+    run_order_lifecycle(7000)
+
+    views = analytics_views.summary()
+
+    assert views['orders_by_status'] == {'underReview': 0, 'orderAccepted': 0,
+                                         'realisationScheduled': 2}
+    assert views['orders_per_month'] == {'2024-05': {'Make a web site': 2}}
+    assert views['quotations_by_status']['quotationAccepted'] == 2
+    assert views['revenue_per_month'] == {'2024-05': {'Make a web site': 12000}}
+    assert views['realisations_by_status']['realisationCompleted'] == 2
+    assert sum(views['realisations_completed_per_month'].values()) == 2
+    # Order validation, quotation validation and realisation, per order.
+    assert analytics_views.ANALYTICS.top_employees(5) == [(EMPLOYEE, 6)]
+
+
+def test_views_are_the_sum_of_the_counter_shards(mongo):
+    counters = database.get_db()['analytics_counters']
+    counters.insert_many([
+        {'_id': 'views:0', 'orders_by_status': {'underReview': 2},
+         'orders_per_month': {'2024-05': {'web': 1}}},
+        {'_id': 'views:5', 'orders_by_status': {'underReview': -1, 'orderAccepted': 1},
+         'orders_per_month': {'2024-05': {'web': 2, 'app': 1}}}])
+
+    views = analytics_views.summary()
+
+    assert views['orders_by_status'] == {'underReview': 1, 'orderAccepted': 1}
+    assert views['orders_per_month'] == {'2024-05': {'web': 3, 'app': 1}}
+    assert views['revenue_per_month'] == {}
+
+
+def test_transitions_use_the_service_copied_from_the_order(mongo, monkeypatch):
+    lookups = []
+    original = analytics_views._order_service
+
+    def order_service(before):
+        lookups.append(before.get('service'))
+        return original(before)
+
+    monkeypatch.setattr(analytics_views, '_order_service', order_service)
+    run_order_lifecycle(5000, service='Make a web site')
+
+    # Quotation (two) and realisation (two) transitions, none read the order.
+    assert lookups == ['Make a web site'] * 4
+    assert analytics_views.summary()['revenue_per_month'] == \
+        {'2024-05': {'Make a web site': 5000}}
+
+
+def test_rebuild_matches_incremental_views(mongo):
+    run_order_lifecycle(5000)
+    incremental = analytics_views.summary()
+    scores = analytics_views.ANALYTICS.top_employees(5)
+
+    database.get_db()['analytics_counters'].drop()
+    analytics_views.rebuild()
+
+    drop_zero = lambda view: {key: value for key, value in view.items() if value}
+    rebuilt = analytics_views.summary()
+
+    assert {view: drop_zero(values) for view, values in rebuilt.items()} == \
+        {view: drop_zero(values) for view, values in incremental.items()}
+    assert analytics_views.ANALYTICS.top_employees(5) == scores
+
+
+def test_transitions_see_the_status_their_write_replaced(mongo, monkeypatch):
+    orders = OrdersRepository()
+    order_id = orders.create(OrderCreateInternalModel(
+        customer_id=CUSTOMER, service='Make a web site', description='Site',
+        status=OrderStatus.UREV, created=datetime(2024, 5, 3),
+        update_history=[]).model_dump())
+    left = []
+    transition = analytics_views.order_transition
+    monkeypatch.setattr(analytics_views, 'order_transition',
+                        lambda before, *args: left.append(before['status']) or
+                        transition(before, *args))
+
+    # Two callers both leaving "underReview": the second one really leaves "orderAccepted".
+    assert orders.update(order_id, OrderStatus.ORAC, EMPLOYEE)
+    assert orders.update(order_id, OrderStatus.OREJ, EMPLOYEE)
+    assert not orders.update(order_id, OrderStatus.OREJ, EMPLOYEE)
+
+    assert left == ['underReview', 'orderAccepted']
+    assert analytics_views.summary()['orders_by_status'] == \
+        {'underReview': 0, 'orderAccepted': 0, 'orderRejected': 1}
+
+
+def test_time_in_status_histograms(mongo):
+    run_order_lifecycle(5000)
+    run_order_lifecycle(7000)
+
+    orders = analytics_views.time_in_status('orders')['statuses']
+    quotations = analytics_views.time_in_status('quotations')['statuses']
+
+    # Orders created in May 2024 stayed under review until now.
+    under_review = orders['underReview']['Make a web site']
+    assert under_review['count'] == 2
+    assert under_review['p50'] >= under_review['mean'] / 1.1 > 86400
+    assert orders['orderAccepted']['all']['count'] == 2
+    assert set(quotations) == {'quotationUnderReview', 'quotationValidated'}
+    assert analytics_views.summary()['orders_reached']['orderAccepted'] == 2
+
+
+def test_rebuild_matches_incremental_histograms(mongo):
+    run_order_lifecycle(5000)
+    run_order_lifecycle(7000)
+    histograms = database.get_db()['analytics_status_durations']
+    incremental = {document['_id']: document for document in histograms.find()}
+
+    histograms.drop()
+    analytics_views.rebuild()
+    rebuilt = {document['_id']: document for document in histograms.find()}
+
+    assert rebuilt.keys() == incremental.keys()
+    assert {'orders', 'quotations', 'realisations'} == {key.split(':')[0] for key in rebuilt}
+
+    for key, document in rebuilt.items():
+        for service, histogram in document['services'].items():
+            expected = incremental[key]['services'][service]
+
+            # The stored history times are rounded to the millisecond.
+            assert histogram['sum'] == pytest.approx(expected['sum'], abs=0.01)
+            assert (histogram['count'], histogram['buckets']) == \
+                (expected['count'], expected['buckets'])
+
+
+def test_duration_buckets():
+    assert durations.bucket(0.5) == 0
+    assert durations.bucket(10 ** 12) == durations.MAX_BUCKET
+
+    for seconds in (1, 7, 3600, 86400 * 30):
+        upper = durations.upper_bound(durations.bucket(seconds))
+        assert seconds <= upper <= seconds * 2 ** (1 / durations.SUB_BUCKETS)
+
+    stats = durations.summarize(3, 90, {str(durations.bucket(value)): 1
+                                        for value in (10, 20, 60)})
+    assert stats['count'] == 3 and stats['mean'] == 30
+    assert 20 <= stats['p50'] < 22 and 60 <= stats['p99'] < 66
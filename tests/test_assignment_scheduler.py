@@ -0,0 +1,50 @@
+from src.api.employees.assignment_scheduler import (
+    AssignmentScheduler, LeastLoadedStrategy, RoundRobinStrategy,
+    SkillWeightedStrategy)
+
+
+def _scheduler(strategy, loads, skills=None):
+    snapshot = (dict(loads), skills or {key: set() for key in loads})
+    return AssignmentScheduler(strategy, loader=lambda: snapshot,
+                               refresh_interval=3600)
+
+
+def test_least_loaded_picks_lowest_load():
+    scheduler = _scheduler(LeastLoadedStrategy(), {'a': 3, 'b': 1, 'c': 2})
+
+    assert scheduler.assign() == 'b'
+    assert scheduler.load_of('b') == 2
+    # b and c are now tied at 2, a stays the busiest.
+    assert {scheduler.assign(), scheduler.assign()} == {'b', 'c'}
+    assert scheduler.load_of('a') == 3
+
+
+def test_release_makes_employee_available_again():
+    scheduler = _scheduler(LeastLoadedStrategy(), {'a': 0, 'b': 0})
+
+    first = scheduler.assign()
+    second = scheduler.assign()
+    scheduler.release(first)
+
+    assert first != second
+    assert scheduler.assign() == first
+
+
+def test_round_robin_cycles_employees():
+    scheduler = _scheduler(RoundRobinStrategy(), {'a': 9, 'b': 0, 'c': 0})
+
+    assert [scheduler.assign() for _ in range(4)] == ['a', 'b', 'c', 'a']
+
+
+def test_skill_weighted_prefers_skilled_employee():
+    skills = {'a': set(), 'b': {'Make a mobile app'}}
+    scheduler = _scheduler(SkillWeightedStrategy(penalty=3), {'a': 0, 'b': 2}, skills)
+
+    assert scheduler.assign('Make a mobile app') == 'b'
+    # b now costs as much as a plus its penalty (ties go to the lowest id).
+    assert scheduler.assign('Make a mobile app') == 'a'
+    assert scheduler.assign('Make a web site') == 'a'
+
+
+def test_no_employees_returns_none():
+    assert _scheduler(LeastLoadedStrategy(), {}).assign() is None
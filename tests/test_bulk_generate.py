@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('faker')
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'streamlit-dashboard' / 'fake_db_generator'))
+
+import bulk_generate
+from src.api import database
+from src.api.analytics import analytics_views
+
+
+@pytest.fixture
+def mongo():
+    client = mongomock.MongoClient()
+    database.set_client(client)
+    yield database.get_db()
+    database.reset_client()
+
+
+def test_chunks_depend_on_seed_only():
+    spec = bulk_generate.settings(300, seed=5, chunk_size=100)
+
+    assert bulk_generate.generate_chunk(1, spec) == bulk_generate.generate_chunk(1, spec)
+    assert bulk_generate.generate_chunk(1, spec) != bulk_generate.generate_chunk(2, spec)
+    assert bulk_generate.generate_chunk(3, spec)['orders'] == []
+
+
+def test_loaded_data_is_consistent(mongo):
+    spec = bulk_generate.settings(500, seed=1, customers=40, employees=5,
+                                  chunk_size=200, batch_size=64)
+    counts = bulk_generate.load(mongo, spec)
+
+    assert counts['orders'] == mongo.orders.count_documents({}) == 500
+    order_ids = {str(order['_id']) for order in mongo.orders.find({}, {'_id': 1})}
+    assert {quotation['order_id'] for quotation in mongo.quotations.find()} <= order_ids
+    assert mongo.realisations.count_documents({}) == \
+        mongo.quotations.count_documents({'status': 'quotationAccepted'})
+
+    # The generated documents replay through the analytics rebuild.
+    analytics_views.ANALYTICS._indexed = False
+    assert analytics_views.rebuild() == {'quotations': counts['quotations'], 'orders': 500,
+                                         'realisations': counts['realisations']}
+    views = analytics_views.summary()
+    assert sum(views['orders_by_status'].values()) == 500
+    assert views['orders_reached']['underReview'] == 500
@@ -0,0 +1,80 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+mongomock = pytest.importorskip('mongomock')
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'streamlit-dashboard'))
+
+import columnar
+
+
+class RawBatches:
+    """ mongomock collection with the find_raw_batches of pymongo. """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find_raw_batches(self, query, projection, batch_size):
+        documents = list(self.collection.find(query, projection))
+
+        for start in range(0, len(documents), batch_size):
+            yield b''.join(bson.encode(document)
+                           for document in documents[start:start + batch_size])
+
+
+def history(start, *steps):
+    # As the API stores it: the transitions only, after the creation time.
+    entries, when = [], start
+    for hours, status in steps:
+        when += timedelta(hours=hours)
+        entries.append({'new_status': status, 'when': when.isoformat(), 'by': 'e1'})
+    return entries
+
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    start = datetime(2024, 5, 1)
+    orders = [{'_id': bson.ObjectId(), 'service': service,
+               'status': steps[-1][1] if steps else 'underReview', 'created': start,
+               'update_history': history(start, *steps)}
+              for service, steps in (
+                  ('web_site', [(2, 'orderAccepted'), (10, 'realisationScheduled')]),
+                  ('mobile_app', [(4, 'orderRejected')]),
+                  ('web_site', []))]
+    database.orders.insert_many(orders)
+    database.quotations.insert_many([
+        {'order_id': str(orders[0]['_id']), 'price': 500, 'status': 'quotationAccepted',
+         'created': start},
+        {'order_id': str(orders[2]['_id']), 'price': 300, 'status': 'quotationAccepted',
+         'created': datetime(2024, 6, 2).isoformat()},
+        {'order_id': str(orders[1]['_id']), 'price': 900, 'status': 'quotationRejected',
+         'created': start}])
+    return {name: RawBatches(database[name]) for name in ('orders', 'quotations')}
+
+
+def test_revenue_per_month_joins_streamed_orders(db):
+    revenue = columnar.revenue_per_month(db, batch_size=1)
+
+    assert revenue.to_dict('records') == [
+        {'Month': '2024-05', 'Service': 'web_site', 'Total Revenue': 500},
+        {'Month': '2024-06', 'Service': 'web_site', 'Total Revenue': 300}]
+
+
+def test_funnel_and_time_in_status(db):
+    funnel = columnar.status_funnel(db['orders'], batch_size=2)
+    assert dict(zip(funnel['Status'], funnel['Reached'])) == {
+        'underReview': 3, 'orderAccepted': 1, 'realisationScheduled': 1,
+        'realisationStarted': 0, 'realisationCompleted': 0}
+    assert list(funnel['Conversion']) == pytest.approx([1, 1 / 3, 1 / 3, 0, 0])
+
+    durations = columnar.time_in_status(db['orders'], batch_size=2).set_index('Status')
+    assert durations.loc['underReview', 'Count'] == 2
+    assert durations.loc['underReview', 'Mean hours'] == pytest.approx(3)
+    assert durations.loc['orderAccepted', 'P50 hours'] >= 10
@@ -30,7 +30,7 @@ def test_dev_config(test_app: TestClient):
     assert conf.flower_host == 'localhost'
     assert isinstance(conf.hdr_data, dict)
     assert isinstance(conf.url_timeout, tuple)
-    assert conf.hdr_data['X-API-Key'] == conf.service_api_key
+    assert 'X-API-Key' not in conf.hdr_data
 
 
 # ---------------------------------------------------------
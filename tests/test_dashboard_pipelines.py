@@ -0,0 +1,79 @@
+""" Dashboard aggregation pipelines against the former per document queries.
+
+Needs a real MongoDB 5.0+ server (mongomock lacks $unionWith and
+$convert): set MONGO_TEST_URL, e.g. mongodb://localhost:27017/. A
+throwaway database is created and dropped.
+"""
+import os
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+URL = os.getenv('MONGO_TEST_URL')
+pytestmark = pytest.mark.skipif(not URL, reason='MONGO_TEST_URL (MongoDB 5.0+) not set')
+
+pytest.importorskip('faker')
+pytest.importorskip('streamlit')
+
+DASHBOARD = Path(__file__).parents[1] / 'streamlit-dashboard'
+sys.path.insert(0, str(DASHBOARD / 'fake_db_generator'))
+sys.path.insert(0, str(DASHBOARD))
+
+import bulk_generate
+from pymongo import MongoClient
+
+COLLECTIONS = ('customers', 'employees', 'orders', 'quotations', 'realisations')
+
+
+@pytest.fixture(params=['string', 'objectid'])
+def dashboard(request, monkeypatch):
+    """ utils and benchmark_queries bound to a generated data set. """
+    import utils
+    import benchmark_queries
+
+    client = MongoClient(URL)
+    db = client[f'dashboard_test_{uuid4().hex[:8]}']
+    bulk_generate.load(db, bulk_generate.settings(3000, seed=7, customers=60, employees=12,
+                                                  id_format=request.param,
+                                                  chunk_size=1000, batch_size=500))
+
+    for name in COLLECTIONS:
+        attribute = {'quotations': 'quotation_collection',
+                     'realisations': 'realisation_collection'}.get(name, f'{name}_collection')
+        monkeypatch.setattr(utils, attribute, db[name])
+
+    yield request.param, utils, benchmark_queries
+    client.drop_database(db.name)
+    client.close()
+
+
+def rows(frame, value: str):
+    # Ties are ordered differently: compare the (name, value) multiset.
+    return sorted(zip(frame['Name'], frame[value]))
+
+
+def test_top_customers_match_the_legacy_query(dashboard):
+    id_format, utils, benchmark_queries = dashboard
+    pipeline = utils.top_customers.uncached(1000)
+
+    assert 0 < len(pipeline) <= 60
+    assert list(pipeline['Expense']) == sorted(pipeline['Expense'], reverse=True)
+
+    # The former query only worked on string ids (it looked orders up by order_id as is).
+    if id_format == 'string':
+        assert rows(pipeline, 'Expense') == rows(benchmark_queries.legacy_top_customers(1000),
+                                                 'Expense')
+
+
+def test_top_employees_match_the_legacy_query(dashboard):
+    id_format, utils, benchmark_queries = dashboard
+    pipeline = utils.top_employees_from_history(1000)
+
+    assert len(pipeline) == 12
+    assert list(pipeline['Score']) == sorted(pipeline['Score'], reverse=True)
+
+    if id_format == 'string':
+        assert rows(pipeline, 'Score') == rows(benchmark_queries.legacy_top_employees(1000),
+                                               'Score')
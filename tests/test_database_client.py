@@ -0,0 +1,38 @@
+import mongomock
+
+from src.api import database
+
+
+def test_db_uses_client_of_current_process(monkeypatch):
+    created = []
+    monkeypatch.setattr(database, 'MongoClient',
+                        lambda url, **options: created.append(options) or mongomock.MongoClient())
+    database.configure_client(maxPoolSize=2)
+    database.reset_client()
+
+    try:
+        first = database.get_client()
+        assert database.get_client() is first
+
+        # A forked child gets its own client, with the configured options.
+        monkeypatch.setattr(database.os, 'getpid', lambda: -1)
+        assert database.get_client() is not first
+        assert created == [{'maxPoolSize': 2}, {'maxPoolSize': 2}]
+
+    finally:
+        database.configure_client()
+        database.reset_client()
+
+
+def test_repository_collection_follows_client():
+    repository = database.BaseRepository(database.db, 'customers')
+
+    try:
+        database.set_client(mongomock.MongoClient())
+        obj_id = repository.create({'name': 'Alice'})
+
+        database.set_client(mongomock.MongoClient())
+        assert repository.read(obj_id) is None
+
+    finally:
+        database.reset_client()
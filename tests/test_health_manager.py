@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from src.api.models import ResourceModel
+from src.tools import health_manager
+from src.tools.health_manager import HealthMonitor
+
+
+def _checks(*states):
+    return tuple((lambda name=name, state=state: [ResourceModel(name=name, status=state)])
+                 for name, state in states)
+
+
+def test_refresh_caches_serialized_response(monkeypatch):
+    monkeypatch.setattr(health_manager, 'CHECKS',
+                        _checks(('Celery.backend (Redis)', True), ('MongoDb', True)))
+    monitor = HealthMonitor(interval=60)
+
+    assert monitor.stale
+    status = asyncio.run(monitor.refresh())
+
+    assert status.status is True
+    assert not monitor.stale
+    code, body = monitor.response
+    assert code == 200
+    assert [item['name'] for item in json.loads(body)['resources']] == \
+        ['Celery.backend (Redis)', 'MongoDb']
+
+
+def test_concurrent_probes_share_one_refresh(monkeypatch):
+    calls = []
+    monkeypatch.setattr(health_manager, 'CHECKS',
+                        (lambda: calls.append(1) or [ResourceModel(name='MongoDb', status=True)],))
+    monitor = HealthMonitor(interval=60)
+
+    async def scenario():
+        return await asyncio.gather(*[monitor.refresh() for _ in range(10)])
+
+    statuses = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert all(status.status is True for status in statuses)
+
+
+def test_failed_resource_gives_500(monkeypatch):
+    monkeypatch.setattr(health_manager, 'CHECKS',
+                        _checks(('Celery.backend (Redis)', True), ('MongoDb', False)))
+    monitor = HealthMonitor(interval=60)
+    asyncio.run(monitor.refresh())
+
+    assert monitor.response[0] == 500
+    assert monitor.status.status is False
+
+
+def test_background_task_refreshes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(health_manager, 'CHECKS',
+                        (lambda: calls.append(1) or [ResourceModel(name='MongoDb', status=True)],))
+    monitor = HealthMonitor(interval=0.01)
+
+    async def scenario():
+        await monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert len(calls) > 1
+    assert monitor.status.status is True
@@ -0,0 +1,137 @@
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from src.tools import idempotency, keyset
+
+
+@pytest.fixture
+def redis():
+    fake = fakeredis.FakeRedis()
+    with patch.object(idempotency, 'get_redis', return_value=fake):
+        yield fake
+
+
+@pytest.fixture
+def collection():
+    docs = {}
+    coll = MagicMock()
+    coll.find_one.side_effect = lambda query: docs.get(query['_id'])
+    coll.insert_one.side_effect = lambda doc: docs.setdefault(doc['_id'], doc)
+    with patch.object(idempotency, '_collection', return_value=coll):
+        yield coll
+
+
+def _task(task_id='task-1'):
+    task = MagicMock()
+    task.name = 'tasks.create_order'
+    task.request.id = task_id
+    return task
+
+
+def test_enqueue_without_key_uses_delay(redis):
+    task = _task()
+    idempotency.enqueue(task, {'a': 1})
+
+    task.delay.assert_called_once_with({'a': 1})
+    assert redis.keys() == []
+
+
+def test_enqueue_replay_short_circuits_broker(redis):
+    task = _task()
+    idempotency.enqueue(task, {'a': 1}, key='abc')
+    assert task.apply_async.call_count == 1
+
+    with patch.object(idempotency, 'AsyncResult') as result:
+        result.return_value.state = 'PENDING'
+        replay = idempotency.enqueue(task, {'a': 1}, key='abc')
+
+    assert task.apply_async.call_count == 1
+    assert replay is result.return_value
+
+
+def test_enqueue_replay_after_failure_resubmits(redis):
+    task = _task()
+    idempotency.enqueue(task, {'a': 1}, key='abc')
+
+    with patch.object(idempotency, 'AsyncResult') as result:
+        result.return_value.state = 'FAILURE'
+        idempotency.enqueue(task, {'a': 1}, key='abc')
+
+    assert task.apply_async.call_count == 2
+
+
+def test_enqueue_key_reused_with_another_payload_is_refused(redis):
+    task = _task()
+    idempotency.enqueue(task, {'a': 1}, key='abc')
+
+    with pytest.raises(HTTPException) as refused:
+        idempotency.enqueue(task, {'a': 2}, key='abc')
+
+    assert refused.value.status_code == 422
+    assert task.apply_async.call_count == 1
+
+
+def test_enqueue_keys_are_kept_per_principal(redis):
+    task = _task()
+
+    for name in ('erp', 'crm'):
+        token = keyset.set_principal(keyset.Principal(name))
+
+        try:
+            idempotency.enqueue(task, {'a': 1}, key='abc')
+        finally:
+            keyset.reset_principal(token)
+
+    assert task.apply_async.call_count == 2
+    assert [call.kwargs['kwargs']['idempotency_owner']
+            for call in task.apply_async.call_args_list] == ['erp', 'crm']
+
+
+def test_concurrent_replays_of_a_failed_task_publish_once(redis):
+    task = _task()
+    idempotency.enqueue(task, {'a': 1}, key='abc')
+    states = iter(['FAILURE', 'FAILURE', 'PENDING'])
+    concurrent = []
+
+    def state():
+        # The first replay is overtaken by another one between its read and its swap.
+        if not concurrent:
+            concurrent.append(True)
+            idempotency.enqueue(task, {'a': 1}, key='abc')
+
+        return next(states)
+
+    with patch.object(idempotency, 'AsyncResult') as result:
+        type(result.return_value).state = PropertyMock(side_effect=state)
+        idempotency.enqueue(task, {'a': 1}, key='abc')
+
+    # The original and the replay winning the swap.
+    assert task.apply_async.call_count == 2
+
+
+def test_idempotent_task_returns_stored_result(redis, collection):
+    calls = []
+
+    @idempotency.idempotent
+    def create(task, payload):
+        calls.append(payload)
+        return 'new-id'
+
+    assert create(_task(), {'a': 1}, idempotency_key='abc') == 'new-id'
+    assert create(_task('task-2'), {'a': 1}, idempotency_key='abc') == 'new-id'
+    assert calls == [{'a': 1}]
+
+
+def test_idempotent_task_rejects_concurrent_duplicate(redis, collection):
+
+    @idempotency.idempotent
+    def create(task, payload):
+        return 'new-id'
+
+    redis.set('idempotency:-:tasks.create_order:abc:claim', 'other-task')
+
+    with pytest.raises(idempotency.DuplicateInProgressError):
+        create(_task(), {'a': 1}, idempotency_key='abc')
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+API_BUDGET = 1.5
+""" Seconds the API may spend importing src.main. """
+
+WORKER_BUDGET = 2.5
+""" Seconds the worker may spend importing its application and task modules. """
+
+GUARD = """
+import socket
+
+def connect(*_, **__):
+    raise AssertionError('network connection opened at import')
+
+socket.socket.connect = socket.create_connection = connect
+"""
+""" Make any connection attempt during the imports fail. """
+
+
+def import_time(statement: str):
+    """ Run statement under ``python -X importtime``: total import seconds and stdout. """
+    done = subprocess.run([sys.executable, '-X', 'importtime', '-c', GUARD + statement],
+                          cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr[-2000:]
+
+    total = 0
+    for line in done.stderr.splitlines():
+        if line.startswith('import time:') and not line.startswith('import time: self'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+
+            # Top level imports only, their cumulative time includes the nested ones.
+            if not name.startswith('  '):
+                total += int(cumulative)
+
+    return total / 1e6, done.stdout
+
+
+def test_api_import_skips_worker_code():
+    seconds, modules = import_time(
+        'import sys, src.main\n'
+        'from src.api import database\n'
+        'from src.tools import redis_client\n'
+        'assert database._CLIENT is None and redis_client._CLIENT is None\n'
+        'print(sorted(m for m in sys.modules if m.startswith("src.worker") '
+        'or m in ("httpx", "aio_pika")))\n')
+
+    assert modules.strip() == '[]'
+    assert seconds < API_BUDGET
+
+
+def test_worker_import_creates_no_clients():
+    seconds, _ = import_time(
+        'from src.worker.celery_app import WORKER\n'
+        'WORKER.loader.import_default_modules()\n'
+        'from src.api import database\n'
+        'from src.tools import redis_client\n'
+        'assert "tasks.create_order" in WORKER.tasks\n'
+        'assert database._CLIENT is None and redis_client._CLIENT is None\n')
+
+    assert seconds < WORKER_BUDGET
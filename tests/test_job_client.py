@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+
+import httpx
+import pytest
+from fastapi import FastAPI, Header
+
+from src.client.job_client import JobClient, JobError, JobTimeout, SyncJobClient
+from src.tools.rabbit_client import RabbitClient
+
+
+class Connection:
+    async def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_broker(monkeypatch):
+    async def start_subscription(self):
+        return Connection()
+
+    monkeypatch.setattr(RabbitClient, 'start_subscription', start_subscription)
+
+
+def make_app(deliver):
+    """ API stand-in: answers a task id and publishes the result (deliver). """
+    app, ids = FastAPI(), itertools.count()
+
+    @app.post('/v1/orders', status_code=202)
+    async def create(payload: dict):
+        job_id = f'job-{next(ids)}'
+        await deliver(job_id, payload)
+        return {'status': 'PENDING', 'id': job_id}
+
+    return app
+
+
+def test_thousands_of_jobs_resolve_by_id():
+    async def scenario():
+        client = None
+
+        async def deliver(job_id, payload):
+            status = 'FAILURE' if payload['n'] % 100 == 0 else 'SUCCESS'
+            message = {'job_id': job_id, 'status': status, 'result': payload['n']}
+
+            # Half of the results beat the HTTP answer.
+            if payload['n'] % 2:
+                await client._on_response(message)
+            else:
+                asyncio.get_running_loop().call_later(
+                    0.01, asyncio.ensure_future, client._on_response(message))
+
+        client = JobClient('http://api', 'secret', 'amqp://', max_connections=50,
+                           transport=httpx.ASGITransport(app=make_app(deliver)))
+
+        async with client:
+            results = await asyncio.gather(
+                *(client.call('POST', '/v1/orders', json={'n': n}) for n in range(2000)),
+                return_exceptions=True)
+            assert client.in_flight == 0
+
+        return results
+
+    results = asyncio.run(scenario())
+
+    failures = [result for result in results if isinstance(result, JobError)]
+    assert len(failures) == 20 and failures[0].status == 'FAILURE'
+    assert [result for result in results if not isinstance(result, JobError)] == \
+        [n for n in range(2000) if n % 100]
+
+
+def test_timeout_forgets_the_job():
+    async def deliver(job_id, payload):
+        pass
+
+    async def scenario():
+        async with JobClient('http://api', 'secret', 'amqp://', timeout=0.05,
+                             transport=httpx.ASGITransport(app=make_app(deliver))) as client:
+            job_id = await client.submit('POST', '/v1/orders', json={'n': 1})
+
+            with pytest.raises(JobTimeout):
+                await client.wait(job_id)
+
+            with pytest.raises(KeyError):
+                await client.wait(job_id)
+
+    asyncio.run(scenario())
+
+
+def test_sync_client():
+    holder = {}
+
+    async def deliver(job_id, payload):
+        await holder['client']._on_response(
+            {'job_id': job_id, 'status': 'SUCCESS', 'result': {'echo': payload}})
+
+    with SyncJobClient('http://api', 'secret', 'amqp://',
+                       transport=httpx.ASGITransport(app=make_app(deliver))) as client:
+        holder['client'] = client._client
+        assert client.call('POST', '/v1/orders', json={'n': 3}) == {'echo': {'n': 3}}
+
+
+def test_requests_carry_the_client_routing_key():
+    seen = []
+
+    app = FastAPI()
+
+    @app.post('/v1/orders', status_code=202)
+    async def create(x_reply_to: str = Header(None)):
+        seen.append(x_reply_to)
+        return {'status': 'PENDING', 'id': 'job-0'}
+
+    async def scenario():
+        async with JobClient('http://api', 'secret', 'amqp://', routing_key='jobs.billing',
+                             transport=httpx.ASGITransport(app=app)) as client:
+            await client.submit('POST', '/v1/orders')
+            await client._on_response({'job_id': 'job-0', 'status': 'SUCCESS', 'result': 1})
+            return await client.wait('job-0')
+
+    assert asyncio.run(scenario()) == 1
+    assert seen == ['topic:jobs.billing']
+    assert JobClient('http://api', 'secret', 'amqp://').routing_key != \
+        JobClient('http://api', 'secret', 'amqp://').routing_key
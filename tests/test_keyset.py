@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import mongomock
+
+from src.api import utils
+from src.worker import celery_app
+from src.tools import keyset
+
+EMPLOYEE = '65a1f0c2e4b0a1b2c3d4e5f6'
+NOW = datetime(2026, 1, 1)
+
+
+def _keyset():
+    collection = mongomock.MongoClient().db.api_keys
+    return keyset.KeySet(reload_interval=3600, collection=collection), collection
+
+
+def test_config_keys_by_hash(monkeypatch):
+    monkeypatch.setattr(keyset.config, 'api_keys', {
+        'plain-key': {'name': 'erp', 'rate': 5},
+        f'sha256:{keyset.hash_key("hashed-key").upper()}': {'name': 'crm', 'employee_id': EMPLOYEE},
+    })
+    keys, _ = _keyset()
+    keys.reload()
+
+    assert keys.lookup('plain-key').name == 'erp'
+    assert keys.lookup('plain-key').rate == 5
+    assert keys.lookup('hashed-key').employee_id == EMPLOYEE
+    assert keys.lookup(keyset.config.service_api_key).scopes == ('*',)
+    assert keys.lookup('nope') is None and keys.lookup(None) is None
+
+
+def test_collection_changes_are_reloaded():
+    keys, collection = _keyset()
+    collection.insert_one({'_id': keyset.hash_key('shop-key'), 'name': 'shop',
+                           'customer_id': EMPLOYEE, 'scopes': ['orders'], 'updated': NOW})
+    keys.reload()
+
+    assert keys.lookup('shop-key').customer_id == EMPLOYEE
+    assert keys.lookup('shop-key').scopes == ('orders',)
+
+    # Revoked keys stop authenticating once the version changed.
+    collection.update_one({'_id': keyset.hash_key('shop-key')},
+                          {'$set': {'active': False, 'updated': NOW + timedelta(seconds=1)}})
+    keys.reload()
+
+    assert keys.lookup('shop-key') is None
+
+
+def test_revocation_without_updated_is_reloaded():
+    keys, collection = _keyset()
+    collection.insert_one({'_id': keyset.hash_key('shop-key'), 'name': 'shop', 'updated': NOW})
+    keys.reload()
+    assert keys.lookup('shop-key').scopes == (keyset.ALL_SCOPES,)
+
+    collection.update_one({'_id': keyset.hash_key('shop-key')}, {'$set': {'active': False}})
+    keys.reload()
+
+    assert keys.lookup('shop-key') is None
+
+
+def test_failed_reload_keeps_the_keys():
+    class Down:
+        def find_one(self, *_, **__):
+            raise ConnectionError('mongo down')
+
+    keys = keyset.KeySet(collection=Down())
+    keys.reload()
+
+    assert keys.lookup(keyset.config.service_api_key).name == keyset.SERVICE_NAME
+
+
+def test_principal_travels_in_the_task_headers():
+    principal = keyset.Principal('crm', 10, 20, employee_id=EMPLOYEE, scopes=['orders'])
+    token = keyset.set_principal(principal)
+    headers = {}
+
+    try:
+        celery_app.stamp_enqueued_at(headers=headers)
+    finally:
+        keyset.reset_principal(token)
+
+    assert keyset.current_principal() is None
+
+    restored = keyset.extract(headers[keyset.HEADER])
+    assert (restored.name, restored.employee_id, restored.scopes) == ('crm', EMPLOYEE, ('orders',))
+    # The quota stays with the API.
+    assert restored.rate == 0
+
+
+def test_principal_actor_skips_the_lookup(monkeypatch):
+    lookups = []
+
+    class Repository:
+        def check_exists(self, user_id):
+            lookups.append(user_id)
+            return False
+
+    monkeypatch.setattr(utils, 'EmployeesRepository', Repository)
+    token = keyset.set_principal(keyset.Principal('crm', employee_id=EMPLOYEE))
+
+    try:
+        utils.validate_user_is_employee(EMPLOYEE)
+        assert not utils.is_employee('someone-else')
+    finally:
+        keyset.reset_principal(token)
+
+    assert lookups == ['someone-else']
@@ -0,0 +1,82 @@
+import threading
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.tools.metrics import (Counter, Histogram, MetricsMiddleware, REGISTRY,
+                               generate_latest, instrument_repository)
+
+
+def _unregister(*metrics):
+    for metric in metrics:
+        REGISTRY.remove(metric)
+
+
+def test_counter_sums_thread_slots():
+    counter = Counter('test_events_total', 'Test events.', ('kind',))
+
+    try:
+        def work():
+            for _ in range(1000):
+                counter.labels('a').inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+
+        assert counter.labels('a').value() == 4000
+        assert 'test_events_total{kind="a"} 4000' in generate_latest().decode()
+
+    finally:
+        _unregister(counter)
+
+
+def test_histogram_exposition():
+    histogram = Histogram('test_seconds', 'Test latency.', buckets=(0.1, 1.0))
+
+    try:
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        text = histogram.expose()
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert 'test_seconds_count 3' in text
+        assert 'test_seconds_sum 5.55' in text
+
+    finally:
+        _unregister(histogram)
+
+
+def test_instrument_repository_times_public_methods():
+    @instrument_repository
+    class TimedRepository:
+        def read(self, obj_id):
+            return obj_id
+
+        @staticmethod
+        def count():
+            return 3
+
+    assert TimedRepository().read('x') == 'x'
+    assert TimedRepository.count() == 3
+    text = generate_latest().decode()
+    assert 'mongo_operation_duration_seconds_count{repository="TimedRepository",method="read"} 1' in text
+    assert 'mongo_operation_duration_seconds_count{repository="TimedRepository",method="count"} 1' in text
+
+
+def test_middleware_labels_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get('/items/{item_id}')
+    async def read_item(item_id: str):
+        return {'id': item_id}
+
+    with TestClient(app) as client:
+        client.get('/items/1')
+        client.get('/items/2')
+
+    assert ('http_request_duration_seconds_count{method="GET",route="/items/{item_id}",'
+            'status="200"} 2') in generate_latest().decode()
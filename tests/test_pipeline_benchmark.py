@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('mongomock')
+pytest.importorskip('fakeredis')
+
+from src.api import database
+from src.tools import redis_client
+from src.tools.response_transport import set_transport
+from src.worker.celery_app import WORKER
+from benchmarks.pipeline import report
+from benchmarks.pipeline.flows import PipelineClient, api_client, run_flows, seed
+from benchmarks.pipeline.standins import OperationCounter, install
+
+
+@pytest.fixture
+def eager_pipeline():
+    counter = OperationCounter()
+    recorder = install('eager', 'memory', counter)
+    yield counter, recorder
+
+    WORKER.conf.update(task_always_eager=False)
+    set_transport(None)
+    database.reset_client()
+    redis_client._CLIENT = None
+
+
+def test_order_flows_complete_in_eager_mode(eager_pipeline):
+    counter, recorder = eager_pipeline
+    from src.main import app
+
+    async def scenario():
+        async with api_client(app) as client:
+            api = PipelineClient(client, recorder)
+            people = await seed(api, customers=2, employees=2)
+            return api, await run_flows(api, people, flows=3, concurrency=2)
+
+    api, outcome = asyncio.run(scenario())
+    result = report.build({'mode': 'eager'}, outcome, api.latencies, counter.snapshot())
+
+    assert outcome['errors'] == []
+    assert result['flows'] == 3
+    assert set(result['step_ms']) == set(api.latencies)
+    assert result['db_operations_per_flow'] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {'flows_per_second': 100.0, 'flow_ms': {'p95': 10.0},
+                'step_ms': {'create_order': {'p95': 2.0}},
+                'db_operations_per_flow': 40.0, 'errors': 0}
+    current = dict(baseline, flows_per_second=70.0,
+                   step_ms={'create_order': {'p95': 2.1}}, db_operations_per_flow=41.0)
+
+    regressions = report.compare(current, baseline, tolerance=0.2)
+
+    assert len(regressions) == 2
+    assert report.compare(baseline, baseline, tolerance=0.2) == []
@@ -0,0 +1,77 @@
+from src.api.orders.services import Services
+from src.api.pricing.models import PriceTableModel
+from src.api.pricing.pricing_engine import PricingEngine
+
+CUSTOMER = '65a1f0c2e4b0a1b2c3d4e5f6'
+
+
+class FakePricingRepository:
+    def __init__(self, table=None):
+        self.table = table
+        self.reads = 0
+
+    def current_version(self):
+        return self.table.version if self.table else None
+
+    def read_current(self):
+        self.reads += 1
+        return self.table
+
+
+def _table(version, **kwargs):
+    prices = {Services.web_site: 1000, Services.mobile_app: 2000}
+    return PriceTableModel(version=version, prices=prices, **kwargs)
+
+
+def test_default_prices_without_published_table():
+    engine = PricingEngine(FakePricingRepository(), reload_interval=0)
+
+    assert engine.version == 0
+    assert engine.price(Services.web_site) == 5000
+    assert engine.price(Services.desktop_app) == 10000
+
+
+def test_overrides_and_rules():
+    table = _table(1,
+                   overrides=[{'customer_id': CUSTOMER, 'service': Services.web_site, 'price': 900}],
+                   rules=[{'percent': -10, 'service': Services.mobile_app},
+                          {'percent': 50, 'customer_id': CUSTOMER}])
+    engine = PricingEngine(FakePricingRepository(table), reload_interval=0)
+
+    assert engine.price(Services.web_site) == 1000
+    assert engine.price(Services.mobile_app) == 1800
+    assert engine.price(Services.web_site, CUSTOMER) == 900
+    assert engine.price(Services.mobile_app, CUSTOMER) == 2700
+    # Unknown services use the fallback price.
+    assert engine.price(Services.desktop_app) == 10000
+
+
+def test_hot_reload_on_new_version_only():
+    repo = FakePricingRepository(_table(1))
+    engine = PricingEngine(repo, reload_interval=0)
+
+    assert engine.price(Services.web_site) == 1000
+    assert engine.price(Services.web_site) == 1000
+    assert repo.reads == 1
+
+    repo.table = PriceTableModel(version=2, prices={Services.web_site: 1500})
+    assert engine.price(Services.web_site) == 1500
+    assert engine.version == 2
+    assert repo.reads == 2
+
+
+def test_price_many_matches_single_prices():
+    table = _table(1, rules=[{'percent': 5, 'customer_id': CUSTOMER}])
+    engine = PricingEngine(FakePricingRepository(table), reload_interval=3600)
+    items = [(Services.web_site, None), (Services.mobile_app, CUSTOMER),
+             ('Make a web site', CUSTOMER)]
+
+    assert engine.price_many(items) == [engine.price(*item) for item in items]
+    assert engine.price_many(items) == [1000, 2100, 1050]
+
+
+def test_quote_reports_the_version_it_priced_with():
+    engine = PricingEngine(FakePricingRepository(_table(3)), reload_interval=3600)
+
+    # The first quote loads table v3: its version is reported, not the default one.
+    assert engine.quote([(Services.web_site, None)]) == (3, [1000])
@@ -0,0 +1,100 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'streamlit-dashboard'))
+
+from query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_watermark_and_bucket_invalidate():
+    clock, mark, calls = Clock(), {'value': 1}, []
+    cache = QueryCache(watermark=lambda: mark['value'], watermark_ttl=0,
+                       bucket_seconds=60, max_stale=0, clock=clock)
+
+    @cache.cached
+    def query(n):
+        calls.append(n)
+        return {'n': n, 'calls': len(calls)}
+
+    assert query(1) == query(1) == {'n': 1, 'calls': 1}
+    assert query(2)['calls'] == 2
+
+    mark['value'] = 2
+    assert query(1)['calls'] == 3
+
+    clock.now = 61
+    assert query(1)['calls'] == 4
+    assert cache.stats['hits'] == 1
+
+
+def test_concurrent_calls_share_one_computation():
+    release, calls = threading.Event(), []
+    cache = QueryCache()
+
+    @cache.cached
+    def query():
+        calls.append(1)
+        release.wait(5)
+        return [1, 2, 3]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(query())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [[1, 2, 3]] * 8
+
+
+def test_outdated_result_served_while_refreshing():
+    clock, mark, refreshed = Clock(), {'value': 1}, threading.Event()
+    cache = QueryCache(watermark=lambda: mark['value'], watermark_ttl=0, clock=clock)
+
+    @cache.cached
+    def query():
+        if mark['value'] == 2:
+            refreshed.set()
+        return mark['value']
+
+    assert query() == 1
+
+    mark['value'] = 2
+    assert query() == 1
+    assert refreshed.wait(5)
+    cache._refresher.shutdown(wait=True)
+    assert query() == 2
+
+
+def test_concurrent_sessions_read_the_watermark_once():
+    reads, release = [], threading.Event()
+
+    def watermark():
+        reads.append(1)
+        release.wait(5)
+        return 'v1'
+
+    cache = QueryCache(watermark=watermark, watermark_ttl=2, clock=lambda: 10.0)
+    threads = [threading.Thread(target=cache.version) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    release.set()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(reads) == 1
+    assert cache.version() == ('v1', 0)
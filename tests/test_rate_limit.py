@@ -0,0 +1,185 @@
+import fakeredis
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import mongomock
+
+from src.tools import keyset, rate_limit, security
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """ Count the token bucket script calls (one per Redis round trip). """
+
+    calls = 0
+
+    def evalsha(self, *args, **kwargs):
+        CountingRedis.calls += 1
+        return super().evalsha(*args, **kwargs)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    monkeypatch.setattr(rate_limit.config, 'rate_limit_lease', 0.5)
+    CountingRedis.calls = 0
+    return CountingRedis()
+
+
+def test_leases_absorb_most_checks(redis):
+    limiter = rate_limit.RateLimiter(redis, Clock())
+
+    # 40 tokens per second, leased 20 at a time, burst of 100.
+    granted = [limiter.acquire('erp', 40, 100) == 0 for _ in range(100)]
+
+    assert all(granted)
+    # Five leases, the first EVALSHA also loads the script.
+    assert CountingRedis.calls == 6
+
+
+def test_bucket_is_shared_and_refusals_are_cached(redis):
+    clock = Clock()
+    first, second = (rate_limit.RateLimiter(redis, clock) for _ in range(2))
+
+    # Both processes draw on the same 10 token burst.
+    results = [limiter.acquire('noisy', 1, 10) for _ in range(6)
+               for limiter in (first, second)]
+
+    assert results.count(0.0) == 10
+    assert 0 < results[-1] <= 1.0
+
+    calls = CountingRedis.calls
+    assert first.acquire('noisy', 1, 10) > 0
+    assert CountingRedis.calls == calls
+
+    # Other keys are not affected.
+    assert first.acquire('quiet', 1, 10) == 0
+
+
+def test_redis_down_does_not_block(monkeypatch):
+    class Down:
+        def register_script(self, script):
+            def call(**_):
+                raise ConnectionError('redis down')
+
+            return call
+
+    assert rate_limit.RateLimiter(Down()).acquire('erp', 1, 1) == 0
+
+
+def test_redis_down_is_not_called_again_before_the_check_interval(monkeypatch):
+    monkeypatch.setattr(rate_limit.config, 'health_check_interval', 10)
+    calls = []
+
+    class Down:
+        def register_script(self, script):
+            def call(**_):
+                calls.append(1)
+                raise ConnectionError('redis down')
+
+            return call
+
+    clock = Clock()
+    limiter = rate_limit.RateLimiter(Down(), clock)
+
+    assert [limiter.acquire(name, 1, 1) for name in ('erp', 'crm', 'erp')] == [0, 0, 0]
+    assert len(calls) == 1
+
+    clock.now += 10
+    assert limiter.acquire('erp', 1, 1) == 0
+    assert len(calls) == 2
+
+
+def test_keys_have_their_own_quota(redis, monkeypatch):
+    monkeypatch.setattr(keyset.config, 'api_keys',
+                        {'erp-key': {'name': 'erp', 'rate': 1, 'burst': 2}})
+    keyset.set_keyset(keyset.KeySet(collection=mongomock.MongoClient().db.api_keys))
+    rate_limit.set_limiter(rate_limit.RateLimiter(redis))
+    app = FastAPI()
+
+    @app.get('/orders')
+    def list_orders(client: keyset.Principal = Depends(security.validate_authentication)):
+        return client.name
+
+    try:
+        client = TestClient(app)
+        erp = [client.get('/orders', headers={'X-API-Key': 'erp-key'}) for _ in range(3)]
+        service = [client.get('/orders', headers={'X-API-Key': keyset.config.service_api_key})
+                   for _ in range(5)]
+        unknown = client.get('/orders', headers={'X-API-Key': 'nope'})
+    finally:
+        rate_limit.set_limiter(None)
+        keyset.set_keyset(None)
+
+    assert [response.status_code for response in erp] == [200, 200, 429]
+    assert erp[0].json() == 'erp' and erp[2].headers['Retry-After'] == '1'
+    assert {response.status_code for response in service} == {200}
+    assert unknown.status_code == 401
+
+
+def test_keys_only_call_their_scopes(monkeypatch):
+    monkeypatch.setattr(keyset.config, 'api_keys',
+                        {'shop-key': {'name': 'shop', 'rate': 0, 'scopes': ['orders']}})
+    keyset.set_keyset(keyset.KeySet(collection=mongomock.MongoClient().db.api_keys))
+    app = FastAPI()
+
+    @app.get('/v1/orders')
+    def list_orders(client: keyset.Principal = Depends(security.validate_authentication)):
+        return client.name
+
+    @app.get('/v1/employees')
+    def list_employees(client: keyset.Principal = Depends(security.validate_authentication)):
+        return client.name
+
+    try:
+        client = TestClient(app)
+        orders = client.get('/v1/orders', headers={'X-API-Key': 'shop-key'})
+        employees = client.get('/v1/employees', headers={'X-API-Key': 'shop-key'})
+        service = client.get('/v1/employees',
+                             headers={'X-API-Key': keyset.config.service_api_key})
+    finally:
+        keyset.set_keyset(None)
+
+    assert orders.json() == 'shop'
+    assert employees.status_code == 403 and 'employees' in employees.json()['detail']
+    assert service.status_code == 200
+
+
+def test_scoped_keys_poll_their_own_tasks(monkeypatch):
+    from src.api import process_routes
+    from src.tools import task_queue
+
+    monkeypatch.setattr(keyset.config, 'api_keys',
+                        {'shop-key': {'name': 'shop', 'rate': 0, 'scopes': ['orders']}})
+    monkeypatch.setattr(task_queue, 'get_redis', lambda fake=fakeredis.FakeRedis(): fake)
+    # The backend is per thread, the route runs in the threadpool.
+    monkeypatch.setattr(type(process_routes.WORKER.backend), 'get_task_meta',
+                        lambda backend, task_id: {'status': 'SUCCESS', 'result': task_id})
+    monkeypatch.setattr(process_routes, 'AsyncResult',
+                        lambda task_id: type('Result', (), {'ready': lambda self: True})())
+    keyset.set_keyset(keyset.KeySet(collection=mongomock.MongoClient().db.api_keys))
+    own, other = '5d2c1a9e-3c4b-4f6a-9e8d-1b2c3d4e5f60', '0f1e2d3c-4b5a-4697-8a7b-6c5d4e3f2a10'
+    task_queue.record_owner(own, 'shop')
+    task_queue.record_owner(other, 'erp')
+    app = FastAPI()
+    app.include_router(process_routes.ROUTER)
+
+    try:
+        client = TestClient(app)
+        mine = client.get(f'/v1/process/status/{own}', headers={'X-API-Key': 'shop-key'})
+        theirs = client.get(f'/v1/process/status/{other}', headers={'X-API-Key': 'shop-key'})
+        service = client.get(f'/v1/process/status/{other}',
+                             headers={'X-API-Key': keyset.config.service_api_key})
+    finally:
+        keyset.set_keyset(None)
+
+    assert mine.json() == {'status': 'SUCCESS', 'result': own}
+    assert theirs.status_code == 404
+    assert service.json()['result'] == other
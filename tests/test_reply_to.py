@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import httpx
+import mongomock
+import pytest
+from celery import Celery
+from fastapi import Depends, FastAPI
+from kombu import Connection, Exchange, Queue
+
+from src.tools import reply_to, keyset, security
+from src.tools.response_transport import KombuTransport, set_transport
+from src.worker import celery_app
+
+
+def test_parse_reply_routes():
+    assert reply_to.parse(None) == (reply_to.QUEUE, reply_to.DEFAULT_QUEUE)
+    assert reply_to.parse('queue:billing') == (reply_to.QUEUE, 'billing')
+    assert reply_to.parse('topic:jobs.abc') == (reply_to.TOPIC, 'jobs.abc')
+    assert reply_to.parse('https://caller/hook') == (reply_to.URL, 'https://caller/hook')
+
+    for invalid in ('billing', 'topic:jobs.#', 'queue:', 'queue:celery', 'ftp://caller',
+                    'http://169.254.169.254/latest/meta-data', 'http://127.0.0.1:8001/hook',
+                    'https://10.0.0.7/hook', 'http://[::1]/hook', 'http://localhost/hook'):
+        with pytest.raises(ValueError):
+            reply_to.parse(invalid)
+
+
+def test_only_registered_routes_are_authorized(monkeypatch):
+    monkeypatch.setattr(reply_to.config, 'reply_queues', ['billing'])
+    monkeypatch.setattr(reply_to.config, 'reply_hosts', ['hooks.example.com'])
+    erp = keyset.Principal('erp', reply_queues=['erp'], reply_hosts=['ERP.example.com'])
+
+    for route in (None, 'topic:jobs.a', 'queue:billing', 'https://hooks.example.com/a'):
+        assert reply_to.authorize(route) == reply_to.parse(route)
+
+    assert reply_to.authorize('queue:erp', erp) == (reply_to.QUEUE, 'erp')
+    assert reply_to.authorize('https://erp.example.com/hook', erp)[0] == reply_to.URL
+
+    # Another integration's queue and unregistered hosts are refused.
+    for route in ('queue:erp', 'https://erp.example.com/hook', 'https://internal.corp/hook'):
+        with pytest.raises(ValueError):
+            reply_to.authorize(route, keyset.Principal('crm'))
+
+
+def test_middleware_keeps_the_route_of_the_request():
+    app = FastAPI()
+
+    @app.get('/route')
+    async def route():
+        return {'route': reply_to.current()}
+
+    app.add_middleware(reply_to.ReplyToMiddleware)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                     base_url='http://test') as client:
+            return [await client.get('/route', headers=headers) for headers in
+                    ({'X-Reply-To': 'topic:jobs.a'}, {}, {'X-Reply-To': 'queue:celery'})]
+
+    routed, default, refused = asyncio.run(scenario())
+
+    assert routed.json() == {'route': 'topic:jobs.a'}
+    assert default.json() == {'route': None}
+    assert refused.status_code == 400 and 'celery' in refused.json()['detail']
+
+
+def test_authentication_refuses_unregistered_routes(monkeypatch):
+    monkeypatch.setattr(keyset.config, 'api_keys',
+                        {'erp-key': {'name': 'erp', 'rate': 0, 'reply_queues': ['erp']},
+                         'crm-key': {'name': 'crm', 'rate': 0}})
+    keyset.set_keyset(keyset.KeySet(collection=mongomock.MongoClient().db.api_keys))
+    app = FastAPI()
+
+    @app.get('/route', dependencies=[Depends(security.validate_authentication)])
+    async def route():
+        return {'route': reply_to.current()}
+
+    app.add_middleware(reply_to.ReplyToMiddleware)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                     base_url='http://test') as client:
+            return [await client.get('/route', headers={'X-API-Key': key, 'X-Reply-To': route})
+                    for key, route in (('erp-key', 'queue:erp'), ('crm-key', 'queue:erp'),
+                                       ('crm-key', 'https://erp.example.com/hook'))]
+
+    try:
+        allowed, queue, webhook = asyncio.run(scenario())
+    finally:
+        keyset.set_keyset(None)
+
+    assert allowed.json() == {'route': 'queue:erp'}
+    assert queue.status_code == webhook.status_code == 403
+
+
+def test_kombu_transport_publishes_on_topic_exchange():
+    app = Celery(broker='memory://')
+    exchange = Exchange(reply_to.RESPONSE_EXCHANGE, 'topic', durable=True)
+
+    with Connection('memory://') as connection:
+        mine = Queue('mine', exchange, routing_key='jobs.a')
+        other = Queue('other', exchange, routing_key='jobs.b')
+        mine(connection).declare()
+        other(connection).declare()
+
+        KombuTransport(app).publish('jobs.a', {'job_id': 'abc'})
+
+        message = mine(connection).get()
+        assert json.loads(message.body) == {'job_id': 'abc'}
+        assert other(connection).get() is None
+
+
+@celery_app.WORKER.task(name='tests.routed', after_return=celery_app.response_handler,
+                        bind=True)
+def routed_task(task, payload):
+    return 'done'
+
+
+@pytest.mark.parametrize('headers, payload, expected', [
+    ({reply_to.HEADER: 'topic:jobs.a'}, {}, ('publish', 'jobs.a')),
+    ({reply_to.HEADER: 'queue:billing'}, {'responseQueue': 'ignored'}, ('send', 'billing')),
+    ({keyset.HEADER: {'name': 'erp', 'reply_queues': ['legacy']}},
+     {'responseQueue': 'legacy'}, ('send', 'legacy')),
+    ({}, {'responseQueue': 'legacy'}, ('send', reply_to.DEFAULT_QUEUE)),
+    ({}, {'responseUrl': 'http://169.254.169.254/latest'}, ('send', reply_to.DEFAULT_QUEUE)),
+    ({}, {}, ('send', reply_to.DEFAULT_QUEUE)),
+    ({reply_to.HEADER: 'topic:jobs.*'}, {}, ('send', reply_to.DEFAULT_QUEUE)),
+])
+def test_response_follows_the_reply_route(headers, payload, expected, monkeypatch):
+    monkeypatch.setattr(reply_to.config, 'reply_queues', ['billing'])
+    sent = []
+
+    class Recorder:
+        def send(self, queue, message):
+            sent.append(('send', queue))
+
+        def publish(self, routing_key, message):
+            sent.append(('publish', routing_key))
+
+    set_transport(Recorder())
+
+    try:
+        routed_task.apply(args=(payload,), headers=headers)
+    finally:
+        set_transport(None)
+
+    assert sent == [expected]
+
+
+def test_publish_stamps_the_route_of_the_request():
+    headers = {}
+    token = reply_to._CURRENT.set('topic:jobs.a')
+
+    try:
+        celery_app.stamp_enqueued_at(headers)
+    finally:
+        reply_to._CURRENT.reset(token)
+
+    assert headers[reply_to.HEADER] == 'topic:jobs.a'
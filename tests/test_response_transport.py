@@ -0,0 +1,43 @@
+import json
+
+from celery import Celery
+from kombu import Connection
+
+from src.worker import celery_app
+from src.tools.response_transport import KombuTransport, set_transport
+
+
+def test_kombu_transport_publishes_on_queue():
+    app = Celery(broker='memory://')
+    KombuTransport(app).send('CallerService', {'job_id': 'abc', 'status': 'SUCCESS'})
+
+    with Connection('memory://') as connection:
+        queue = connection.SimpleQueue('CallerService')
+        message = queue.get(timeout=1)
+        message.ack()
+        queue.close()
+
+    assert json.loads(message.body) == {'job_id': 'abc', 'status': 'SUCCESS'}
+
+
+def test_send_response_uses_configured_transport():
+    sent = []
+
+    class Recorder:
+        def send(self, queue, message):
+            sent.append((queue, message))
+
+    set_transport(Recorder())
+
+    try:
+        celery_app.send_response('CallerService', {'job_id': 'abc'})
+    finally:
+        set_transport(None)
+
+    assert sent == [('CallerService', {'job_id': 'abc'})]
+
+
+def test_green_pool_mongo_size_is_capped():
+    assert celery_app.mongo_pool_size('prefork', 8) == 2
+    assert celery_app.mongo_pool_size('threads', 8) == 10
+    assert celery_app.mongo_pool_size('gevent', 500) == celery_app.GREEN_POOL_MAX_SIZE
@@ -0,0 +1,64 @@
+import fakeredis
+import pytest
+
+from src.tools import task_timings
+from src.worker import celery_app
+from src.tools.response_transport import set_transport
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(task_timings, 'get_redis', lambda: client)
+    return client
+
+
+def test_percentiles_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert task_timings.percentiles(values) == {'p50': 50.0, 'p95': 95.0, 'p99': 99.0}
+    assert task_timings.percentiles([3.0]) == {'p50': 3.0, 'p95': 3.0, 'p99': 3.0}
+    assert task_timings.percentiles([]) == {}
+
+
+def test_rolling_window_summary(redis, monkeypatch):
+    monkeypatch.setattr(task_timings.config, 'timing_window', 10)
+
+    for value in range(20):
+        task_timings.record('tasks.create_order', value / 100, value / 10)
+
+    task_timings.record('tasks.read_order', None, 0.5)
+    summary = task_timings.summary()
+
+    assert summary['tasks.create_order']['count'] == 10
+    assert summary['tasks.create_order']['queue_wait']['p99'] == 0.19
+    assert summary['tasks.create_order']['execution']['p50'] == 1.4
+    assert summary['tasks.read_order'] == {'count': 1, 'queue_wait': {},
+                                           'execution': {'p50': 0.5, 'p95': 0.5, 'p99': 0.5}}
+
+
+@celery_app.WORKER.task(name='tests.timed', after_return=celery_app.response_handler, bind=True)
+def timed_task(task):
+    return 'done'
+
+
+def test_task_response_carries_timing(redis):
+    sent = []
+
+    class Recorder:
+        def send(self, queue, message):
+            sent.append(message)
+
+    set_transport(Recorder())
+
+    try:
+        timed_task.apply(headers={'enqueued_at': 1.0})
+    finally:
+        set_transport(None)
+
+    timing = sent[0]['timing']
+    assert timing['enqueued_at'] == 1.0
+    assert timing['started_at'] <= timing['finished_at']
+    assert timing['queue_wait'] > 0 and timing['execution'] >= 0
+    assert timing['retries'] == 0 and timing['host']
+    assert task_timings.summary()['tests.timed']['count'] == 1
@@ -0,0 +1,88 @@
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.tools import tracing
+from src.tools.metrics import instrument_repository
+from src.worker import celery_app
+
+INCOMING = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+
+
+class Recorder:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def _recorder(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(tracing, '_EXPORTER', recorder)
+    return recorder
+
+
+def test_nested_spans_share_trace(monkeypatch):
+    recorder = _recorder(monkeypatch)
+
+    with tracing.start_span('outer', INCOMING) as outer:
+        with tracing.start_span('inner') as inner:
+            headers = {}
+            tracing.inject(headers)
+
+    assert tracing.current_span() is None
+    assert outer.trace_id == inner.trace_id == '0af7651916cd43dd8448eb211c80319c'
+    assert outer.parent_id == 'b7ad6b7169203331'
+    assert inner.parent_id == outer.span_id
+    assert headers == {'traceparent': inner.traceparent}
+    assert [span.name for span in recorder.spans] == ['inner', 'outer']
+
+
+def test_child_only_spans_need_an_active_trace(monkeypatch):
+    recorder = _recorder(monkeypatch)
+
+    @instrument_repository
+    class TracedRepository:
+        def read(self, obj_id):
+            return obj_id
+
+    TracedRepository().read('x')
+    assert recorder.spans == []
+
+    with tracing.start_span('task'):
+        TracedRepository().read('x')
+
+    assert [span.name for span in recorder.spans] == ['TracedRepository.read', 'task']
+
+
+def test_error_marks_span(monkeypatch):
+    recorder = _recorder(monkeypatch)
+
+    try:
+        with tracing.start_span('failing'):
+            raise ValueError('boom')
+    except ValueError:
+        pass
+
+    assert recorder.spans[0].status == 'ERROR'
+
+
+def test_request_trace_reaches_task_headers(monkeypatch):
+    recorder = _recorder(monkeypatch)
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+    published = {}
+
+    @app.post('/v1/orders/{order_id}')
+    async def publish(order_id: str):
+        celery_app.stamp_enqueued_at(headers=published)
+        return {}
+
+    with TestClient(app) as client:
+        response = client.post('/v1/orders/1', headers={'traceparent': INCOMING})
+
+    span = recorder.spans[-1]
+    assert span.name == 'HTTP POST /v1/orders/{order_id}'
+    assert span.parent_id == 'b7ad6b7169203331'
+    assert published['traceparent'] == span.traceparent
+    assert response.headers['traceparent'] == span.traceparent
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Header
+
+from src.tools import traffic_capture
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'scripts'))
+
+import replay_traffic
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post('/v1/items')
+    async def create(payload: dict, x_api_key: str = Header(None)):
+        return {'name': payload['name'], 'authorized': x_api_key == 'secret'}
+
+    @app.get('/v1/items/{item_id}')
+    async def read(item_id: str):
+        return {'id': item_id}
+
+    app.add_middleware(traffic_capture.TrafficCaptureMiddleware)
+    return app
+
+
+def test_capture_then_replay(tmp_path):
+    capture = tmp_path / 'traffic.ndjson'
+    writer = traffic_capture.CaptureWriter(str(capture))
+    traffic_capture.set_writer(writer)
+    app = make_app()
+
+    async def record():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test',
+                                     headers={'X-API-Key': 'secret'}) as client:
+            await client.post('/v1/items', json={'name': 'a'})
+            await client.get('/v1/items/65e88a72295cd162063ed540', params={'full': 1})
+            await client.get('/v1/missing')
+
+    try:
+        asyncio.run(record())
+    finally:
+        writer.close()
+        traffic_capture.set_writer(None)
+
+    lines = capture.read_text().splitlines()
+    assert 'secret' not in capture.read_text()
+    first = json.loads(lines[0])
+    assert (first['status'], first['route'], json.loads(first['body'])) == \
+        (200, '/v1/items', {'name': 'a'})
+    assert json.loads(lines[1])['query'] == 'full=1'
+
+    records = replay_traffic.load(str(capture))
+    results = asyncio.run(replay_traffic.replay(
+        records, 'http://test', 'secret', None, concurrency=2, timeout=5,
+        transport=httpx.ASGITransport(app=app)))
+    comparison = replay_traffic.compare(records, results)
+
+    assert comparison['ALL']['count'] == 3
+    assert comparison['ALL']['status_match'] == 1.0
+    assert set(comparison) == {'ALL', 'POST /v1/items', 'GET /v1/items/{item_id}',
+                               'GET /v1/missing'}
+
+
+def test_writer_appends_queued_records_in_batches(tmp_path):
+    capture = tmp_path / 'traffic.ndjson'
+    writer = traffic_capture.CaptureWriter(str(capture), batch_size=2)
+
+    for index in range(5):
+        writer.write({'t': index})
+
+    writer.close()
+    writer.write({'t': 5})
+    writer.close()
+
+    assert [json.loads(line)['t'] for line in capture.read_text().splitlines()] == \
+        [0, 1, 2, 3, 4, 5]
@@ -0,0 +1,209 @@
+import hashlib
+import hmac
+import json
+import sys
+import threading
+from pathlib import Path
+
+import fakeredis
+import httpx
+import pytest
+
+from src.tools import reply_to, webhooks
+from src.worker import celery_app
+
+sys.path.insert(0, str(Path(__file__).parents[1] / 'scripts'))
+
+from webhook_stub import WebhookStub
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    monkeypatch.setattr(webhooks.config, 'webhook_backoff', 1.0)
+    monkeypatch.setattr(webhooks.config, 'webhook_max_attempts', 3)
+    dispatcher = webhooks.WebhookDispatcher(redis=fakeredis.FakeRedis(), clock=Clock())
+    yield dispatcher
+    dispatcher.close()
+
+
+def deliver(dispatcher, url, message):
+    # One due time per delivery: the retry set is in the delivery order.
+    dispatcher.clock.now += 0.001
+    dispatcher.deliver(url, message)
+
+
+def retries(dispatcher):
+    return [json.loads(member) for member in
+            dispatcher.redis.zrange(webhooks.RETRY_KEY, 0, -1)]
+
+
+def test_deliveries_are_batched_once_the_receiver_advertises_it(dispatcher):
+    with WebhookStub(batch_max=5) as stub:
+        for job in range(13):
+            deliver(dispatcher, stub.url, {'job_id': job})
+
+        assert stub.requests == []
+        assert dispatcher.drain() == 13
+        dispatcher.flush(force=True)
+
+    assert [request['size'] for request in stub.requests] == [1, 5, 5, 2]
+    assert [message['job_id'] for message in stub.messages] == list(range(13))
+
+
+def test_failed_delivery_is_retried_with_backoff(dispatcher):
+    with WebhookStub(statuses=[503, 503]) as stub:
+        dispatcher.deliver(stub.url, {'job_id': 'a'})
+        assert dispatcher.drain() == 1
+        first = retries(dispatcher)
+        assert [delivery['attempts'] for delivery in first] == [1]
+
+        # Not due yet.
+        assert dispatcher.drain() == 0
+
+        dispatcher.clock.now += 1
+        assert dispatcher.drain() == 1
+        assert [delivery['attempts'] for delivery in retries(dispatcher)] == [2]
+
+        dispatcher.clock.now += 2
+        assert dispatcher.drain() == 1
+
+    assert retries(dispatcher) == []
+    assert stub.messages == [{'job_id': 'a'}]
+    assert [request['status'] for request in stub.requests] == [503, 503, 202]
+
+
+def test_undeliverable_responses_end_in_the_dead_letters(dispatcher):
+    with WebhookStub(statuses=[400, 503, 503, 503]) as stub:
+        deliver(dispatcher, stub.url, {'job_id': 'refused'})
+        deliver(dispatcher, stub.url, {'job_id': 'failing'})
+        dispatcher.drain()
+
+        for _ in range(2):
+            dispatcher.clock.now += 10
+            dispatcher.drain()
+
+    dead = [json.loads(item) for item in dispatcher.redis.lrange(webhooks.DEAD_KEY, 0, -1)]
+    assert [(item['message']['job_id'], item['attempts']) for item in dead] == \
+        [('failing', 3), ('refused', 0)]
+    assert retries(dispatcher) == []
+
+
+def test_open_circuit_defers_without_attempts(dispatcher):
+    clock = Clock()
+    dispatcher.breaker = webhooks.CircuitBreaker(2, 30, clock)
+    stub = WebhookStub()
+    url = stub.url
+    stub.stop()
+
+    for job in range(3):
+        deliver(dispatcher, url, {'job_id': job})
+
+    dispatcher.drain()
+
+    # Two connection failures opened the circuit, the third was deferred.
+    assert [delivery['attempts'] for delivery in retries(dispatcher)] == [1, 1, 0]
+    assert not dispatcher.breaker.allow(url.split('/')[2])
+
+    clock.now += 30
+    assert dispatcher.breaker.allow(url.split('/')[2])
+    assert not dispatcher.breaker.allow(url.split('/')[2])
+
+
+def test_deliveries_of_a_crashed_worker_are_taken_over_after_the_lease(dispatcher):
+    with WebhookStub(batch_max=5) as stub:
+        deliver(dispatcher, stub.url, {'job_id': 0})
+        deliver(dispatcher, stub.url, {'job_id': 1})
+        assert dispatcher.drain() == 2
+
+        # The second delivery lingers in the batch when the worker dies.
+        dispatcher._buffers.clear()
+        assert [message['job_id'] for message in stub.messages] == [0]
+
+        other = webhooks.WebhookDispatcher(redis=dispatcher.redis, clock=dispatcher.clock)
+        assert other.drain() == 0
+
+        dispatcher.clock.now += webhooks.LEASE
+        assert other.drain() == 1
+        other.close()
+
+    assert [message['job_id'] for message in stub.messages] == [0, 1]
+    assert retries(dispatcher) == []
+
+
+def test_the_dispatcher_thread_posts_the_deliveries():
+    posted = threading.Event()
+
+    def answer(request):
+        posted.set()
+        return httpx.Response(200)
+
+    dispatcher = webhooks.WebhookDispatcher(redis=fakeredis.FakeRedis(),
+                                            transport=httpx.MockTransport(answer))
+    dispatcher.start()
+
+    try:
+        dispatcher.deliver('https://thread.example.com/hook', {'job_id': 'a'})
+        assert posted.wait(5)
+    finally:
+        dispatcher.close()
+
+    assert retries(dispatcher) == []
+
+
+@celery_app.WORKER.task(name='tests.webhook', after_return=celery_app.response_handler,
+                        bind=True)
+def webhook_task(task, payload):
+    return 'done'
+
+
+def test_webhook_route_uses_the_dispatcher(monkeypatch):
+    monkeypatch.setattr(reply_to.config, 'reply_hosts', ['caller'])
+    delivered = []
+
+    class Recorder:
+        def deliver(self, url, message):
+            delivered.append((url, message['result']))
+
+    webhooks.set_dispatcher(Recorder())
+
+    try:
+        webhook_task.apply(args=({},), headers={reply_to.HEADER: 'https://caller/hook'})
+    finally:
+        webhooks.set_dispatcher(None)
+
+    assert delivered == [('https://caller/hook', 'done')]
+
+
+def test_webhooks_carry_no_credential_and_are_signed(monkeypatch):
+    monkeypatch.setattr(webhooks.config, 'webhook_secrets', {'signed.example.com': 'shh'})
+    requests = []
+
+    def answer(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    dispatcher = webhooks.WebhookDispatcher(redis=fakeredis.FakeRedis(),
+                                            transport=httpx.MockTransport(answer))
+
+    try:
+        dispatcher.deliver('https://signed.example.com/hook', {'job_id': 'a'})
+        dispatcher.deliver('https://plain.example.com/hook', {'job_id': 'b'})
+        dispatcher.drain()
+    finally:
+        dispatcher.close()
+
+    signed, plain = requests
+    expected = hmac.new(b'shh', signed.content, hashlib.sha256).hexdigest()
+
+    assert signed.headers[webhooks.SIGNATURE_HEADER] == f'sha256={expected}'
+    assert webhooks.SIGNATURE_HEADER not in plain.headers
+    assert all('x-api-key' not in request.headers for request in requests)
+    assert plain.headers['content-type'] == 'application/json'